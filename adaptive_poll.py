@@ -0,0 +1,42 @@
+"""Interval polling adaptif per channel: cepat saat channel ramai, mundur eksponensial saat sepi.
+
+Tiap siklus pemanggil melaporkan jumlah pesan baru (di luar pesan bot sendiri) lewat `observe`.
+Ada pesan -> interval kembali ke paling lama `base` lalu dibagi `speedup`; sepi -> dikali `backoff`.
+Hasil selalu dijepit ke [minimum, maximum] dan tidak pernah lebih cepat dari slow mode channel,
+karena balasan memang tidak bisa dikirim lebih sering dari itu.
+"""
+
+
+class AdaptiveInterval:
+    """State interval satu channel; tidak thread-safe (hanya dipakai manager channel itu)."""
+
+    def __init__(self, base, minimum, maximum, backoff=1.5, speedup=2.0):
+        self.base = float(base)
+        self.minimum = max(1.0, float(minimum))
+        self.maximum = float(maximum)
+        if self.minimum > self.maximum:
+            raise ValueError(f"min_interval ({minimum}) lebih besar dari max_interval ({maximum})")
+        self.backoff = max(1.0, float(backoff))
+        self.speedup = max(1.0, float(speedup))
+        self.current = self._clamp(self.base)
+
+    def _clamp(self, value):
+        return min(self.maximum, max(self.minimum, value))
+
+    def inherit(self, previous):
+        """Melanjutkan interval dari instance lama (setelah pengaturan channel diubah)."""
+        if previous is not None:
+            self.current = self._clamp(previous.current)
+        return self
+
+    def observe(self, new_messages):
+        """Mencatat hasil baca satu siklus; mengembalikan interval berikutnya (tanpa slow mode)."""
+        if new_messages > 0:
+            self.current = self._clamp(min(self.current, self.base) / self.speedup)
+        else:
+            self.current = self._clamp(self.current * self.backoff)
+        return self.current
+
+    def next_interval(self, slow_mode_delay=0):
+        """Detik tunggu sebelum siklus berikutnya."""
+        return max(self.current, slow_mode_delay or 0)
@@ -0,0 +1,108 @@
+"""Registry kesehatan Google API key: cooldown per key yang singkat & tepat, plus batas RPM.
+
+Key yang kena 429 hanya diistirahatkan selama Retry-After dari server (atau cooldown
+bawaan yang naik eksponensial jika server tidak memberi info). Pemanggil yang tidak
+mendapat key menunggu di Condition (lock dilepas selama menunggu), tidak pernah tidur
+sambil memegang lock.
+"""
+import random
+import re
+import threading
+import time
+from collections import deque
+
+_RETRY_DELAY = re.compile(r"^([\d.]+)s$")
+
+
+def parse_retry_after(response):
+    """Membaca waktu tunggu (detik) dari respons 429 Gemini: header Retry-After atau RetryInfo di body."""
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        pass
+    try:
+        for detail in response.json().get("error", {}).get("details", []):
+            if detail.get("@type", "").endswith("google.rpc.RetryInfo"):
+                match = _RETRY_DELAY.match(str(detail.get("retryDelay", "")))
+                if match:
+                    return float(match.group(1))
+    except Exception:
+        pass
+    return None
+
+
+class ApiKeyRegistry:
+    """Melacak cooldown (waktu epoch) dan jendela request per menit untuk setiap key."""
+
+    def __init__(self, keys, rpm_limit=0, default_cooldown=60, max_cooldown=3600, on_cooldown=None):
+        self.keys = list(keys)
+        self.rpm_limit = rpm_limit
+        self.default_cooldown = default_cooldown
+        self.max_cooldown = max_cooldown
+        self.on_cooldown = on_cooldown # Callback(key, until) untuk persistensi
+        self.cooldown_until = {key: 0.0 for key in self.keys}
+        self.strikes = {key: 0 for key in self.keys} # 429 berturut-turut tanpa sukses
+        self.windows = {key: deque() for key in self.keys}
+        self.condition = threading.Condition()
+
+    def _available_in(self, key, now, mono_now):
+        wait = max(0.0, self.cooldown_until[key] - now)
+        window = self.windows[key]
+        while window and mono_now - window[0] >= 60:
+            window.popleft()
+        if self.rpm_limit and len(window) >= self.rpm_limit:
+            wait = max(wait, 60 - (mono_now - window[0]))
+        return wait
+
+    def acquire(self, timeout=0):
+        """Mengambil key sehat secara acak. Menunggu maks `timeout` detik; None jika tetap tidak ada."""
+        if not self.keys:
+            return None
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                now, mono_now = time.time(), time.monotonic()
+                waits = {key: self._available_in(key, now, mono_now) for key in self.keys}
+                ready = [key for key, wait in waits.items() if wait <= 0]
+                if ready:
+                    key = random.choice(ready)
+                    self.windows[key].append(mono_now)
+                    return key
+                remaining = deadline - mono_now
+                if remaining <= 0:
+                    return None
+                self.condition.wait(timeout=min(remaining, min(waits.values())))
+
+    def next_available_in(self):
+        """Detik sampai ada key yang bisa dipakai lagi (0 jika sudah ada)."""
+        with self.condition:
+            now, mono_now = time.time(), time.monotonic()
+            return min((self._available_in(key, now, mono_now) for key in self.keys), default=0.0)
+
+    def report_rate_limited(self, key, retry_after=None):
+        """Mencatat 429 untuk key ini. Mengembalikan lama cooldown (detik)."""
+        with self.condition:
+            self.strikes[key] = self.strikes.get(key, 0) + 1
+            if retry_after is None:
+                retry_after = min(self.max_cooldown, self.default_cooldown * 2 ** (self.strikes[key] - 1))
+            until = time.time() + retry_after
+            self.cooldown_until[key] = until
+        if self.on_cooldown:
+            self.on_cooldown(key, until)
+        return retry_after
+
+    def report_success(self, key):
+        with self.condition:
+            self.strikes[key] = 0
+
+    def restore_cooldown(self, key, until):
+        """Memulihkan cooldown yang tersimpan dari run sebelumnya."""
+        with self.condition:
+            if key in self.cooldown_until:
+                self.cooldown_until[key] = max(self.cooldown_until[key], until)
+
+    def cooling_down(self):
+        """Jumlah key yang sedang cooldown."""
+        with self.condition:
+            now = time.time()
+            return sum(1 for until in self.cooldown_until.values() if until > now)
@@ -0,0 +1,169 @@
+"""Server tiruan gateway Discord (websocket) untuk menguji intake MESSAGE_CREATE tanpa Discord asli.
+
+Hanya memakai pustaka standar. Alur yang ditiru per koneksi:
+  server -> HELLO (op 10), klien -> IDENTIFY (op 2), server -> READY (op 0),
+  klien -> HEARTBEAT (op 1) dijawab HEARTBEAT_ACK (op 11).
+Event MESSAGE_CREATE dikirim ke semua sesi yang sudah READY lewat `dispatch_message`.
+
+    state = MockGatewayState()
+    server, url = start(state) # url = ws://127.0.0.1:PORT/?v=10&encoding=json
+"""
+import base64
+import hashlib
+import itertools
+import json
+import socketserver
+import struct
+import threading
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OP_DISPATCH = 0
+OP_HEARTBEAT = 1
+OP_IDENTIFY = 2
+OP_HELLO = 10
+OP_HEARTBEAT_ACK = 11
+
+
+class MockGatewayState:
+    """State bersama server tiruan: sesi aktif, token yang identify, dan hitungan paket."""
+
+    def __init__(self, heartbeat_interval=45000):
+        self.heartbeat_interval = heartbeat_interval
+        self.lock = threading.Lock()
+        self.sessions = {} # {session_id: _Session}
+        self.identified = [] # Token dari setiap IDENTIFY, urut kedatangan
+        self.counts = {}
+        self.ids = itertools.count(1)
+
+    def count(self, name):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def dispatch_message(self, message):
+        """Mengirim MESSAGE_CREATE ke semua sesi READY; mengembalikan jumlah sesi penerima."""
+        with self.lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            session.dispatch("MESSAGE_CREATE", message)
+        return len(sessions)
+
+
+class _Session:
+    def __init__(self, sock, session_id):
+        self.sock = sock
+        self.session_id = session_id
+        self.seq = 0
+        self.send_lock = threading.Lock()
+
+    def send_json(self, packet):
+        data = json.dumps(packet).encode("utf-8")
+        if len(data) < 126:
+            header = struct.pack("!BB", 0x81, len(data))
+        elif len(data) < 65536:
+            header = struct.pack("!BBH", 0x81, 126, len(data))
+        else:
+            header = struct.pack("!BBQ", 0x81, 127, len(data))
+        with self.send_lock:
+            self.sock.sendall(header + data)
+
+    def dispatch(self, event, data):
+        with self.send_lock:
+            self.seq += 1
+            seq = self.seq
+        self.send_json({"op": OP_DISPATCH, "t": event, "s": seq, "d": data})
+
+
+def _recv_exact(sock, size):
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Koneksi ditutup klien")
+        data += chunk
+    return data
+
+
+def _recv_frame(sock):
+    """(opcode, payload) satu frame dari klien (frame klien selalu bermask)."""
+    first, second = _recv_exact(sock, 2)
+    opcode, length = first & 0x0F, second & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _recv_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _recv_exact(sock, 8))[0]
+    mask = _recv_exact(sock, 4) if second & 0x80 else b"\0\0\0\0"
+    payload = _recv_exact(sock, length)
+    return opcode, bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+
+
+def make_handler(state):
+    class Handler(socketserver.BaseRequestHandler):
+        def _handshake(self):
+            request = b""
+            while b"\r\n\r\n" not in request:
+                chunk = self.request.recv(4096)
+                if not chunk:
+                    return False
+                request += chunk
+            headers = {}
+            for line in request.decode("latin-1").split("\r\n")[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            key = headers.get("sec-websocket-key")
+            if not key:
+                self.request.sendall(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+                return False
+            accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+            self.request.sendall((
+                "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode())
+            return True
+
+        def handle(self):
+            if not self._handshake():
+                return
+            session = _Session(self.request, f"sesi-{next(state.ids)}")
+            session.send_json({"op": OP_HELLO, "d": {"heartbeat_interval": state.heartbeat_interval}})
+            try:
+                while True:
+                    opcode, payload = _recv_frame(self.request)
+                    if opcode == 0x8: # Close
+                        break
+                    if opcode == 0x9: # Ping -> pong
+                        with session.send_lock:
+                            self.request.sendall(struct.pack("!BB", 0x8A, len(payload)) + payload)
+                        continue
+                    if opcode != 0x1:
+                        continue
+                    packet = json.loads(payload)
+                    op = packet.get("op")
+                    if op == OP_IDENTIFY:
+                        state.count("identify")
+                        with state.lock:
+                            state.identified.append(packet["d"].get("token"))
+                            state.sessions[session.session_id] = session
+                        session.dispatch("READY", {"session_id": session.session_id, "user": {"id": "400000000000000001"}})
+                    elif op == OP_HEARTBEAT:
+                        state.count("heartbeat")
+                        session.send_json({"op": OP_HEARTBEAT_ACK})
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                with state.lock:
+                    state.sessions.pop(session.session_id, None)
+
+    return Handler
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start(state, host="127.0.0.1", port=0):
+    """Menjalankan server gateway tiruan di thread daemon; mengembalikan (server, url)."""
+    server = _Server((host, port), make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True, name="MockGateway").start()
+    return server, f"ws://{host}:{server.server_address[1]}/?v=10&encoding=json"
@@ -0,0 +1,196 @@
+"""Server tiruan Discord REST + Gemini untuk benchmark bot.py tanpa menyentuh layanan asli.
+
+Endpoint yang ditiru (prefix Discord: /api/v10, Gemini: /gemini):
+  GET  /users/@me, /users/@me/guilds, /channels/{id}
+  GET/POST /channels/{id}/messages, DELETE /channels/{id}/messages/{mid},
+  POST /channels/{id}/messages/bulk-delete, POST /channels/{id}/typing
+  POST /gemini/models/{model}:generateContent
+
+Pesan "user" muncul di tiap channel sebagai proses Poisson (arrival_rate per detik) yang
+dihitung saat channel dibaca, jadi ribuan channel tidak butuh thread generator.
+Latensi balasan = waktu dari pesan muncul sampai POST balasan yang me-reply pesan itu.
+"""
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GUILD_ID = "100000000000000001"
+_CHANNEL_PATH = re.compile(r"^/api/v10/channels/(\d+)(/.*)?$")
+
+
+class MockState:
+    """State bersama server tiruan: pesan per channel, statistik, dan parameter beban."""
+
+    def __init__(self, latency=0.02, jitter=0.01, gemini_latency=0.3, rate_429=0.0, gemini_rate_429=0.0, arrival_rate=0.2):
+        self.latency = latency
+        self.jitter = jitter
+        self.gemini_latency = gemini_latency
+        self.rate_429 = rate_429
+        self.gemini_rate_429 = gemini_rate_429
+        self.arrival_rate = arrival_rate
+        self.ids = itertools.count(200000000000000000)
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.channels = {}     # {channel_id: {"messages": [...], "next_arrival": float}}
+        self.arrivals = {}     # {message_id: waktu muncul (monotonic)}
+        self.reply_latencies = []
+        self.counts = {}
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def _next_id(self):
+        return str(next(self.ids))
+
+    def _channel(self, channel_id, now):
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            first_arrival = self.started + random.expovariate(self.arrival_rate) if self.arrival_rate else float("inf")
+            channel = self.channels[channel_id] = {"messages": [], "next_arrival": first_arrival}
+        # Munculkan semua pesan user yang "seharusnya" sudah tiba sampai sekarang
+        while channel["next_arrival"] <= now:
+            message_id = self._next_id()
+            channel["messages"].append({
+                "id": message_id, "channel_id": channel_id, "content": f"pesan uji {message_id}",
+                "author": {"id": "300000000000000001", "username": "penguji"}, "mentions": [],
+            })
+            self.arrivals[message_id] = channel["next_arrival"]
+            channel["next_arrival"] += random.expovariate(self.arrival_rate)
+        del channel["messages"][:-500] # Cukup simpan pesan terbaru
+        return channel
+
+    def read_messages(self, channel_id, after=None, limit=50):
+        now = time.monotonic()
+        with self.lock:
+            messages = self._channel(channel_id, now)["messages"]
+            if after:
+                selected = [m for m in messages if int(m["id"]) > int(after)][:limit]
+            else:
+                selected = messages[-limit:]
+        return list(reversed(selected)) # Discord: terbaru dulu
+
+    def post_message(self, channel_id, payload):
+        now = time.monotonic()
+        message_id = self._next_id()
+        reference = (payload.get("message_reference") or {}).get("message_id")
+        with self.lock:
+            self._channel(channel_id, now)
+            arrived = self.arrivals.pop(reference, None) if reference else None
+            if arrived is not None:
+                self.reply_latencies.append(now - arrived)
+        return {"id": message_id, "channel_id": channel_id, "content": payload.get("content", "")}
+
+    def snapshot(self):
+        with self.lock:
+            return {"counts": dict(self.counts), "reply_latencies": list(self.reply_latencies)}
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive agar pool koneksi bot terpakai
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, body=None, headers=None):
+            data = b"" if body is None else json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+        def _delay(self, base):
+            time.sleep(max(0.0, random.gauss(base, state.jitter)))
+
+        def _maybe_429(self, rate, counter):
+            if rate and random.random() < rate:
+                state.count(counter)
+                retry_after = round(random.uniform(0.05, 0.5), 3)
+                self._reply(429, {"message": "You are being rate limited.", "retry_after": retry_after, "global": False},
+                            {"Retry-After": str(retry_after), "X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": str(retry_after)})
+                return True
+            return False
+
+        def _route(self, method):
+            path, _, query = self.path.partition("?")
+            params = dict(part.split("=", 1) for part in query.split("&") if "=" in part)
+            body = self._body() if method in ("POST", "PATCH") else {}
+
+            if path.startswith("/gemini/"):
+                self._delay(state.gemini_latency)
+                if self._maybe_429(state.gemini_rate_429, "gemini_429"):
+                    return
+                state.count("gemini_requests")
+                self._reply(200, {"candidates": [{"content": {"parts": [{"text": f"balasan {random.randint(0, 10**9)}"}]}}]})
+                return
+
+            self._delay(state.latency)
+            if self._maybe_429(state.rate_429, "discord_429"):
+                return
+            auth = self.headers.get("Authorization", "")
+            if path == "/api/v10/users/@me":
+                state.count("users_me")
+                bot_id = str(400000000000000000 + sum(map(ord, auth)) % 1000)
+                self._reply(200, {"id": bot_id, "username": f"bot{bot_id[-3:]}", "discriminator": "0"})
+                return
+            if path == "/api/v10/users/@me/guilds":
+                self._reply(200, [{"id": GUILD_ID, "name": "Server Uji"}])
+                return
+
+            match = _CHANNEL_PATH.match(path)
+            if not match:
+                self._reply(404, {"message": "Unknown route", "code": 0})
+                return
+            channel_id, rest = match.group(1), match.group(2) or ""
+            if rest == "" and method == "GET":
+                state.count("channel_info")
+                self._reply(200, {"id": channel_id, "name": f"uji-{channel_id[-4:]}", "guild_id": GUILD_ID, "rate_limit_per_user": 0})
+            elif rest == "/messages" and method == "GET":
+                state.count("reads")
+                limit = min(int(params.get("limit", 50)), 100)
+                self._reply(200, state.read_messages(channel_id, params.get("after"), limit))
+            elif rest == "/messages" and method == "POST":
+                state.count("sends")
+                self._reply(200, state.post_message(channel_id, body))
+            elif rest == "/messages/bulk-delete" and method == "POST":
+                state.count("deletes", len(body.get("messages", [])))
+                self._reply(204)
+            elif rest.startswith("/messages/") and method == "DELETE":
+                state.count("deletes")
+                self._reply(204)
+            elif rest == "/typing" and method == "POST":
+                state.count("typing")
+                self._reply(204)
+            else:
+                self._reply(404, {"message": "Unknown route", "code": 0})
+
+        def do_GET(self):
+            self._route("GET")
+
+        def do_POST(self):
+            self._route("POST")
+
+        def do_DELETE(self):
+            self._route("DELETE")
+
+    return Handler
+
+
+def start(state, host="127.0.0.1", port=0):
+    """Menjalankan server tiruan di thread daemon; mengembalikan (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="MockServer").start()
+    return server, f"http://{host}:{server.server_port}"
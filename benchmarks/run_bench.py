@@ -0,0 +1,195 @@
+"""Benchmark bot.py terhadap server tiruan (benchmarks/mock_server.py).
+
+Untuk setiap jumlah channel, server tiruan dijalankan di proses ini dan bot dijalankan di
+subproses terpisah (agar memori & thread terukur bersih dan global bot.py tidak tercampur).
+Hasil ditulis sebagai JSON supaya bisa dibandingkan antar versi:
+
+    python benchmarks/run_bench.py --channels 10,100,1000 --duration 60 --output hasil.json
+    python benchmarks/run_bench.py --engine async --rate-429 0.02 --arrival-rate 0.5
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+import mock_server
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_PREFIX = "BENCH_RESULT "
+
+
+def percentile(values, q):
+    """Persentil nearest-rank (q 0-100); None jika kosong."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def run_worker(args):
+    """Subproses: import bot.py (env sudah diarahkan ke server tiruan) lalu jalankan N channel."""
+    sys.path.insert(0, ROOT_DIR)
+    import bot
+    logging.getLogger().setLevel(args.log_level)
+
+    startup_start = time.perf_counter()
+    valid_tokens_info = [(i, token, info) for i, token, info in bot.verify_tokens(bot.discord_tokens_list) if info]
+    channel_ids = [str(500000000000000000 + i) for i in range(args.channels)]
+    access = bot.verify_channel_access(channel_ids, valid_tokens_info)
+    startup_seconds = time.perf_counter() - startup_start
+
+    tokens = [token for _, token, _ in valid_tokens_info]
+    bot_ids = {info["bot_id"] for _, _, info in valid_tokens_info}
+    settings = {
+        "use_google_ai": True, "prompt_language": "en", "enable_read_message": True, "read_delay": 0,
+        "use_reply": True, "reply_target": "newest", "bot_reply_probability": 0.0,
+        "delay_interval": args.interval, "use_slow_mode": False,
+        "delete_bot_reply": args.delete_after, "delete_immediately": args.delete_after == 0,
+    }
+    channel_configs = {
+        channel_id: {"name": access[channel_id]["name"], "settings": dict(settings), "tokens": tokens, "bot_ids": bot_ids}
+        for channel_id in channel_ids
+    }
+
+    run_start = time.perf_counter()
+    if bot.engine_mode == "async":
+        threading.Thread(target=asyncio.run, args=(bot.run_async_engine(channel_configs),), daemon=True, name="AsyncEngine").start()
+    else:
+        for channel_id, config in channel_configs.items():
+            threading.Thread(
+                target=bot.auto_reply_channel_manager,
+                args=(channel_id, config["name"], config["settings"], config["tokens"], config["bot_ids"]),
+                daemon=True,
+            ).start()
+
+    peak_threads = 0
+    while time.perf_counter() - run_start < args.duration:
+        peak_threads = max(peak_threads, threading.active_count())
+        time.sleep(0.5)
+
+    result = {
+        "startup_seconds": round(startup_seconds, 3),
+        "run_seconds": round(time.perf_counter() - run_start, 3),
+        "peak_threads": peak_threads,
+        "rss_mb": current_rss_mb(),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # KB di Linux
+        "generation_stats": dict(bot.generation_service.stats),
+        "ratelimit_stats": dict(bot.rate_limiter.stats),
+        "send_queue_stats": bot.send_queue.summary(),
+    }
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    os._exit(0) # Thread manager tidak pernah selesai sendiri
+
+
+def run_scale(args, channels):
+    """Menjalankan satu skenario (N channel) dan mengembalikan dict hasil."""
+    state = mock_server.MockState(
+        latency=args.latency, jitter=args.jitter, gemini_latency=args.gemini_latency,
+        rate_429=args.rate_429, gemini_rate_429=args.gemini_rate_429, arrival_rate=args.arrival_rate,
+    )
+    server, base_url = mock_server.start(state)
+    env = dict(os.environ)
+    env.update({
+        "DISCORD_TOKENS": ",".join(f"bench-token-{i}" for i in range(args.tokens)),
+        "GOOGLE_API_KEYS": ",".join(f"bench-key-{i}" for i in range(args.tokens)),
+        "DISCORD_API_BASE": f"{base_url}/api/v10",
+        "GEMINI_API_BASE": f"{base_url}/gemini",
+        "ENGINE": args.engine,
+        "USE_BOT_TOKEN": "true",
+        "USE_GATEWAY": "false",
+        "RESPONSE_CACHE_SIZE": "0", # Setiap pesan uji unik, cache hanya menambah noise
+        "STATE_DB": "",
+        "CONFIG_FILE": "",
+        "METRICS_PORT": "0",
+    })
+    command = [
+        sys.executable, os.path.abspath(__file__), "--worker", "--channels", str(channels),
+        "--duration", str(args.duration), "--interval", str(args.interval), "--log-level", args.log_level,
+    ]
+    if args.delete_after is not None:
+        command += ["--delete-after", str(args.delete_after)]
+    print(f"[bench] {channels} channel, engine {args.engine}, {args.duration} detik...", file=sys.stderr)
+    try:
+        completed = subprocess.run(command, env=env, cwd=ROOT_DIR, capture_output=True, text=True, timeout=args.duration + 600)
+    finally:
+        server.shutdown()
+
+    worker = next((json.loads(line[len(RESULT_PREFIX):]) for line in completed.stdout.splitlines() if line.startswith(RESULT_PREFIX)), None)
+    if worker is None:
+        return {"channels": channels, "error": f"worker gagal (exit {completed.returncode})", "stderr_tail": completed.stderr[-2000:]}
+
+    mock = state.snapshot()
+    latencies = mock["reply_latencies"]
+    return {
+        "channels": channels,
+        "replies": len(latencies),
+        "messages_per_second": round(len(latencies) / worker["run_seconds"], 3),
+        "reply_latency_p50": percentile(latencies, 50),
+        "reply_latency_p99": percentile(latencies, 99),
+        "requests": mock["counts"],
+        **worker,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bot.py terhadap server Discord/Gemini tiruan")
+    parser.add_argument("--channels", default="10,100,1000", help="Daftar jumlah channel, dipisah koma")
+    parser.add_argument("--duration", type=float, default=60, help="Detik per skenario")
+    parser.add_argument("--engine", choices=("thread", "async"), default="thread")
+    parser.add_argument("--tokens", type=int, default=4, help="Jumlah token bot & API key tiruan")
+    parser.add_argument("--interval", type=float, default=5, help="delay_interval tiap channel (detik)")
+    parser.add_argument("--delete-after", type=int, default=None, help="Hapus balasan setelah N detik (default: tidak)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latensi rata-rata Discord tiruan (detik)")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--gemini-latency", type=float, default=0.3)
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Peluang respons 429 Discord")
+    parser.add_argument("--gemini-rate-429", type=float, default=0.0, help="Peluang respons 429 Gemini")
+    parser.add_argument("--arrival-rate", type=float, default=0.2, help="Pesan user per detik per channel")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="File JSON hasil (default: stdout)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        args.channels = int(args.channels)
+        run_worker(args)
+        return
+
+    report = {
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": {key: value for key, value in vars(args).items() if key not in ("worker", "output")},
+        "results": [run_scale(args, int(n)) for n in args.channels.split(",") if n.strip()],
+    }
+    try:
+        report["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        report["commit"] = None
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
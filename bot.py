@@ -1,4 +1,7 @@
 import DXJCOMMUNITY
+import asyncio
+import collections
+import functools
 import json
 import threading
 import time
@@ -6,24 +9,55 @@ import os
 import random
 import re
 import requests
+import subprocess
+import sys
+from requests.adapters import HTTPAdapter
+from api_keys import ApiKeyRegistry, parse_retry_after
+from adaptive_poll import AdaptiveInterval
+import channel_config
+import circuit_breaker
+import control_api
+from delete_scheduler import DeleteScheduler
+from generation_service import GenerationService, PRIORITY_MENTION, PRIORITY_NORMAL
+from message_pool import MessageFile, MessageSampler
+from response_cache import ResponseCache
+from state_store import StateStore
+from send_queue import SendQueue, RetryLater, PRIORITY_REPLY, PRIORITY_POST
+from typing_service import TypingService
+import gateway
+import coordination
+import hashlib
+import heapq
+import logging_setup
+import metrics
+import ratelimit
+import tracing
 from DXJCOMMUNITY import print_logo 
 from dotenv import load_dotenv
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from colorama import init, Fore, Style
 import logging # Gunakan logging untuk output yang lebih terstruktur
 import traceback # Untuk logging error detail
 
-# Konfigurasi logging dasar
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [%(threadName)s] - %(message)s')
-# Matikan logger dari library requests yang terlalu verbose
-logging.getLogger("requests").setLevel(logging.WARNING)
-logging.getLogger("urllib3").setLevel(logging.WARNING)
-
 # Inisialisasi colorama
 init(autoreset=True)
 # Memuat variabel lingkungan
 load_dotenv()
 
+# Konfigurasi logging (LOG_QUEUE=true: tulis log dari thread latar belakang, LOG_FORMAT=json: satu JSON per baris)
+logging_setup.setup_logging(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    fmt=os.getenv('LOG_FORMAT', 'text').strip().lower(),
+    use_queue=os.getenv('LOG_QUEUE', 'false').lower() == 'true',
+    repeat_window=float(os.getenv('LOG_REPEAT_WINDOW', '60')), # Detik; 0 = jangan tahan baris berulang
+    repeat_burst=int(os.getenv('LOG_REPEAT_BURST', '3')),      # Baris serupa yang tetap lolos per window
+)
+# Matikan logger dari library requests yang terlalu verbose
+logging.getLogger("requests").setLevel(logging.WARNING)
+logging.getLogger("urllib3").setLevel(logging.WARNING)
+
 # Banner
 print("\n" + Fore.MAGENTA + "="*80)
 print("PUSH ROLE DISCORD - MULTI-BOT SETUP (Fitur Balas Antar Bot)".center(80))
@@ -45,103 +79,463 @@ if not google_api_keys_env:
 else:
     google_api_keys = [key.strip() for key in google_api_keys_env.split(',') if key.strip()]
 
+# State persisten (SQLite); kosong = nonaktif (semua state hanya di memori)
+state_db_path = os.getenv('STATE_DB', '').strip()
+state_flush_interval = float(os.getenv('STATE_FLUSH_INTERVAL', '1.0')) # Detik antar batch tulis ke disk
+
+# Engine eksekusi manager channel: "thread" (satu thread per channel) atau "async" (satu event loop)
+engine_mode = os.getenv('ENGINE', 'thread').strip().lower()
+config_file = os.getenv('CONFIG_FILE', '').strip() or None # File YAML/JSON pengaturan channel (tanpa wizard)
+startup_workers = int(os.getenv('STARTUP_WORKERS', '16')) # Maks request verifikasi token/channel bersamaan saat startup
+
+# Mode shard: channel dibagi ke beberapa proses/host berdasarkan hash channel ID
+shard_processes = int(os.getenv('SHARD_PROCESSES', '0')) # >1: proses ini hanya meluncurkan N proses worker lokal
+shard_count = max(1, int(os.getenv('SHARD_COUNT', '1')))  # Total shard (semua host)
+shard_index = int(os.getenv('SHARD_INDEX', '0'))          # Shard milik proses ini (0..SHARD_COUNT-1)
+coordination_spec = os.getenv('COORDINATION_BACKEND', '').strip() # "", "local", atau "sqlite:/path/file.db"
+coordinator = coordination.create_backend(coordination_spec)
+if not 0 <= shard_index < shard_count:
+    raise ValueError(f"SHARD_INDEX={shard_index} harus di antara 0 dan {shard_count - 1}")
+if state_db_path and shard_count > 1:
+    state_db_path = f"{state_db_path}.{shard_index}" # Tiap shard punya file state sendiri (hanya channel miliknya)
+if shard_count > 1 and coordinator.name == "local":
+    logging.warning("SHARD_COUNT > 1 tanpa COORDINATION_BACKEND: ID pesan, blokir 429 & cooldown key tidak dibagi antar shard.")
+metrics_port = int(os.getenv('METRICS_PORT', '0')) # Port endpoint /metrics Prometheus (0 = nonaktif)
+if metrics_port and shard_count > 1:
+    metrics_port += shard_index # Tiap shard punya port sendiri
+metrics_host = os.getenv('METRICS_HOST', '127.0.0.1')
+control_port = int(os.getenv('CONTROL_PORT', '0')) # Port API kontrol channel (0 = nonaktif)
+if control_port and shard_count > 1:
+    control_port += shard_index
+control_host = os.getenv('CONTROL_HOST', '127.0.0.1')
+control_token = os.getenv('CONTROL_TOKEN', '').strip() or None # Jika diisi, wajib dikirim sebagai "Authorization: Bearer ..."
+trace_file = os.getenv('TRACE_FILE', '').strip() or None # File span per fase siklus (kosong = tracing nonaktif)
+if trace_file and shard_count > 1:
+    trace_file = f"{trace_file}.{shard_index}" # Tiap shard menulis & merotasi file sendiri
+tracer = tracing.Tracer(
+    trace_file,
+    fmt=os.getenv('TRACE_FORMAT', 'chrome').strip().lower(), # chrome (chrome://tracing, Perfetto) / otlp (JSON per baris)
+    sample_rate=float(os.getenv('TRACE_SAMPLE_RATE', '1.0')), # Porsi siklus yang ditrace (0.0 - 1.0)
+    max_bytes=int(float(os.getenv('TRACE_MAX_MB', '50')) * 1024 * 1024), # Ukuran file sebelum dirotasi
+    backups=int(os.getenv('TRACE_BACKUPS', '3')),
+)
+if engine_mode not in ('thread', 'async'):
+    logging.warning(f"ENGINE '{engine_mode}' tidak dikenal, memakai 'thread'.")
+    engine_mode = 'thread'
+async_io_workers = int(os.getenv('ASYNC_IO_WORKERS', '32')) # Ukuran pool HTTP untuk engine async
+
+# Transport HTTP (base URL bisa diarahkan ke server lokal untuk uji/benchmark)
+discord_api_base = os.getenv('DISCORD_API_BASE', 'https://discord.com/api/v10').rstrip('/')
+gemini_api_base = os.getenv('GEMINI_API_BASE', 'https://generativelanguage.googleapis.com/v1beta').rstrip('/')
+http_pool_size = int(os.getenv('HTTP_POOL_SIZE', '10')) # Koneksi keep-alive per token Discord
+gemini_pool_size = int(os.getenv('GEMINI_POOL_SIZE', '10')) # Koneksi keep-alive ke Gemini
+discord_global_rps = int(os.getenv('DISCORD_GLOBAL_RPS', '50')) # Limit global Discord per token (request/detik)
+discord_429_retries = int(os.getenv('DISCORD_429_RETRIES', '1')) # Kirim ulang otomatis setelah 429
+breaker_threshold = int(os.getenv('BREAKER_THRESHOLD', '3')) # Kegagalan beruntun (5xx/timeout) sebelum circuit token/channel dibuka
+breaker_cooloff = float(os.getenv('BREAKER_COOLOFF', '30'))   # Detik cool-off awal; dua kali lipat setiap probe gagal
+breaker_max_cooloff = float(os.getenv('BREAKER_MAX_COOLOFF', '1800'))
+channel_cache_ttl = float(os.getenv('CHANNEL_CACHE_TTL', '300')) # Detik metadata channel (slow mode, nama) di-cache
+catchup_max_pages = int(os.getenv('CATCHUP_MAX_PAGES', '5')) # Maks halaman (x100 pesan) dibaca per siklus
+delete_batch_window = float(os.getenv('DELETE_BATCH_WINDOW', '1.0')) # Hapus yang jatuh tempo berdekatan digabung (bulk)
+delete_workers = int(os.getenv('DELETE_WORKERS', '4')) # Thread eksekusi penghapusan
+typing_workers = int(os.getenv('TYPING_WORKERS', '2')) # Thread pengirim typing indicator
+message_pool_check_interval = float(os.getenv('MESSAGE_POOL_CHECK_INTERVAL', '2')) # Detik antar cek perubahan file pesan
+
+# Interval polling adaptif (Mode AI dengan baca pesan); bisa diatur per channel lewat settings
+adaptive_polling = os.getenv('ADAPTIVE_POLLING', 'false').lower() == 'true'
+adaptive_min_interval = float(os.getenv('ADAPTIVE_MIN_INTERVAL', '5'))   # Detik, batas tercepat saat channel ramai
+adaptive_max_interval = float(os.getenv('ADAPTIVE_MAX_INTERVAL', '600')) # Detik, batas terlama saat channel sepi
+if adaptive_min_interval > adaptive_max_interval:
+    raise ValueError(f"ADAPTIVE_MIN_INTERVAL={adaptive_min_interval} tidak boleh lebih besar dari ADAPTIVE_MAX_INTERVAL={adaptive_max_interval}")
+adaptive_interval_defaults = {"min_interval": adaptive_min_interval, "max_interval": adaptive_max_interval}
+adaptive_backoff = float(os.getenv('ADAPTIVE_BACKOFF', '1.5'))           # Pengali interval per siklus sepi
+adaptive_speedup = float(os.getenv('ADAPTIVE_SPEEDUP', '2'))             # Pembagi interval per siklus dengan pesan baru
+
+# Cache balasan Gemini (RESPONSE_CACHE_SIZE=0 untuk menonaktifkan)
+response_cache_size = int(os.getenv('RESPONSE_CACHE_SIZE', '1000'))
+response_cache_ttl = float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+response_cache_candidates = int(os.getenv('RESPONSE_CACHE_CANDIDATES', '3')) # Kandidat balasan per prompt
+response_cache_file = os.getenv('RESPONSE_CACHE_FILE', '').strip() or None # Persistensi opsional (JSON)
+if response_cache_file and shard_count > 1:
+    response_cache_file = f"{response_cache_file}.{shard_index}" # Tiap shard menyimpan file sendiri (tidak saling timpa)
+
+# Pool generasi Gemini bersama semua channel
+gemini_workers = int(os.getenv('GEMINI_WORKERS', '4')) # Maks request Gemini berjalan bersamaan
+generation_queue_size = int(os.getenv('GENERATION_QUEUE_SIZE', '200'))
+generation_max_age = float(os.getenv('GENERATION_MAX_AGE', '120')) # Detik sebelum permintaan di antrean dianggap basi
+generation_wait = float(os.getenv('GENERATION_WAIT', '10')) # Detik channel menunggu hasil sebelum lanjut siklus
+send_queue_max_age = float(os.getenv('SEND_QUEUE_MAX_AGE', '120')) # Detik sebelum pesan di antrean kirim dianggap basi
+send_wait = float(os.getenv('SEND_WAIT', '15')) # Detik channel menunggu pesannya terkirim sebelum lanjut siklus
+generation_max_pending = int(os.getenv('GENERATION_MAX_PENDING', '2')) # Maks balasan tertunda per channel
+
+# Intake pesan lewat gateway (event MESSAGE_CREATE); REST polling tetap jadi fallback
+use_gateway = os.getenv('USE_GATEWAY', 'false').lower() == 'true'
+gateway_url = os.getenv('DISCORD_GATEWAY_URL', gateway.DEFAULT_GATEWAY_URL)
+gateway_buffer_size = int(os.getenv('GATEWAY_BUFFER_SIZE', '100')) # Maks event tertampung per channel
+if use_gateway and not gateway.is_available():
+    logging.warning("USE_GATEWAY=true tapi paket 'websocket-client' belum terpasang. Memakai REST polling.")
+    use_gateway = False
+
 # --- Variabel Global & Kunci ---
-processed_message_ids = set()
-processed_message_ids_lock = threading.Lock() # Lock untuk akses aman ke set ID pesan
+processed_trackers = {} # {channel_id: ProcessedTracker}, satu struktur per channel (lihat get_processed_tracker)
+processed_cache_size = int(os.getenv('PROCESSED_CACHE_SIZE', '1000')) # ID terbaru yang diingat per channel
 
-used_api_keys = set()
-api_key_lock = threading.Lock() # Lock untuk akses aman ke set kunci API yang digunakan
-cooldown_time = 86400 # 24 jam
+# Kesehatan Google API key (lihat api_key_registry): cooldown per key dari Retry-After/429
+api_key_cooldown = float(os.getenv('GEMINI_KEY_COOLDOWN', '60')) # Cooldown awal jika server tidak memberi Retry-After
+api_key_max_cooldown = float(os.getenv('GEMINI_KEY_MAX_COOLDOWN', '3600'))
+api_key_rpm = int(os.getenv('GEMINI_KEY_RPM', '0')) # Maks request per menit per key (0 = tanpa batas)
+if api_key_rpm and shard_count > 1:
+    api_key_rpm = max(1, api_key_rpm // shard_count) # Dibagi rata antar shard, sama seperti DISCORD_GLOBAL_RPS
+api_key_wait = float(os.getenv('GEMINI_KEY_WAIT', '30')) # Maks detik menunggu key sehat sebelum menyerah
 
 # Data bersama antar thread channel (perlu lock untuk akses aman)
 channel_last_action_times = {}
 channel_data_lock = threading.Lock() # Lock untuk data spesifik channel (seperti last action time)
 
+state_store = None # StateStore aktif jika STATE_DB diisi (lihat init_state_store)
+
+# Metrik Prometheus (dirender di /metrics jika METRICS_PORT diisi, lihat start_metrics_server)
+metrics_registry = metrics.Registry()
+metric_discord_latency = metrics_registry.histogram(
+    "discord_request_duration_seconds", "Latensi request Discord REST per endpoint & channel", ("endpoint", "channel"))
+metric_discord_responses = metrics_registry.counter(
+    "discord_responses_total", "Respons Discord REST per endpoint & status HTTP", ("endpoint", "status"))
+metric_ratelimit_wait = metrics_registry.histogram(
+    "discord_ratelimit_wait_seconds", "Waktu tunggu bucket rate limit sebelum request", ("endpoint",))
+metric_gemini_latency = metrics_registry.histogram(
+    "gemini_request_duration_seconds", "Latensi request Gemini generateContent")
+metric_gemini_results = metrics_registry.counter(
+    "gemini_results_total", "Hasil generate_reply Gemini (ok, cache_hit, rate_limited, blocked, error, no_key)", ("result",))
+metric_send_queue_wait = metrics_registry.histogram(
+    "discord_send_queue_wait_seconds", "Waktu pesan menunggu di antrean kirim token sebelum dikirim")
+metric_cycles = metrics_registry.counter(
+    "channel_cycles_total", "Siklus manager per channel", ("channel", "outcome"))
+metric_cycle_duration = metrics_registry.histogram(
+    "channel_cycle_duration_seconds", "Durasi kerja satu siklus (tanpa interval tunggu) per channel", ("channel",))
+running_managers = set() # Channel yang manager-nya sedang berjalan (thread atau coroutine)
+channel_poll_intervals = {} # {channel_id: interval tunggu efektif terakhir (detik)}
+channel_controls = {} # {channel_id: ChannelControl} untuk channel yang dijalankan lewat launch_channel_manager
+control_lock = threading.Lock()
+async_engine = {} # {"loop", "rt"} engine async yang berjalan, agar channel baru bisa ditambahkan saat runtime
+restored_watermarks = {} # {channel_id: last_seen_id} hasil muat ulang state saat startup
+
+# Pool pesan mode file: file diparse sekali & dimuat ulang saat berubah, sampler per channel
+script_dir = os.path.dirname(os.path.abspath(__file__))
+message_pool_files = {} # {path absolut: MessageFile}
+message_samplers = {}   # {(channel, nama file): MessageSampler}; tiap sampler punya lock sendiri
+message_pool_lock = threading.Lock() # Hanya untuk mencari/membuat sampler & MessageFile
+
 # --- Fungsi Helper ---
 
-def log_message(message, level="INFO", channel_name=None):
-    """Mencatat pesan log dengan level dan prefix channel (jika ada)."""
-    prefix = f"[{channel_name}] " if channel_name else ""
-    log_func = getattr(logging, level.lower(), logging.info)
-    # Menggunakan logger yang dikonfigurasi di awal
-    log_func(f"{prefix}{message}")
+# Level kustom (SUCCESS/WAIT) dicatat sebagai INFO
+LOG_LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "SUCCESS": logging.INFO, "WAIT": logging.INFO,
+              "WARNING": logging.WARNING, "ERROR": logging.ERROR, "CRITICAL": logging.CRITICAL}
+root_logger = logging.getLogger()
+
+def log_message(message, level="INFO", channel_name=None, *args):
+    """Mencatat pesan log dengan level dan prefix channel (jika ada).
+
+    Untuk log di jalur panas, kirim template %-style + args agar pesan baru diformat
+    jika levelnya aktif, misal log_message("Pesan dibaca: %.70s", "DEBUG", channel_name, content).
+    """
+    levelno = LOG_LEVELS.get(level, logging.INFO)
+    if not root_logger.isEnabledFor(levelno):
+        return
+    if channel_name:
+        message = f"[{channel_name.replace('%', '%%') if args else channel_name}] {message}"
+    root_logger.log(levelno, message, *args, extra={"channel": channel_name})
+
+def secret_fingerprint(secret):
+    """Sidik jari pendek token/API key agar rahasia tidak ikut tersimpan di disk."""
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+def persist_state(kind, key, value):
+    """Menjadwalkan penulisan state (no-op jika state store nonaktif)."""
+    if state_store:
+        state_store.put(kind, key, value)
+
+def forget_state(kind, key):
+    if state_store:
+        state_store.delete(kind, key)
 
 def get_auth_header(token):
     """Membuat header otorisasi."""
     auth = f"Bot {token}" if use_bot_token else token
     return {'Authorization': auth, 'User-Agent': 'Python DiscordBot (Multi-Bot v2)', 'Content-Type': 'application/json'}
 
-def trigger_typing(channel_id, token, duration=5, channel_name="Unknown"):
-    """Mengirim typing indicator (best effort, tanpa log error detail)."""
-    headers = get_auth_header(token)
-    url = f"https://discord.com/api/v10/channels/{channel_id}/typing"
-    end_time = time.time() + duration
-    log_message(f"Sending typing indicator for {duration}s (Bot ...{token[-6:]})", "DEBUG", channel_name)
-    while time.time() < end_time:
+# --- Transport HTTP (Session keep-alive per token & Gemini) ---
+discord_sessions = {} # {token: requests.Session} dengan header auth sudah terpasang
+gemini_session = None
+session_lock = threading.Lock()
+
+def create_pooled_session(pool_size):
+    """Membuat requests.Session dengan pool koneksi keep-alive."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_discord_session(token):
+    """Mengambil (atau membuat) session Discord untuk token ini."""
+    with session_lock:
+        session = discord_sessions.get(token)
+        if session is None:
+            session = create_pooled_session(http_pool_size)
+            session.headers.update(get_auth_header(token)) # Header dibuat sekali per token
+            discord_sessions[token] = session
+        return session
+
+def get_gemini_session():
+    """Mengambil (atau membuat) session bersama untuk Gemini."""
+    global gemini_session
+    with session_lock:
+        if gemini_session is None:
+            gemini_session = create_pooled_session(gemini_pool_size)
+            gemini_session.headers.update({'Content-Type': 'application/json'})
+        return gemini_session
+
+# Dipakai bersama semua channel & token. Di mode shard, limit global per token dibagi rata antar shard
+# dan 429 yang diterima satu shard ikut memblokir shard lain lewat backend koordinasi.
+rate_limiter = ratelimit.RateLimiter(
+    global_per_second=discord_global_rps / shard_count,
+    shared=coordinator if coordinator.name != "local" else None
+)
+
+# Circuit breaker: token yang 401 dikeluarkan dari rotasi, token yang 403 dikeluarkan dari rotasi channel
+# itu saja, channel yang 404/5xx/timeout (atau 403 untuk semua bot-nya) di-cool-off.
+# Semuanya diuji ulang lewat satu request probe setelah cool-off (lihat circuit_breaker.py).
+BREAKER_ENDPOINTS = ("read", "send", "channel_info") # Gagal typing/hapus tidak menandakan channel rusak
+
+def on_token_breaker_change(token, state, reason, cooloff):
+    if state == circuit_breaker.OPEN:
+        log_message(f"Bot ...{token[-6:]} dikeluarkan dari rotasi ({reason}); dicoba lagi dalam {cooloff:.0f} detik.", "WARNING")
+    elif state == circuit_breaker.CLOSED:
+        log_message(f"Bot ...{token[-6:]} pulih dan kembali ke rotasi.", "SUCCESS")
+
+def on_access_breaker_change(key, state, reason, cooloff):
+    channel_id, token = key
+    if state == circuit_breaker.OPEN:
+        log_message(f"Bot ...{token[-6:]} dikeluarkan dari rotasi channel {channel_id} ({reason}); dicoba lagi dalam {cooloff:.0f} detik.", "WARNING")
+    elif state == circuit_breaker.CLOSED:
+        log_message(f"Bot ...{token[-6:]} kembali punya akses ke channel {channel_id}.", "SUCCESS")
+
+def on_channel_breaker_change(channel_id, state, reason, cooloff):
+    if state == circuit_breaker.OPEN:
+        log_message(f"Circuit channel {channel_id} dibuka ({reason}); siklus dilewati selama {cooloff:.0f} detik.", "WARNING")
+    elif state == circuit_breaker.CLOSED:
+        log_message(f"Channel {channel_id} pulih, siklus normal kembali.", "SUCCESS")
+
+token_breakers = circuit_breaker.BreakerRegistry(breaker_threshold, breaker_cooloff, breaker_max_cooloff, on_token_breaker_change)
+channel_breakers = circuit_breaker.BreakerRegistry(breaker_threshold, breaker_cooloff, breaker_max_cooloff, on_channel_breaker_change)
+access_breakers = circuit_breaker.BreakerRegistry(breaker_threshold, breaker_cooloff, breaker_max_cooloff, on_access_breaker_change) # Kunci (channel, token)
+channel_token_sets = {} # {channel_id: tuple token} milik manager yang berjalan, untuk cek "403 di semua bot"
+
+def record_request_outcome(token, endpoint, channel, status=None, error=None):
+    """Mengumpankan hasil satu request Discord ke circuit breaker token & channel."""
+    if status == 401:
+        token_breakers.failure(token, "401 token tidak valid", fatal=True)
+        return
+    if endpoint not in BREAKER_ENDPOINTS or status == 429:
+        return
+    if error is not None or status >= 500:
+        reason = f"{type(error).__name__ if error is not None else status} pada {endpoint}"
+        if channel:
+            channel_breakers.failure(channel, reason)
+        else:
+            token_breakers.failure(token, reason)
+    elif status == 403:
+        # Token sah, hanya bot ini yang tidak punya izin di channel ini
+        token_breakers.success(token)
+        access_breakers.failure((channel, token), f"403 pada {endpoint}", fatal=True)
+        tokens = channel_token_sets.get(channel, ())
+        if tokens and all(access_breakers.state((channel, t)) != circuit_breaker.CLOSED for t in tokens):
+            channel_breakers.failure(channel, f"403 untuk semua {len(tokens)} bot", fatal=True)
+    elif status == 404:
+        token_breakers.success(token) # Token sah, channel-nya yang tidak ada
+        channel_breakers.failure(channel, f"404 pada {endpoint}", fatal=True)
+    elif status < 400:
+        token_breakers.success(token)
+        access_breakers.success((channel, token))
+        channel_breakers.success(channel)
+
+def healthy_tokens(tokens, channel_id=None):
+    """Token yang circuit-nya tertutup (token 401 & token tanpa akses ke channel_id tidak ikut)."""
+    return [token for token in tokens if token_breakers.state(token) == circuit_breaker.CLOSED
+            and (channel_id is None or access_breakers.state((channel_id, token)) == circuit_breaker.CLOSED)]
+
+def tokens_due_for_probe(tokens):
+    """Token dengan circuit terbuka yang jatuh tempo probe (izin probe langsung diambil)."""
+    return [token for token in tokens if token_breakers.state(token) != circuit_breaker.CLOSED and token_breakers.allow(token)]
+
+def probe_token(token, channel_name="Unknown"):
+    """Probe token setelah cool-off lewat GET /users/@me (tanpa cache); sukses mengembalikannya ke rotasi."""
+    log_message("Probe bot ...%s setelah cool-off.", "INFO", channel_name, token[-6:])
+    try:
+        response = discord_request('GET', "/users/@me", token, timeout=10)
+    except requests.exceptions.RequestException as e:
+        token_breakers.failure(token, f"probe gagal: {type(e).__name__}")
+        return False
+    if response.status_code == 200:
+        token_breakers.success(token)
+        return True
+    if response.status_code not in (401, 429): # 401 sudah dicatat record_request_outcome; 429 = probe diulang nanti
+        token_breakers.failure(token, f"probe gagal: {response.status_code}")
+    return False
+
+def pick_cycle_token(tokens, channel_id, channel_name="Unknown"):
+    """(token, probe_akses) untuk siklus ini. Bot yang jatuh tempo probe akses channel didahulukan
+    agar bisa kembali ke rotasi channel begitu izinnya pulih; selain itu acak dari token sehat.
+    (None, False) jika semua sedang cool-off."""
+    for token in tokens:
+        key = (channel_id, token)
+        if (token_breakers.state(token) == circuit_breaker.CLOSED
+                and access_breakers.state(key) != circuit_breaker.CLOSED and access_breakers.allow(key)):
+            log_message("Probe akses bot ...%s ke channel ini setelah cool-off.", "INFO", channel_name, token[-6:])
+            return token, True
+    healthy = healthy_tokens(tokens, channel_id)
+    return (random.choice(healthy), False) if healthy else (None, False)
+
+def metric_endpoint(method, path):
+    """(endpoint, channel_id) untuk label metrik, misal ('read', '123') untuk GET /channels/123/messages."""
+    parts = path.split("?", 1)[0].strip("/").split("/")
+    channel = parts[1] if len(parts) > 1 and parts[0] == "channels" else ""
+    tail = parts[2:] if channel else parts
+    if channel and tail[:1] == ["messages"]:
+        if method == 'GET': return "read", channel
+        if method == 'POST' and tail == ["messages"]: return "send", channel
+        if method == 'DELETE' or tail[-1:] == ["bulk-delete"]: return "delete", channel
+    if channel and tail == ["typing"]:
+        return "typing", channel
+    if channel and not tail:
+        return "channel_info", channel
+    return f"{method} {ratelimit.route_key(method, path).split(' ', 1)[1]}", channel
+
+def discord_request(method, path, token, **kwargs):
+    """Request ke Discord REST API lewat session token (path relatif, misal '/users/@me').
+
+    Menunggu bucket rate limit sebelum kirim, memperbarui bucket dari header respons,
+    dan mengirim ulang setelah retry_after jika tetap kena 429.
+    """
+    route = ratelimit.route_key(method, path)
+    endpoint, channel = metric_endpoint(method, path)
+    session = get_discord_session(token)
+    for attempt in range(discord_429_retries + 1):
+        waited = rate_limiter.acquire(token, route)
+        if waited > 0:
+            log_message("Rate limit bucket %s (Bot ...%s): menunggu %.2f detik.", "DEBUG", None, route, token[-6:], waited)
+            metric_ratelimit_wait.observe(waited, endpoint=endpoint)
+        request_start = time.perf_counter()
         try:
-            requests.post(url, headers=headers, timeout=3) # Timeout pendek
-        except Exception:
-            # log_message(f"Failed to send typing indicator (Bot ...{token[-6:]})", "DEBUG", channel_name) # Kurangi log noise
-            break # Hentikan jika ada error
-        time_left = end_time - time.time()
-        if time_left <= 0: break
-        # Discord expects typing events roughly every 8-9 seconds to keep the indicator active
-        time.sleep(min(8.5, max(0.5, time_left)))
+            response = session.request(method, f"{discord_api_base}{path}", **kwargs)
+        except requests.exceptions.RequestException as e:
+            record_request_outcome(token, endpoint, channel, error=e)
+            raise
+        metric_discord_latency.observe(time.perf_counter() - request_start, endpoint=endpoint, channel=channel)
+        metric_discord_responses.inc(endpoint=endpoint, status=response.status_code)
+        record_request_outcome(token, endpoint, channel, response.status_code)
+        rate_limiter.update(token, route, response)
+        if response.status_code == 429 and is_slowmode_429(response):
+            channel_match = re.match(r"/channels/(\d+)", path)
+            if channel_match: # Slow mode channel berubah, metadata cache sudah basi
+                channel_cache.invalidate(channel_match.group(1))
+        if response.status_code != 429 or attempt == discord_429_retries:
+            return response
+        log_message("429 pada %s (Bot ...%s), kirim ulang setelah %.2f detik.", "WARNING", None, route, token[-6:], rate_limiter.retry_after(response))
+    return response
+
+def gemini_request(model, api_key, payload, timeout=30):
+    """Request generateContent ke Gemini lewat session bersama."""
+    url = f"{gemini_api_base}/models/{model}:generateContent"
+    return get_gemini_session().post(url, params={'key': api_key}, json=payload, timeout=timeout)
+
+def send_typing(channel_id, token):
+    """Mengirim satu typing indicator (best effort)."""
+    discord_request('POST', f"/channels/{channel_id}/typing", token, timeout=3) # Timeout pendek
+
+# Satu layanan typing untuk semua channel (refresh tiap ~8.5 detik, tanpa thread per balasan)
+typing_service = TypingService(send_typing, workers=typing_workers)
+
+def trigger_typing(channel_id, token, duration=5, channel_name="Unknown"):
+    """Menampilkan typing indicator selama duration detik (non-blocking)."""
+    log_message("Sending typing indicator for %ss (Bot ...%s)", "DEBUG", channel_name, duration, token[-6:])
+    typing_service.start(channel_id, token, duration)
+
+def on_api_key_cooldown(api_key, until):
+    persist_state("api_key_cooldown", secret_fingerprint(api_key), {"until": until})
+    coordinator.report_key_cooldown(api_key, until)
+
+api_key_registry = ApiKeyRegistry(
+    google_api_keys, rpm_limit=api_key_rpm, default_cooldown=api_key_cooldown,
+    max_cooldown=api_key_max_cooldown, on_cooldown=on_api_key_cooldown
+)
+
+api_key_fingerprints = {secret_fingerprint(key): key for key in google_api_keys}
+shared_cooldown_sync = {"next": 0.0}
+
+def sync_shared_key_cooldowns():
+    """Menyalin cooldown key dari shard lain (maks sekali per detik)."""
+    now = time.monotonic()
+    if coordinator.name == "local" or now < shared_cooldown_sync["next"]:
+        return
+    shared_cooldown_sync["next"] = now + 1.0
+    for fingerprint, until in coordinator.key_cooldowns().items():
+        if fingerprint in api_key_fingerprints:
+            api_key_registry.restore_cooldown(api_key_fingerprints[fingerprint], until)
 
 def get_random_api_key(channel_name="Unknown"):
-    """Memilih Google API Key acak yang belum rate limited."""
-    global used_api_keys
-    with api_key_lock: # Pastikan akses thread-safe ke used_api_keys
-        available_keys = [key for key in google_api_keys if key not in used_api_keys]
-        if not available_keys:
-            if not google_api_keys: # Jika memang tidak ada key sama sekali
-                # log_message("Tidak ada Google API Key yang dikonfigurasi.", "ERROR", channel_name) # Sudah di log di tempat lain
-                return None
-            # Jika semua key sudah digunakan/rate limited
-            log_message(f"Semua {len(used_api_keys)} Google API key rate limited. Menunggu cooldown {cooldown_time} detik...", "ERROR", channel_name)
-            # Tunggu di luar lock agar tidak memblok thread lain yang mungkin masih punya key
-            time.sleep(cooldown_time)
-            # Setelah cooldown, reset set used_api_keys (masih di dalam lock)
-            used_api_keys.clear()
-            log_message("Cooldown selesai, mencoba lagi mendapatkan API key...", "INFO", channel_name)
-            # Coba lagi ambil key setelah reset
-            available_keys = [key for key in google_api_keys if key not in used_api_keys]
-            if not available_keys: # Jika masih kosong setelah reset (jarang terjadi)
-                 log_message("Masih tidak ada API key tersedia setelah cooldown.", "ERROR", channel_name)
-                 return None
-
-        selected_key = random.choice(available_keys)
-        log_message(f"Menggunakan Google API Key: ...{selected_key[-6:]}", "DEBUG", channel_name)
-        return selected_key
-
-def mark_api_key_used(api_key):
-    """Menandai API Key sebagai rate limited."""
-    global used_api_keys
-    with api_key_lock:
-        used_api_keys.add(api_key)
-
-def get_random_message_from_file(channel_name="Unknown"):
-    """Mengambil pesan acak dari pesan.txt."""
-    try:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        file_path = os.path.join(script_dir, "pesan.txt")
-        if not os.path.exists(file_path):
-            with open(file_path, "w", encoding="utf-8") as f:
+    """Memilih Google API Key acak yang sedang sehat (menunggu maks GEMINI_KEY_WAIT detik)."""
+    if not google_api_keys: # Jika memang tidak ada key sama sekali
+        return None
+    sync_shared_key_cooldowns()
+    selected_key = api_key_registry.acquire(timeout=0)
+    if not selected_key:
+        wait = api_key_registry.next_available_in()
+        log_message(f"Semua {len(google_api_keys)} Google API key sedang cooldown/limit RPM. Key berikutnya siap dalam {wait:.1f} detik.", "WARNING", channel_name)
+        selected_key = api_key_registry.acquire(timeout=api_key_wait) # Menunggu tanpa memegang lock
+        if not selected_key:
+            log_message(f"Tidak ada API key sehat dalam {api_key_wait:.0f} detik. Balasan AI dilewati.", "ERROR", channel_name)
+            return None
+    log_message("Menggunakan Google API Key: ...%s", "DEBUG", channel_name, selected_key[-6:])
+    return selected_key
+
+def mark_api_key_used(api_key, retry_after=None, channel_name="Unknown"):
+    """Menandai API Key kena rate limit selama retry_after detik (atau cooldown bawaan)."""
+    cooldown = api_key_registry.report_rate_limited(api_key, retry_after)
+    log_message("API Key ...%s cooldown %.1f detik.", "DEBUG", channel_name, api_key[-6:], cooldown)
+
+def get_message_file(path, channel_name="Unknown"):
+    """MessageFile untuk path ini (panggil dengan message_pool_lock); pesan.txt dibuat sekali jika belum ada."""
+    message_file = message_pool_files.get(path)
+    if message_file is None:
+        if path == os.path.join(script_dir, "pesan.txt") and not os.path.exists(path):
+            with open(path, "w", encoding="utf-8") as f:
                 f.write("# Isi pesan di sini, satu per baris\n")
+                f.write("# Bobot opsional di depan pesan, misal: [3] Halo semua!\n")
                 f.write("Halo!\n")
                 f.write("Semangat ya hari ini!\n")
             log_message("File pesan.txt dibuat karena tidak ada. Silakan isi pesan.", "INFO", channel_name)
-            return "Halo!" # Kembalikan pesan default jika file baru dibuat
+        message_file = message_pool_files[path] = MessageFile(path, message_pool_check_interval)
+    return message_file
 
-        with open(file_path, "r", encoding="utf-8") as file:
-            messages = [line.strip() for line in file.readlines() if line.strip() and not line.startswith("#")]
-            if messages:
-                return random.choice(messages)
-            else:
-                log_message("File pesan.txt kosong atau hanya berisi komentar.", "WARNING", channel_name)
-                return None # Kembalikan None jika tidak ada pesan valid
+def get_random_message_from_file(channel_name="Unknown", channel_id=None, files=None):
+    """Mengambil pesan acak (berbobot, tanpa pengulangan) dari pesan.txt atau daftar file channel."""
+    names = tuple(files or ("pesan.txt",))
+    try:
+        sampler_key = (channel_id or channel_name, names)
+        sampler = message_samplers.get(sampler_key)
+        if sampler is None:
+            with message_pool_lock:
+                sampler = message_samplers.get(sampler_key)
+                if sampler is None:
+                    pool_files = [get_message_file(os.path.join(script_dir, name), channel_name) for name in names]
+                    sampler = message_samplers[sampler_key] = MessageSampler(pool_files)
+        message = sampler.next() # Lock per sampler; stat/muat ulang file tidak menahan channel lain
+        if message is None:
+            log_message(f"File pesan ({', '.join(os.path.basename(name) for name in names)}) kosong atau hanya berisi komentar.", "WARNING", channel_name)
+        return message
     except Exception as e:
-        log_message(f"Error membaca pesan.txt: {e}", "ERROR", channel_name)
+        log_message(f"Error membaca file pesan: {e}", "ERROR", channel_name)
         return None
 
 def generate_language_specific_prompt(user_message, prompt_language):
@@ -162,23 +556,47 @@ def generate_language_specific_prompt(user_message, prompt_language):
         return f"Kamu adalah teman ngobrol santai di Discord. Balas pesan ini dalam Bahasa Indonesia informal, gaul, dan natural, *cukup satu kalimat pendek saja*. Jangan pernah mengaku sebagai AI atau model bahasa. Pesan dari user: \"{user_message}\""
 
 
-def generate_reply(prompt_content, prompt_language, use_google_ai=True, channel_name="Unknown"):
-    """Menghasilkan balasan (AI atau File)."""
+response_cache = ResponseCache(
+    max_entries=response_cache_size, ttl=response_cache_ttl,
+    candidates_per_key=response_cache_candidates, path=response_cache_file
+) if response_cache_size > 0 else None
+
+generation_service = GenerationService(workers=gemini_workers, max_queue=generation_queue_size, max_age=generation_max_age)
+
+def generate_reply(prompt_content, prompt_language, use_google_ai=True, channel_name="Unknown", trace=tracing.NOOP_SPAN):
+    """Menghasilkan balasan (AI atau File). `trace` = span siklus channel yang meminta balasan ini."""
+    with trace.child("generate_reply", ai=use_google_ai, language=prompt_language) as span:
+        text = _generate_reply(prompt_content, prompt_language, use_google_ai, channel_name, span)
+        span.set(ok=bool(text))
+        return text
+
+def _generate_reply(prompt_content, prompt_language, use_google_ai, channel_name, span):
     global last_generated_text # last_generated_text mungkin kurang berguna di multi-channel
 
     if use_google_ai:
-        api_key = get_random_api_key(channel_name)
-        if not api_key:
-            log_message("Tidak ada Google API Key valid tersedia untuk AI.", "ERROR", channel_name)
-            return None # Gagal mendapatkan key
-
         ai_prompt = generate_language_specific_prompt(prompt_content, prompt_language)
         if not ai_prompt:
              log_message("Prompt AI tidak dapat dibuat (mungkin pesan asli kosong?).", "WARNING", channel_name)
              return None
 
-        url = f'https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={api_key}'
-        headers = {'Content-Type': 'application/json'}
+        # Cache dicek sebelum mengambil key: cache hit tidak memakai slot RPM dan tidak menunggu key cooldown
+        cache_key = None
+        if response_cache:
+            cache_key = ResponseCache.make_key(ai_prompt, prompt_language)
+            cached_text = response_cache.get(cache_key)
+            if cached_text:
+                metric_gemini_results.inc(result="cache_hit")
+                span.set(cache_hit=True)
+                log_message("Balasan diambil dari cache: \"%.60s...\"", "DEBUG", channel_name, cached_text)
+                return cached_text
+
+        with span.child("get_api_key"):
+            api_key = get_random_api_key(channel_name)
+        if not api_key:
+            log_message("Tidak ada Google API Key valid tersedia untuk AI.", "ERROR", channel_name)
+            metric_gemini_results.inc(result="no_key")
+            return None # Gagal mendapatkan key
+
         # Menambahkan konfigurasi keamanan dasar untuk Gemini (opsional)
         safety_settings = [
             {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
@@ -194,16 +612,22 @@ def generate_reply(prompt_content, prompt_language, use_google_ai=True, channel_
 
         for attempt in range(retries + 1): # Coba sekali + retries
             try:
-                response = requests.post(url, headers=headers, json=data, timeout=30)
+                request_start = time.perf_counter()
+                with span.child("gemini_request", attempt=attempt + 1, key=api_key[-6:]) as request_span:
+                    response = gemini_request('gemini-1.5-flash', api_key, data, timeout=30)
+                    request_span.set(status=response.status_code)
+                metric_gemini_latency.observe(time.perf_counter() - request_start)
 
                 if response.status_code == 429:
+                    metric_gemini_results.inc(result="rate_limited")
                     log_message(f"API Key ...{api_key[-6:]} rate limit (Attempt {attempt+1}). Menandai dan coba key lain.", "WARNING", channel_name)
-                    mark_api_key_used(api_key) # Tandai key ini sudah kena limit
+                    mark_api_key_used(api_key, parse_retry_after(response), channel_name) # Cooldown sesuai info server
                     if attempt < retries:
-                        new_api_key = get_random_api_key(channel_name) # Coba dapatkan key baru
+                        with span.child("get_api_key", retry=True):
+                            new_api_key = get_random_api_key(channel_name) # Coba dapatkan key baru
                         if not new_api_key: return None # Jika tidak ada lagi key
+                        span.event("key_swap", old=api_key[-6:], new=new_api_key[-6:])
                         api_key = new_api_key # Update api_key untuk log dan retry berikutnya
-                        url = f'https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key={api_key}'
                         continue # Coba lagi dengan key baru
                     else:
                         log_message("Semua percobaan gagal karena rate limit.", "ERROR", channel_name)
@@ -211,6 +635,7 @@ def generate_reply(prompt_content, prompt_language, use_google_ai=True, channel_
 
                 # Cek jika respons diblokir karena safety settings
                 if response.status_code == 200:
+                    api_key_registry.report_success(api_key)
                     result = response.json()
                     if not result.get('candidates'):
                          # Cek promptFeedback untuk alasan blokir
@@ -218,6 +643,7 @@ def generate_reply(prompt_content, prompt_language, use_google_ai=True, channel_
                          block_reason = feedback.get('blockReason', 'UNKNOWN')
                          safety_ratings = feedback.get('safetyRatings', [])
                          log_message(f"Respons AI diblokir (Key: ...{api_key[-6:]}). Alasan: {block_reason}. Ratings: {safety_ratings}", "WARNING", channel_name)
+                         metric_gemini_results.inc(result="blocked")
                          # Jangan retry jika diblokir, anggap gagal
                          return None # Atau kembalikan pesan default
 
@@ -242,13 +668,17 @@ def generate_reply(prompt_content, prompt_language, use_google_ai=True, channel_
                     # Bisa dianggap gagal atau coba lagi
                     continue
 
-                log_message(f"AI Generated (Key ...{api_key[-6:]}): \"{generated_text[:60]}...\"", "DEBUG", channel_name)
+                log_message("AI Generated (Key ...%s): \"%.60s...\"", "DEBUG", channel_name, api_key[-6:], generated_text)
+                metric_gemini_results.inc(result="ok")
+                if cache_key:
+                    response_cache.put(cache_key, generated_text)
                 return generated_text # Berhasil
 
             except requests.exceptions.RequestException as e:
                 log_message(f"Error request Google API (Key: ...{api_key[-6:]}, Attempt {attempt+1}): {e}", "ERROR", channel_name)
                 if attempt < retries:
-                    time.sleep(2 + attempt) # Backoff sebelum retry
+                    with span.child("retry_backoff", seconds=2 + attempt):
+                        time.sleep(2 + attempt) # Backoff sebelum retry
                 else:
                     log_message("Gagal request Google API setelah retry.", "ERROR", channel_name)
                     return None # Gagal setelah retry
@@ -258,18 +688,60 @@ def generate_reply(prompt_content, prompt_language, use_google_ai=True, channel_
                 return None # Gagal karena error tak terduga
 
         log_message("Gagal menghasilkan balasan AI setelah semua percobaan.", "ERROR", channel_name)
+        metric_gemini_results.inc(result="error")
         return None
     else: # Mode File
         return get_random_message_from_file(channel_name)
 
-def get_channel_info(channel_id, token):
-    """Mengambil info channel (nama, server). Best effort."""
-    headers = get_auth_header(token)
-    url = f"https://discord.com/api/v10/channels/{channel_id}"
+def is_slowmode_429(response):
+    """True jika 429 disebabkan slow mode channel (kode error Discord 20016)."""
     try:
-        response = requests.get(url, headers=headers, timeout=7)
+        return response.json().get('code') == 20016
+    except Exception:
+        return False
+
+# --- Cache Metadata Channel ---
+class ChannelCache:
+    """Cache objek GET /channels/{id} per channel ID dengan TTL dan penghitung hit/miss."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {} # {channel_id: (expires_at, data)}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, channel_id, token, timeout=7):
+        """Mengambil metadata channel dari cache, atau dari API jika kosong/kedaluwarsa (raise HTTPError)."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(channel_id)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        response = discord_request('GET', f"/channels/{channel_id}", token, timeout=timeout)
         response.raise_for_status()
         data = response.json()
+        with self.lock:
+            self.entries[channel_id] = (time.monotonic() + self.ttl, data)
+        return data
+
+    def invalidate(self, channel_id):
+        with self.lock:
+            self.entries.pop(str(channel_id), None)
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0, "size": len(self.entries)}
+
+channel_cache = ChannelCache(channel_cache_ttl)
+
+def get_channel_info(channel_id, token):
+    """Mengambil info channel (nama, server). Best effort."""
+    try:
+        data = channel_cache.get(channel_id, token, timeout=7)
         name = data.get('name', f'Unknown Channel ({channel_id})')
         guild_id = data.get('guild_id')
         server = "Direct Message" if not guild_id else f"Server ({guild_id})" # Tidak perlu ambil nama guild
@@ -290,10 +762,8 @@ def get_channel_info(channel_id, token):
 
 def get_bot_info(token):
     """Mengambil info bot (username, ID)."""
-    headers = get_auth_header(token)
-    url = "https://discord.com/api/v10/users/@me"
     try:
-        response = requests.get(url, headers=headers, timeout=7)
+        response = discord_request('GET', "/users/@me", token, timeout=7)
         response.raise_for_status()
         data = response.json()
         username = data.get("username", "Unknown")
@@ -311,19 +781,143 @@ def get_bot_info(token):
         logging.error(f"Error get_bot_info (...{token[-6:]}): {e}")
         return "Error Getting Info", "Unknown"
 
-def delayed_delete(channel_id, message_id, delay, token, channel_name="Unknown"):
-    """Menunda penghapusan pesan."""
-    if delay > 0:
-        log_message(f"Menunggu {delay} detik untuk hapus pesan {message_id}...", "DEBUG", channel_name)
-        time.sleep(delay)
-    delete_message(channel_id, message_id, token, channel_name)
+def get_bot_guilds(token):
+    """Set ID server yang diikuti bot (GET /users/@me/guilds, 200 per halaman). None jika gagal."""
+    guild_ids, after = set(), None
+    try:
+        while True:
+            params = {"limit": 200, "after": after} if after else {"limit": 200}
+            response = discord_request('GET', "/users/@me/guilds", token, params=params, timeout=7)
+            response.raise_for_status()
+            page = response.json()
+            guild_ids.update(guild["id"] for guild in page)
+            if len(page) < 200:
+                return guild_ids
+            after = page[-1]["id"]
+    except Exception as e:
+        logging.warning(f"Gagal mengambil daftar server (...{token[-6:]}): {e}")
+        return None
+
+def verify_tokens(tokens):
+    """Verifikasi semua token secara paralel (maks startup_workers bersamaan).
+
+    Mengembalikan [(nomor, token, info atau None)] sesuai urutan token; info berisi
+    display_name, bot_id dan guild_ids (None jika daftar server gagal diambil).
+    """
+    def check(index, token):
+        display_name, bot_id = get_bot_info(token)
+        if bot_id == "Unknown" or display_name == "Invalid Token?":
+            return index, token, None
+        return index, token, {"display_name": display_name, "bot_id": bot_id, "guild_ids": get_bot_guilds(token)}
+
+    with ThreadPoolExecutor(max_workers=startup_workers, thread_name_prefix="Startup") as executor:
+        return list(executor.map(check, range(1, len(tokens) + 1), tokens))
+
+# Status sel matriks akses
+ACCESS_OK = "OK"        # GET /channels berhasil dengan token ini
+ACCESS_MEMBER = "G"     # Tidak dicek, tapi bot anggota server channel ini
+ACCESS_NONE = "-"       # Bot bukan anggota server channel ini
+ACCESS_DENIED = "X"     # GET /channels gagal dengan token ini
+ACCESS_UNKNOWN = "?"    # Tidak dicek dan daftar server tidak tersedia
+
+def verify_channel_access(channel_ids, valid_tokens_info):
+    """Cek akses semua channel secara paralel; satu probe sukses per channel sudah cukup.
+
+    Setelah satu bot berhasil membaca channel, akses bot lain disimpulkan dari daftar server
+    mereka (get_bot_guilds) tanpa request tambahan. Mengembalikan
+    {channel_id: {"accessible", "server", "name", "guild_id", "access": {token: status}}}.
+    """
+    def probe(position, channel_id):
+        # Mulai dari bot yang berbeda per channel agar bucket rate limit tersebar
+        start = position % len(valid_tokens_info)
+        order = valid_tokens_info[start:] + valid_tokens_info[:start]
+        access = {}
+        for _, token, _ in order:
+            try:
+                data = channel_cache.get(channel_id, token, timeout=7)
+            except requests.exceptions.HTTPError as http_err:
+                access[token] = ACCESS_DENIED
+                if http_err.response.status_code == 404:
+                    break # Channel tidak ada, bot lain tidak perlu dicoba
+                continue
+            except requests.exceptions.RequestException:
+                access[token] = ACCESS_DENIED
+                continue
+            access[token] = ACCESS_OK
+            guild_id = data.get('guild_id')
+            for _, other_token, other_info in valid_tokens_info:
+                if other_token not in access:
+                    guild_ids = other_info.get("guild_ids")
+                    if guild_ids is None or not guild_id:
+                        access[other_token] = ACCESS_UNKNOWN
+                    else:
+                        access[other_token] = ACCESS_MEMBER if guild_id in guild_ids else ACCESS_NONE
+            return channel_id, {
+                "accessible": True,
+                "server": "Direct Message" if not guild_id else f"Server ({guild_id})",
+                "name": data.get('name', f'Unknown Channel ({channel_id})'),
+                "guild_id": guild_id,
+                "access": access,
+            }
+        for _, token, _ in valid_tokens_info:
+            access.setdefault(token, ACCESS_UNKNOWN)
+        return channel_id, {"accessible": False, "server": "Unknown Server", "name": f"Unknown Channel ({channel_id})", "guild_id": None, "access": access}
+
+    with ThreadPoolExecutor(max_workers=startup_workers, thread_name_prefix="Startup") as executor:
+        return dict(executor.map(probe, range(len(channel_ids)), channel_ids))
+
+def log_access_matrix(access_results, valid_tokens_info):
+    """Mencetak matriks akses channel x bot."""
+    header = "".join(f"#{idx:<4}" for idx, _, _ in valid_tokens_info)
+    lines = [f"{'Channel':<40} {header}"]
+    for channel_id, result in access_results.items():
+        label = f"{result['name'][:20]} ({channel_id})"
+        cells = "".join(f"{result['access'][token]:<5}" for _, token, _ in valid_tokens_info)
+        lines.append(f"{label:<40} {cells}")
+    log_message("Matriks akses (OK = dicek, G = anggota server, - = bukan anggota, X = ditolak, ? = tidak diketahui):\n" + "\n".join(lines), "INFO")
+
+def bulk_delete_messages(channel_id, message_ids, token, channel_name="Unknown"):
+    """Menghapus 2-100 pesan sekaligus (hanya token bot). True jika berhasil."""
+    if not use_bot_token:
+        return False # Endpoint bulk-delete tidak tersedia untuk akun user
+    try:
+        response = discord_request('POST', f"/channels/{channel_id}/messages/bulk-delete", token, json={"messages": list(message_ids)}, timeout=15)
+        if response.status_code == 204:
+            log_message(f"{len(message_ids)} pesan berhasil dihapus sekaligus (Bot ...{token[-6:]}).", "INFO", channel_name)
+            return True
+        log_message(f"Bulk delete gagal (Bot ...{token[-6:]}). Status: {response.status_code}. Menghapus satu per satu...", "WARNING", channel_name)
+    except requests.exceptions.RequestException as e:
+        log_message(f"Error koneksi saat bulk delete (Bot ...{token[-6:]}): {e}", "ERROR", channel_name)
+    return False
+
+def on_delete_done(channel_id, message_id):
+    forget_state("pending_delete", f"{channel_id}:{message_id}")
+
+def schedule_delete(channel_id, message_id, token, delete_after, delete_immediately=False, channel_name="Unknown"):
+    """Menjadwalkan penghapusan pesan bot (dicatat ke state store agar selamat dari restart)."""
+    try:
+        delete_delay = int(delete_after)
+    except (ValueError, TypeError):
+        log_message(f"Nilai delete_after ({delete_after}) tidak valid untuk pesan {message_id}. Tidak dihapus.", "WARNING", channel_name)
+        return
+    if delete_immediately or delete_delay == 0:
+        delete_delay = 0
+        log_message(f"Menjadwalkan penghapusan segera untuk pesan {message_id}.", "INFO", channel_name)
+    elif delete_delay > 0:
+        log_message(f"Menjadwalkan penghapusan pesan {message_id} dalam {delete_delay} detik.", "INFO", channel_name)
+    else:
+        return
+    due_at = time.time() + delete_delay
+    persist_state("pending_delete", f"{channel_id}:{message_id}", {
+        "channel_id": channel_id, "message_id": message_id, "token": secret_fingerprint(token),
+        "due_at": due_at, "channel_name": channel_name,
+    })
+    delete_scheduler.schedule(channel_id, message_id, token, due_at, channel_name)
 
 def delete_message(channel_id, message_id, token, channel_name="Unknown"):
     """Menghapus pesan (best effort)."""
-    headers = get_auth_header(token)
-    url = f'https://discord.com/api/v10/channels/{channel_id}/messages/{message_id}'
     try:
-        response = requests.delete(url, headers=headers, timeout=10)
+        response = discord_request('DELETE', f"/channels/{channel_id}/messages/{message_id}", token, timeout=10)
         if response.status_code == 204:
             log_message(f"Pesan {message_id} berhasil dihapus (Bot ...{token[-6:]}).", "INFO", channel_name)
         elif response.status_code == 403:
@@ -338,68 +932,64 @@ def delete_message(channel_id, message_id, token, channel_name="Unknown"):
         log_message(f"Error tak terduga saat hapus {message_id} (Bot ...{token[-6:]}): {e}", "ERROR", channel_name)
 
 
+# Satu penjadwal (timer heap) untuk semua penghapusan tertunda
+delete_scheduler = DeleteScheduler(
+    delete_message, bulk_delete_messages, on_done=on_delete_done,
+    batch_window=delete_batch_window, workers=delete_workers
+)
+
 def send_message(channel_id, message_text, token, reply_to=None, delete_after=None, delete_immediately=False, channel_name="Unknown"):
-    """Mengirim pesan ke channel."""
+    """Mengirim pesan ke channel (dijalankan thread antrean kirim token, lihat queue_message).
+
+    Raise RetryLater jika tetap kena 429 agar antrean mengirim ulang setelah retry_after.
+    """
     if not message_text or not isinstance(message_text, str) or not message_text.strip():
         log_message("Pesan kosong atau tidak valid, tidak dikirim.", "WARNING", channel_name)
+        typing_service.cancel(channel_id)
         return False # Gagal karena pesan tidak valid
 
-    headers = get_auth_header(token)
     payload = {'content': message_text[:2000]} # Batasi panjang pesan
     if reply_to:
         payload["message_reference"] = {"message_id": str(reply_to), "fail_if_not_exists": False}
-        log_message(f"Menyiapkan pesan sebagai balasan ke {reply_to} (Bot ...{token[-6:]})", "DEBUG", channel_name)
+        log_message("Menyiapkan pesan sebagai balasan ke %s (Bot ...%s)", "DEBUG", channel_name, reply_to, token[-6:])
     else:
-        log_message(f"Menyiapkan pesan biasa (Bot ...{token[-6:]})", "DEBUG", channel_name)
+        log_message("Menyiapkan pesan biasa (Bot ...%s)", "DEBUG", channel_name, token[-6:])
 
 
-    url = f"https://discord.com/api/v10/channels/{channel_id}/messages"
+    path = f"/channels/{channel_id}/messages"
     try:
-        response = requests.post(url, json=payload, headers=headers, timeout=15)
+        response = discord_request('POST', path, token, json=payload, timeout=15)
+        typing_service.cancel(channel_id) # Pesan sudah terkirim/ditolak, typing tidak perlu di-refresh lagi
 
         if response.status_code in [200, 201]: # 200 OK atau 201 Created (jarang)
             data = response.json()
             message_id = data.get("id")
-            log_message(f"Pesan terkirim (ID: {message_id}, Bot ...{token[-6:]}): \"{message_text[:50]}...\"", "SUCCESS", channel_name)
+            log_message("Pesan terkirim (ID: %s, Bot ...%s): \"%.50s...\"", "SUCCESS", channel_name, message_id, token[-6:], message_text)
 
             # Handle penghapusan setelah kirim
             if message_id and delete_after is not None:
-                try:
-                    delete_delay = int(delete_after)
-                    if delete_immediately or delete_delay == 0:
-                         log_message(f"Menjadwalkan penghapusan segera untuk pesan {message_id}.", "INFO", channel_name)
-                         threading.Thread(target=delete_message, args=(channel_id, message_id, token, channel_name), daemon=True, name=f"Delete-{message_id[:5]}").start()
-                    elif delete_delay > 0:
-                         log_message(f"Menjadwalkan penghapusan pesan {message_id} dalam {delete_delay} detik.", "INFO", channel_name)
-                         threading.Thread(target=delayed_delete, args=(channel_id, message_id, delete_delay, token, channel_name), daemon=True, name=f"DelayedDelete-{message_id[:5]}").start()
-                except (ValueError, TypeError):
-                    log_message(f"Nilai delete_after ({delete_after}) tidak valid untuk pesan {message_id}. Tidak dihapus.", "WARNING", channel_name)
+                schedule_delete(channel_id, message_id, token, delete_after, delete_immediately, channel_name)
             return True # Sukses mengirim
 
         elif response.status_code == 403:
             log_message(f"Gagal kirim (Bot ...{token[-6:]}): Tidak punya izin kirim pesan (403).", "ERROR", channel_name)
         elif response.status_code == 429: # Rate Limit
-            retry_after = response.json().get('retry_after', 5) # Ambil waktu tunggu dari Discord
-            log_message(f"Rate limit Discord saat kirim (Bot ...{token[-6:]})! Menunggu {retry_after:.2f} detik...", "ERROR", channel_name)
-            time.sleep(retry_after + 0.5) # Tunggu sesuai instruksi + buffer
+            # Sudah dicoba ulang di discord_request; bucket tercatat sehingga request berikutnya menunggu otomatis
+            retry_after = rate_limiter.retry_after(response)
+            log_message(f"Rate limit Discord saat kirim (Bot ...{token[-6:]})! Dikirim ulang dari antrean dalam {retry_after:.2f} detik.", "WARNING", channel_name)
+            raise RetryLater(retry_after)
         elif response.status_code == 400 and "message_reference" in str(response.content): # Cek jika error karena reference
              log_message(f"Gagal kirim (Bot ...{token[-6:]}): Pesan yang direply tidak ditemukan (400 Bad Request). Mengirim tanpa reply...", "WARNING", channel_name)
              # Coba kirim lagi tanpa reply
              del payload["message_reference"]
-             response_noreply = requests.post(url, json=payload, headers=headers, timeout=15)
+             response_noreply = discord_request('POST', path, token, json=payload, timeout=15)
              if response_noreply.status_code in [200, 201]:
                  log_message(f"Pesan berhasil dikirim tanpa reply (Bot ...{token[-6:]}).", "SUCCESS", channel_name)
                  # Handle delete lagi jika perlu
                  data_noreply = response_noreply.json()
                  message_id_noreply = data_noreply.get("id")
                  if message_id_noreply and delete_after is not None:
-                    try:
-                        delete_delay = int(delete_after)
-                        if delete_immediately or delete_delay == 0:
-                             threading.Thread(target=delete_message, args=(channel_id, message_id_noreply, token, channel_name), daemon=True, name=f"Delete-{message_id_noreply[:5]}").start()
-                        elif delete_delay > 0:
-                             threading.Thread(target=delayed_delete, args=(channel_id, message_id_noreply, delete_delay, token, channel_name), daemon=True, name=f"DelayedDelete-{message_id_noreply[:5]}").start()
-                    except (ValueError, TypeError): pass # Log sudah ada sebelumnya
+                    schedule_delete(channel_id, message_id_noreply, token, delete_after, delete_immediately, channel_name)
                  return True
              else:
                  log_message(f"Gagal kirim ulang tanpa reply (Bot ...{token[-6:]}). Status: {response_noreply.status_code}", "ERROR", channel_name)
@@ -410,7 +1000,10 @@ def send_message(channel_id, message_text, token, reply_to=None, delete_after=No
             log_message(f"Gagal kirim pesan (Bot ...{token[-6:]}). Status: {response.status_code}, Respons: {response.text[:100]}", "ERROR", channel_name)
         return False # Gagal mengirim
 
+    except RetryLater:
+        raise # Diteruskan ke antrean kirim agar pesan dikirim ulang setelah retry_after
     except requests.exceptions.RequestException as e:
+        typing_service.cancel(channel_id)
         log_message(f"Error koneksi saat kirim pesan (Bot ...{token[-6:]}): {e}", "ERROR", channel_name)
         return False # Gagal mengirim
     except Exception as e:
@@ -418,57 +1011,622 @@ def send_message(channel_id, message_text, token, reply_to=None, delete_after=No
         logging.error(traceback.format_exc())
         return False
 
+send_queue = SendQueue(max_age=send_queue_max_age, on_wait=metric_send_queue_wait.observe)
+
+def record_channel_action(channel_id, channel_name="Unknown"):
+    """Mencatat waktu aksi terakhir channel (dasar perhitungan slow mode)."""
+    with channel_data_lock:
+        channel_last_action_times[channel_id] = time.time()
+    persist_state("last_action", channel_id, channel_last_action_times[channel_id])
+    log_message("Waktu aksi terakhir di channel ini diperbarui.", "DEBUG", channel_name)
+
+def queue_message(channel_id, message_text, token, reply_to=None, delete_after=None, delete_immediately=False,
+                  channel_name="Unknown", priority=PRIORITY_POST, trace=tracing.NOOP_SPAN):
+    """Memasukkan pesan ke antrean kirim token. Mengembalikan Future (True jika terkirim)."""
+    def deliver(): # Satu span per percobaan kirim, termasuk kirim ulang setelah 429
+        with trace.child("discord_send", bot=token[-6:], reply=bool(reply_to)):
+            return send_message(channel_id, message_text, token, reply_to=reply_to, delete_after=delete_after,
+                                delete_immediately=delete_immediately, channel_name=channel_name)
+    future = send_queue.submit(token, channel_id, deliver, priority=priority)
+
+    def on_done(done):
+        if done.exception() is not None:
+            typing_service.cancel(channel_id)
+            log_message(f"Pesan tidak terkirim: {done.exception()}", "WARNING", channel_name)
+        elif done.result():
+            record_channel_action(channel_id, channel_name)
+    future.add_done_callback(on_done)
+    return future
+
 def get_slow_mode_delay(channel_id, token, channel_name="Unknown"):
     """Mendapatkan delay slow mode channel (best effort)."""
-    headers = get_auth_header(token)
-    url = f"https://discord.com/api/v10/channels/{channel_id}"
     try:
-        response = requests.get(url, headers=headers, timeout=5)
-        response.raise_for_status()
-        delay = response.json().get("rate_limit_per_user", 0)
+        delay = channel_cache.get(channel_id, token, timeout=5).get("rate_limit_per_user", 0)
         if delay > 0:
-             log_message(f"Slow mode aktif: {delay} detik.", "DEBUG", channel_name)
+             log_message("Slow mode aktif: %s detik.", "DEBUG", channel_name, delay)
         return delay
     except Exception:
         return 0 # Anggap 0 jika gagal cek
 
+# --- Intake Pesan via Gateway ---
+gateway_intake = gateway.GatewayIntake(gateway_url, gateway_buffer_size)
+
+def get_recent_messages(channel_id, token, limit=1):
+    """Mengambil pesan terbaru di channel (raise HTTPError jika gagal)."""
+    response = discord_request('GET', f"/channels/{channel_id}/messages", token, params={'limit': limit}, timeout=10)
+    response.raise_for_status()
+    return response.json()
+
+def get_messages_after(channel_id, token, after_id, max_pages=5):
+    """Mengambil pesan setelah snowflake after_id (100 per halaman, maks max_pages halaman)."""
+    collected = []
+    for _ in range(max_pages):
+        response = discord_request('GET', f"/channels/{channel_id}/messages", token, params={'after': after_id, 'limit': 100}, timeout=10)
+        response.raise_for_status()
+        page = sorted(response.json(), key=lambda m: int(m.get('id', 0)))
+        collected.extend(page)
+        if len(page) < 100: # Halaman terakhir
+            break
+        after_id = page[-1]['id']
+    return collected
+
+def mentions_managed_bot(msg, bot_ids_in_channel):
+    """True jika pesan me-mention atau me-reply salah satu bot terkelola."""
+    if any(user.get('id') in bot_ids_in_channel for user in msg.get('mentions') or []):
+        return True
+    referenced = msg.get('referenced_message') or {}
+    return (referenced.get('author') or {}).get('id') in bot_ids_in_channel
+
+# --- Pelacak ID Pesan yang Sudah Diproses ---
+class ProcessedTracker:
+    """ID pesan yang sudah diproses untuk SATU channel: watermark + min-heap ID terbaru.
+
+    Snowflake Discord naik seiring waktu, jadi ID yang dikeluarkan dari heap (ID terkecil dulu,
+    bukan urutan masuk) cukup diwakili watermark: semua ID <= watermark dianggap sudah diproses.
+    Urutan kedatangan tidak berpengaruh (event gateway bisa bercampur dengan catch-up REST).
+    Cek O(1), tambah O(log n).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.floor = 0 # Watermark: ID terbesar yang sudah dikeluarkan dari heap
+        self.heap = [] # Min-heap ID di atas watermark
+        self.members = set()
+        self.lock = threading.Lock() # Lock per channel, tidak ada lock global
+
+    def contains(self, msg_id):
+        msg_id = int(msg_id)
+        with self.lock:
+            return msg_id <= self.floor or msg_id in self.members
+
+    def add(self, msg_id):
+        msg_id = int(msg_id)
+        with self.lock:
+            if msg_id <= self.floor or msg_id in self.members:
+                return
+            heapq.heappush(self.heap, msg_id)
+            self.members.add(msg_id)
+            while len(self.heap) > self.capacity: # Keluarkan ID terkecil (snowflake tertua) dulu
+                evicted = heapq.heappop(self.heap)
+                self.members.discard(evicted)
+                self.floor = evicted
+
+    def snapshot(self):
+        """(watermark, daftar ID di heap) untuk disimpan."""
+        with self.lock:
+            return self.floor, sorted(self.heap)
+
+    def restore(self, floor, ids):
+        """Memuat ulang state dari snapshot."""
+        with self.lock:
+            self.floor = max(self.floor, int(floor))
+        for msg_id in sorted(int(i) for i in ids):
+            self.add(msg_id)
+
+def get_processed_tracker(channel_id):
+    """Mengambil (atau membuat) pelacak ID pesan untuk channel ini."""
+    tracker = processed_trackers.get(channel_id)
+    if tracker is None:
+        tracker = processed_trackers.setdefault(channel_id, ProcessedTracker(processed_cache_size))
+    return tracker
+
+def should_process_message(msg, tracker, bot_ids_in_channel, bot_reply_probability, channel_name):
+    """Logika keputusan memproses satu pesan. True jika pesan layak dibalas (sudah ditandai diproses)."""
+    msg_id = msg.get('id')
+    author = msg.get('author', {})
+    author_id = author.get('id')
+    author_name = author.get('global_name') or author.get('username', 'Unknown User')
+    content = msg.get('content', '').strip()
+
+    # Cek apakah pesan sudah diproses sebelumnya
+    is_processed = tracker.contains(msg_id)
+
+    log_message("Pesan dibaca (ID: %s, Author: %s [%s], Processed: %s): \"%.70s...\"", "DEBUG", channel_name, msg_id, author_name, author_id, is_processed, content)
+
+    should_process = False
+    is_from_managed_bot = author_id in bot_ids_in_channel
+
+    if not is_processed:
+        if not is_from_managed_bot:
+            # Selalu proses pesan dari user atau bot lain (tidak dikelola script ini)
+            should_process = True
+            log_message("Pesan baru dari %s (bukan bot terkelola) terdeteksi.", "INFO", channel_name, author_name)
+        elif bot_reply_probability > 0: # Hanya cek probabilitas jika fitur aktif
+            # Pesan dari bot yang dikelola. Terapkan probabilitas.
+            if random.random() < bot_reply_probability:
+                should_process = True
+                log_message(f"Memutuskan untuk membalas pesan dari bot terkelola {author_name} (Probabilitas: {bot_reply_probability*100:.1f}%)", "INFO", channel_name)
+            else:
+                log_message(f"Memutuskan untuk TIDAK membalas pesan dari bot terkelola {author_name} (Probabilitas: {bot_reply_probability*100:.1f}%)", "INFO", channel_name)
+                # Tandai sudah diproses meskipun tidak dibalas, agar tidak dievaluasi ulang
+                tracker.add(msg_id)
+        else:
+             # Pesan dari bot terkelola, tapi fitur balas antar bot nonaktif (prob = 0)
+             log_message("Mengabaikan pesan dari bot terkelola %s karena fitur balas antar bot nonaktif.", "DEBUG", channel_name, author_name)
+             # Tandai sudah diproses
+             tracker.add(msg_id)
+
+    if not should_process:
+        return False
+
+    # Tandai sudah diproses SEGERA (termasuk pesan tanpa teks)
+    tracker.add(msg_id)
+
+    if not content: # Hanya proses jika ada teks
+        log_message("Pesan baru terdeteksi tapi tidak ada konten teks. Dilewati.", "INFO", channel_name)
+        return False
+    return True
+
+def claim_messages(messages, channel_name="Unknown"):
+    """Pesan yang berhasil diklaim shard ini. Backend koordinasi bisa blocking (SQLite), jadi di
+    manager channel dipanggil lewat rt.call agar tidak menahan event loop engine async."""
+    claimed = []
+    for msg in messages:
+        if coordinator.claim_message(msg.get('channel_id'), msg.get('id')):
+            claimed.append(msg)
+        else:
+            log_message("Pesan %s sudah diklaim shard lain. Dilewati.", "DEBUG", channel_name, msg.get('id'))
+    return claimed
+
+def pick_reply_target(candidates, reply_target, bot_ids_in_channel):
+    """Memilih satu pesan untuk dibalas dari kandidat (urut lama -> baru).
+
+    reply_target: "newest" (terbaru), "first_human" (pesan manusia pertama), atau
+    "mention" (pesan yang me-mention/me-reply bot terkelola). Fallback ke terbaru.
+    """
+    if not candidates:
+        return None
+    if reply_target == "first_human":
+        for msg in candidates:
+            author = msg.get('author', {})
+            if author.get('id') not in bot_ids_in_channel and not author.get('bot'):
+                return msg
+    elif reply_target == "mention":
+        for msg in reversed(candidates):
+            if mentions_managed_bot(msg, bot_ids_in_channel):
+                return msg
+    return candidates[-1]
+
+def channel_state_snapshot(tracker, last_seen_id):
+    """State baca per channel yang disimpan ke state store (dievaluasi saat flush)."""
+    floor, recent = tracker.snapshot()
+    return {"last_seen_id": last_seen_id, "floor": floor, "recent": recent}
+
+# --- State Persisten (Muat Ulang Saat Startup) ---
+def init_state_store():
+    """Membuka state store dan memuat ulang state terakhir (jika STATE_DB diisi)."""
+    global state_store
+    if not state_db_path:
+        return
+    started = time.perf_counter()
+    state_store = StateStore(state_db_path, flush_interval=state_flush_interval)
+
+    for channel_id, value in state_store.load("channel").items():
+        get_processed_tracker(channel_id).restore(value.get("floor", 0), value.get("recent", []))
+        if value.get("last_seen_id"):
+            restored_watermarks[channel_id] = value["last_seen_id"]
+    with channel_data_lock:
+        for channel_id, ts in state_store.load("last_action").items():
+            channel_last_action_times[channel_id] = ts
+
+    keys_by_fingerprint = {secret_fingerprint(key): key for key in google_api_keys}
+    now = time.time()
+    for fingerprint, value in state_store.load("api_key_cooldown").items():
+        key = keys_by_fingerprint.get(fingerprint)
+        if key and value.get("until", 0) > now:
+            api_key_registry.restore_cooldown(key, value["until"])
+        else:
+            forget_state("api_key_cooldown", fingerprint)
+
+    # Lanjutkan penghapusan yang tertunda sebelum restart
+    tokens_by_fingerprint = {secret_fingerprint(token): token for token in discord_tokens_list}
+    pending_deletes = state_store.load("pending_delete")
+    for key, value in pending_deletes.items():
+        token = tokens_by_fingerprint.get(value.get("token"))
+        if not token:
+            forget_state("pending_delete", key)
+            continue
+        delete_scheduler.schedule(value["channel_id"], value["message_id"], token, value.get("due_at", now), value.get("channel_name", "Unknown"))
+
+    log_message(
+        f"State dimuat dari {state_db_path} dalam {(time.perf_counter() - started)*1000:.1f} ms: "
+        f"{len(restored_watermarks)} watermark channel, {api_key_registry.cooling_down()} API key cooldown, {len(pending_deletes)} hapus tertunda.",
+        "INFO"
+    )
+
+def start_metrics_server():
+    """Mendaftarkan gauge antrean/thread lalu membuka endpoint /metrics (jika METRICS_PORT diisi)."""
+    if not metrics_port:
+        return
+    gauge = metrics_registry.callback
+    gauge("generation_queue_depth", "Permintaan generasi Gemini yang mengantre", generation_service.depth)
+    gauge("generation_running", "Permintaan generasi Gemini yang sedang diproses", lambda: generation_service.running)
+    gauge("delete_queue_depth", "Penghapusan pesan yang masih terjadwal", delete_scheduler.pending)
+    gauge("send_queue_depth", "Pesan menunggu di antrean kirim per token", send_queue.depth_by_token, labelnames=("token",))
+    gauge("send_queue_results_total", "Hasil antrean kirim", lambda: {
+        (key,): send_queue.stats[key] for key in ("sent", "failed", "retried", "expired")}, kind="counter", labelnames=("result",))
+    gauge("circuit_breakers", "Circuit breaker yang tidak tertutup per jenis & state", lambda: {
+        (kind, state): count for kind, registry in (("token", token_breakers), ("channel", channel_breakers), ("access", access_breakers))
+        for state, count in registry.counts().items()}, labelnames=("kind", "state"))
+    gauge("typing_active_channels", "Channel dengan typing indicator aktif", typing_service.active_count)
+    gauge("gateway_buffered_events", "Event gateway tertampung menunggu siklus channel",
+          lambda: sum(len(buffer) for buffer in list(gateway_intake.buffers.values())))
+    gauge("state_store_pending_writes", "Perubahan state yang belum ditulis ke SQLite",
+          lambda: state_store.pending.qsize() if state_store else 0)
+    gauge("gemini_keys_cooling_down", "Google API key yang sedang cooldown", api_key_registry.cooling_down)
+    gauge("channel_poll_interval_seconds", "Interval tunggu efektif terakhir per channel (adaptif atau tetap)",
+          lambda: dict(channel_poll_intervals), labelnames=("channel",))
+    gauge("channel_managers_running", "Manager channel yang berjalan (thread atau coroutine)", lambda: len(running_managers))
+    gauge("process_threads", "Thread OS aktif di proses ini", threading.active_count)
+    gauge("discord_ratelimit_waits_total", "Request yang menunggu bucket rate limit", lambda: rate_limiter.stats["waits"], kind="counter")
+    gauge("discord_ratelimit_limited_total", "Respons 429 dari Discord", lambda: rate_limiter.stats["limited"], kind="counter")
+    gauge("channel_cache_requests_total", "Lookup cache metadata channel", lambda: {
+        ("hit",): channel_cache.hits, ("miss",): channel_cache.misses}, kind="counter", labelnames=("result",))
+    if response_cache:
+        gauge("response_cache_requests_total", "Lookup cache balasan AI", lambda: {
+            ("hit",): response_cache.hits, ("miss",): response_cache.misses}, kind="counter", labelnames=("result",))
+    try:
+        metrics.start_server(metrics_registry, metrics_host, metrics_port)
+        log_message(f"Endpoint metrik Prometheus aktif di http://{metrics_host}:{metrics_port}/metrics", "SUCCESS")
+    except OSError as e:
+        log_message(f"Gagal membuka endpoint metrik di {metrics_host}:{metrics_port}: {e}", "ERROR")
+
+# --- Runtime Engine (thread / async) ---
+# Loop manager channel ditulis sekali sebagai coroutine. Runtime menentukan cara sleep & memanggil
+# fungsi HTTP blocking: engine "thread" menjalankannya langsung di thread channel itu sendiri,
+# engine "async" menjalankan semua channel di satu event loop dan memindahkan HTTP ke pool thread terbatas.
+
+class ThreadRuntime:
+    """Runtime untuk engine thread (satu thread OS per channel, perilaku klasik)."""
+
+    async def sleep(self, seconds):
+        time.sleep(seconds)
+
+    async def call(self, func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    async def wait_future(self, future, timeout):
+        done, _ = concurrent.futures.wait([future], timeout=timeout)
+        return bool(done)
+
+
+class AsyncRuntime:
+    """Runtime untuk engine async (satu coroutine per channel, HTTP lewat executor terbatas)."""
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+    async def call(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def wait_future(self, future, timeout):
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        except Exception:
+            pass # Error generasi dibaca pemanggil lewat future.result()
+        return True
+
+
+# --- Kontrol Runtime Channel (API kontrol) ---
+class ChannelControl:
+    """Pengaturan satu channel yang bisa diubah saat runtime.
+
+    API kontrol hanya menaruh perubahan di `pending`; manager mengambilnya sekaligus di batas
+    siklus, sehingga satu siklus selalu memakai settings, token & bot ID dari versi yang sama.
+    """
+
+    def __init__(self, name, settings, tokens, bot_ids):
+        self.name = name
+        self.settings = settings
+        self.tokens = tokens
+        self.bot_ids = bot_ids
+        self.pending = None # (settings, tokens, bot_ids) menunggu batas siklus
+        self.paused = False
+        self.removed = False
+        self.lock = threading.Lock()
+
+    def latest(self):
+        """Versi terbaru (termasuk yang belum diterapkan), dasar untuk perubahan berikutnya."""
+        with self.lock:
+            return self.pending or (self.settings, self.tokens, self.bot_ids)
+
+    def stage(self, settings, tokens, bot_ids):
+        with self.lock:
+            self.pending = (settings, tokens, bot_ids)
+
+    def take_pending(self):
+        """Dipanggil manager di batas siklus; mengembalikan versi baru atau None."""
+        with self.lock:
+            pending, self.pending = self.pending, None
+            if pending:
+                self.settings, self.tokens, self.bot_ids = pending
+            return pending
+
+    def describe(self, channel_id):
+        with self.lock:
+            return {
+                "id": channel_id,
+                "name": self.name,
+                "running": channel_id in running_managers,
+                "paused": self.paused,
+                "removing": self.removed,
+                "pending_update": self.pending is not None,
+                "effective_interval": channel_poll_intervals.get(channel_id),
+                "circuit": channel_breakers.state(channel_id),
+                "bots_cooling_off": len(self.tokens) - len(healthy_tokens(self.tokens, channel_id)),
+                "bots": sorted(self.bot_ids),
+                "settings": self.settings,
+            }
+
+
+def disable_ai_reading_without_keys(settings, channel_name):
+    """Mode AI tanpa Google API key tidak bisa membalas; matikan pembacaan pesan."""
+    if settings["use_google_ai"] and not google_api_keys:
+        log_message(f"Channel [{channel_name}] memakai Mode AI tapi tidak ada Google API Keys di .env! Baca pesan dinonaktifkan.", "ERROR")
+        settings.update(enable_read_message=False, read_delay=0, use_reply=False, bot_reply_probability=0.0)
+
+
+def register_channel_control(channel_id, config):
+    """Membuat ChannelControl untuk channel; False jika channel ini sudah terdaftar."""
+    with control_lock:
+        if channel_id in channel_controls:
+            return False
+        channel_controls[channel_id] = ChannelControl(config['name'], config['settings'], config['tokens'], config['bot_ids'])
+        return True
+
+
+def launch_channel_manager(channel_id, config):
+    """Menjalankan manager channel di engine yang aktif (startup & API kontrol). False jika sudah berjalan."""
+    if not register_channel_control(channel_id, config):
+        return False
+    args = (channel_id, config['name'], config['settings'], config['tokens'], config['bot_ids'])
+    if async_engine:
+        asyncio.run_coroutine_threadsafe(channel_manager_loop(async_engine["rt"], *args), async_engine["loop"])
+    else:
+        threading.Thread(target=auto_reply_channel_manager, args=args, daemon=True).start()
+    return True
+
+
+class ChannelController:
+    """Implementasi endpoint control_api di atas channel_controls."""
+
+    def __init__(self, valid_tokens_info):
+        self.valid_tokens_info = valid_tokens_info
+
+    def _control(self, channel_id):
+        control = channel_controls.get(channel_id)
+        if control is None:
+            raise control_api.ControlError(404, f"Channel {channel_id} tidak dijalankan di proses ini")
+        return control
+
+    def _resolve_bots(self, refs):
+        tokens, bot_ids, missing = channel_config.resolve_bots(refs, self.valid_tokens_info)
+        if missing:
+            raise control_api.ControlError(400, f"Bot {', '.join(map(str, missing))} tidak ada di antara token yang valid")
+        if not tokens:
+            raise control_api.ControlError(400, "Minimal satu bot harus ditugaskan")
+        return tokens, bot_ids
+
+    def list_channels(self):
+        return {"channels": [control.describe(channel_id) for channel_id, control in list(channel_controls.items())]}
+
+    def get_channel(self, channel_id):
+        return self._control(channel_id).describe(channel_id)
+
+    def add_channel(self, body):
+        try:
+            entry = channel_config.validate({"channels": [body]}, "API kontrol", len(discord_tokens_list), adaptive_interval_defaults)[0]
+        except channel_config.ConfigError as e:
+            raise control_api.ControlError(400, "; ".join(e.errors))
+        channel_id = entry["id"]
+        if shard_count > 1 and coordination.shard_of(channel_id, shard_count) != shard_index:
+            raise control_api.ControlError(409, f"Channel {channel_id} milik shard {coordination.shard_of(channel_id, shard_count)}, bukan shard ini ({shard_index})")
+        if channel_id in channel_controls:
+            raise control_api.ControlError(409, f"Channel {channel_id} sudah berjalan (atau sedang dihentikan)")
+        tokens, bot_ids = self._resolve_bots(entry["bots"])
+        access = verify_channel_access([channel_id], self.valid_tokens_info)[channel_id]
+        if not access["accessible"]:
+            raise control_api.ControlError(400, f"Channel {channel_id} tidak bisa diakses oleh bot mana pun")
+        name = body.get("name") or access["name"]
+        settings = dict(entry["settings"])
+        disable_ai_reading_without_keys(settings, name)
+        if not launch_channel_manager(channel_id, {"name": name, "settings": settings, "tokens": tokens, "bot_ids": bot_ids}):
+            raise control_api.ControlError(409, f"Channel {channel_id} sudah berjalan (atau sedang dihentikan)")
+        log_message(f"[API kontrol] Channel [{name}] ({channel_id}) ditambahkan dengan {len(tokens)} bot.", "SUCCESS")
+        return self.get_channel(channel_id)
+
+    def update_channel(self, channel_id, body):
+        control = self._control(channel_id)
+        settings, tokens, bot_ids = control.latest()
+        try:
+            bots, patch = channel_config.validate_update(body, "API kontrol", len(discord_tokens_list), settings, adaptive_interval_defaults)
+        except channel_config.ConfigError as e:
+            raise control_api.ControlError(400, "; ".join(e.errors))
+        if patch:
+            settings = channel_config.merge_settings(settings, patch)
+            disable_ai_reading_without_keys(settings, control.name)
+        if bots is not None:
+            tokens, bot_ids = self._resolve_bots(bots)
+        control.stage(settings, tokens, bot_ids)
+        log_message(f"[API kontrol] Perubahan untuk [{control.name}] ({channel_id}) dijadwalkan di batas siklus berikutnya: "
+                    f"{', '.join(sorted(patch)) or '-'}{' + bot' if bots is not None else ''}.", "INFO")
+        return control.describe(channel_id)
+
+    def set_paused(self, channel_id, paused):
+        control = self._control(channel_id)
+        with control.lock:
+            control.paused = paused
+        log_message(f"[API kontrol] Channel [{control.name}] ({channel_id}) {'dijeda' if paused else 'dilanjutkan'}.", "INFO")
+        return control.describe(channel_id)
+
+    def remove_channel(self, channel_id):
+        control = self._control(channel_id)
+        with control.lock:
+            control.removed = True
+        if use_gateway:
+            gateway_intake.unregister(channel_id) # Langsung berhenti menampung event, tanpa menunggu batas siklus
+        log_message(f"[API kontrol] Channel [{control.name}] ({channel_id}) akan dihentikan di batas siklus berikutnya.", "INFO")
+        return control.describe(channel_id)
+
+
+def start_control_api(valid_tokens_info):
+    """Membuka API kontrol channel (jika CONTROL_PORT diisi)."""
+    if not control_port:
+        return
+    try:
+        control_api.start_server(ChannelController(valid_tokens_info), control_host, control_port, control_token)
+        log_message(f"API kontrol channel aktif di http://{control_host}:{control_port}/channels", "SUCCESS")
+    except OSError as e:
+        log_message(f"Gagal membuka API kontrol di {control_host}:{control_port}: {e}", "ERROR")
+        return
+    if not control_token and control_host not in ("127.0.0.1", "localhost", "::1"):
+        log_message("API kontrol terbuka di luar localhost tanpa CONTROL_TOKEN!", "WARNING")
+
+
+def create_poller(settings, previous=None, channel_name="Unknown"):
+    """AdaptiveInterval untuk channel Mode AI yang membaca pesan; None = pakai delay_interval tetap."""
+    if not (settings.get("adaptive_interval", adaptive_polling)
+            and settings.get("use_google_ai", False) and settings.get("enable_read_message", True)):
+        return None
+    try:
+        return AdaptiveInterval(
+            settings.get("delay_interval", 60),
+            settings.get("min_interval", adaptive_min_interval),
+            settings.get("max_interval", adaptive_max_interval),
+            backoff=adaptive_backoff, speedup=adaptive_speedup,
+        ).inherit(previous)
+    except ValueError as e: # Batas tidak valid yang lolos validasi config: jangan matikan manager channel
+        log_message(f"Interval adaptif tidak bisa dipakai ({e}). Memakai delay_interval tetap.", "ERROR", channel_name)
+        return None
+
 # --- Fungsi Inti Auto-Reply (Multi-Bot per Channel) ---
 def auto_reply_channel_manager(channel_id, channel_name, settings, assigned_tokens, bot_ids_in_channel):
-    """Loop utama yang mengelola operasi multi-bot untuk SATU channel."""
-    log_message(f"Memulai manager untuk [{channel_name}] ({channel_id}) dengan {len(assigned_tokens)} bot.", "INFO")
+    """Loop utama yang mengelola operasi multi-bot untuk SATU channel (engine thread)."""
     current_thread = threading.current_thread()
     current_thread.name = f"Manager-{channel_name[:10]}" # Beri nama thread agar mudah diidentifikasi di log
+    asyncio.run(channel_manager_loop(ThreadRuntime(), channel_id, channel_name, settings, assigned_tokens, bot_ids_in_channel))
+
+async def channel_manager_loop(rt, channel_id, channel_name, settings, assigned_tokens, bot_ids_in_channel):
+    """Siklus manager SATU channel; dipakai bersama oleh engine thread dan engine async."""
+    log_message(f"Memulai manager untuk [{channel_name}] ({channel_id}) dengan {len(assigned_tokens)} bot.", "INFO")
 
     if not assigned_tokens:
         log_message("Tidak ada bot yang ditugaskan ke channel ini. Thread berhenti.", "ERROR", channel_name)
         return
 
+    running_managers.add(channel_id)
+    channel_token_sets[channel_id] = tuple(assigned_tokens)
+    control = channel_controls.get(channel_id) # None jika manager dijalankan di luar launch_channel_manager
+
     # Ambil pengaturan probabilitas balas antar bot
     bot_reply_probability = settings.get("bot_reply_probability", 0.0) # Default 0 (nonaktif)
 
+    last_seen_id = restored_watermarks.get(channel_id) # Watermark snowflake: pesan terakhir yang sudah terlihat di channel ini
+    gateway_synced = None # Sesi gateway (gateway_intake.session) yang sudah di-catch-up lewat REST
+    tracker = get_processed_tracker(channel_id)
+    pending_replies = collections.deque() # (Future, reply_to_id, reply_token) yang sedang digenerate
+    poller = create_poller(settings, channel_name=channel_name) # None jika interval tetap
+    slow_mode_delay = 0 # Slow mode terakhir yang terlihat, batas bawah interval adaptif
+
+    # Daftarkan channel ke gateway (bot pertama sebagai pendengar) jika intake event aktif
+    if use_gateway and settings.get("use_google_ai", False) and settings.get("enable_read_message", True):
+        gateway_intake.register(channel_id, assigned_tokens[0])
+
     while True:
-        action_performed_in_cycle = False # Lacak apakah ada aksi kirim pesan di siklus ini
         prompt_content = None # Reset prompt content di setiap siklus
         reply_to_id = None    # Reset reply target di setiap siklus
+        reply_priority = PRIORITY_NORMAL
+        cycle_span = tracer.start_trace("cycle", lane=channel_name, channel=channel_id) # NOOP_SPAN jika tracing nonaktif
         try:
-            is_ai_mode = settings.get("use_google_ai", False)
-            interval = settings.get("delay_interval", 60) # Default interval
+            interval = settings.get("delay_interval", 60) if poller is None else poller.next_interval(slow_mode_delay)
+            channel_poll_intervals[channel_id] = interval
 
             # --- Tunggu Interval Antar Siklus ---
-            log_message(f"Menunggu interval siklus {interval} detik...", "WAIT", channel_name)
-            time.sleep(interval)
+            log_message("Menunggu interval siklus %s detik...", "WAIT", channel_name, round(interval, 1))
+            with cycle_span.child("interval_sleep", seconds=round(interval, 1)):
+                await rt.sleep(interval)
+
+            # --- Batas Siklus: terapkan perubahan dari API kontrol sekaligus ---
+            if control is not None:
+                if control.removed:
+                    log_message("Channel dihapus lewat API kontrol. Manager berhenti.", "INFO", channel_name)
+                    break
+                update = control.take_pending()
+                if update:
+                    settings, assigned_tokens, bot_ids_in_channel = update
+                    channel_token_sets[channel_id] = tuple(assigned_tokens)
+                    bot_reply_probability = settings.get("bot_reply_probability", 0.0)
+                    poller = create_poller(settings, previous=poller, channel_name=channel_name)
+                    if use_gateway and settings.get("use_google_ai", False) and settings.get("enable_read_message", True):
+                        gateway_intake.register(channel_id, assigned_tokens[0])
+                    elif use_gateway:
+                        gateway_intake.unregister(channel_id) # Baca pesan dimatikan: jangan tampung event lagi
+                    log_message(f"Pengaturan baru diterapkan ({len(assigned_tokens)} bot, interval {settings.get('delay_interval', 60)} detik).", "SUCCESS", channel_name)
+                if control.paused:
+                    log_message("Channel dijeda lewat API kontrol, siklus dilewati.", "DEBUG", channel_name)
+                    cycle_span.set(outcome="paused")
+                    continue
+            if not channel_breakers.allow(channel_id):
+                log_message("Circuit channel terbuka, siklus dilewati (probe dalam %.0f detik).", "WAIT", channel_name, channel_breakers.retry_in(channel_id))
+                cycle_span.set(outcome="circuit_open")
+                continue
+            cycle_start = time.perf_counter()
+            is_ai_mode = settings.get("use_google_ai", False)
 
             # --- Pilih Bot Secara Acak Untuk Aksi Berikutnya ---
             if not assigned_tokens: # Cek lagi jika ada masalah
                  log_message("Daftar token kosong! Tidak bisa memilih bot.", "ERROR", channel_name)
-                 time.sleep(60) # Tunggu lama sebelum coba lagi
+                 await rt.sleep(60) # Tunggu lama sebelum coba lagi
                  continue
-            current_token = random.choice(assigned_tokens)
-            log_message(f"Bot terpilih untuk siklus ini: ...{current_token[-6:]}", "DEBUG", channel_name)
+            for token in tokens_due_for_probe(assigned_tokens): # Request nyata (tanpa cache) agar token 401 bisa pulih
+                with cycle_span.child("token_probe", bot=token[-6:]):
+                    await rt.call(probe_token, token, channel_name)
+            current_token, access_probe = pick_cycle_token(assigned_tokens, channel_id, channel_name)
+            if current_token is None:
+                log_message("Semua bot channel ini sedang cool-off (circuit terbuka), siklus dilewati.", "WAIT", channel_name)
+                cycle_span.set(outcome="no_healthy_bot")
+                continue
+            reads_via_rest = is_ai_mode and settings.get("enable_read_message", True) and not (use_gateway and gateway_intake.is_live(channel_id))
+            if not reads_via_rest and (channel_breakers.state(channel_id) == circuit_breaker.HALF_OPEN or (access_probe and is_ai_mode)):
+                # Siklus ini tidak membaca lewat REST, jadi probe dengan mengambil ulang metadata channel.
+                # (Di mode file probe akses dilakukan oleh pengiriman pesan dengan bot probe itu sendiri.)
+                channel_cache.invalidate(channel_id)
+                with cycle_span.child("circuit_probe"):
+                    await rt.call(get_slow_mode_delay, channel_id, current_token, channel_name)
+            log_message("Bot terpilih untuk siklus ini: ...%s", "DEBUG", channel_name, current_token[-6:])
+            cycle_span.set(bot=current_token[-6:], ai=is_ai_mode)
 
             # --- Cek & Tunggu Slow Mode (jika diaktifkan) ---
+            slow_mode_delay = 0
             if settings.get("use_slow_mode", True): # Default aktifkan
-                slow_mode_delay = get_slow_mode_delay(channel_id, current_token, channel_name)
+                with cycle_span.child("slow_mode_check"):
+                    slow_mode_delay = await rt.call(get_slow_mode_delay, channel_id, current_token, channel_name)
                 if slow_mode_delay > 0:
                     with channel_data_lock: # Lock akses ke dict waktu aksi terakhir
                         last_action = channel_last_action_times.get(channel_id, 0)
@@ -476,7 +1634,8 @@ def auto_reply_channel_manager(channel_id, channel_name, settings, assigned_toke
                     wait_needed = max(0, slow_mode_delay - time_since_last)
                     if wait_needed > 0:
                         log_message(f"Perlu menunggu slow mode {wait_needed:.1f} detik lagi.", "WAIT", channel_name)
-                        time.sleep(wait_needed + 0.2) # Tambah buffer sedikit
+                        with cycle_span.child("slow_mode_wait", seconds=round(wait_needed, 2)):
+                            await rt.sleep(wait_needed + 0.2) # Tambah buffer sedikit
 
             # --- Aksi Utama (Baca Pesan atau Kirim File) ---
             if is_ai_mode:
@@ -485,161 +1644,245 @@ def auto_reply_channel_manager(channel_id, channel_name, settings, assigned_toke
                     read_delay = settings.get("read_delay", 5)
                     if read_delay > 0:
                         log_message(f"Menunggu {read_delay} detik sebelum baca pesan...", "WAIT", channel_name)
-                        time.sleep(read_delay)
-
-                    log_message("Mencoba membaca pesan terakhir...", "INFO", channel_name)
-                    headers = get_auth_header(current_token) # Gunakan token terpilih untuk baca
+                        with cycle_span.child("read_delay", seconds=read_delay):
+                            await rt.sleep(read_delay)
 
+                    first_read = False # Pesan pertama hanya titik awal watermark, bukan aktivitas baru
                     try:
-                        # Ambil 1 pesan terakhir saja
-                        response = requests.get(f'https://discord.com/api/v10/channels/{channel_id}/messages?limit=1', headers=headers, timeout=10)
-                        response.raise_for_status()
-                        messages = response.json()
+                        gateway_session = gateway_intake.session(channel_id) if use_gateway else None
+                        if gateway_session is not None and gateway_session != gateway_synced and last_seen_id is not None:
+                            # Sesi gateway baru (beralih dari REST, sambung ulang, atau ganti bot pendengar): pesan antara
+                            # baca terakhir dan READY tidak ada di buffer, jadi ambil sekali lewat REST lalu gabungkan
+                            log_message("Gateway siap, catch-up pesan setelah %s lewat REST...", "INFO", channel_name, last_seen_id)
+                            with cycle_span.child("read_messages", after=last_seen_id, catchup=True) as read_span:
+                                fetched = await rt.call(get_messages_after, channel_id, current_token, last_seen_id, catchup_max_pages)
+                                read_span.set(count=len(fetched))
+                            merged = {m.get('id'): m for m in fetched}
+                            merged.update((m.get('id'), m) for m in gateway_intake.drain(channel_id))
+                            messages = list(merged.values())
+                            gateway_synced = gateway_session
+                            cycle_span.set(read_source="gateway_catchup")
+                        elif gateway_session is not None:
+                            # Pesan dari event gateway, tanpa request REST
+                            messages = gateway_intake.drain(channel_id)
+                            gateway_synced = gateway_session
+                            cycle_span.set(read_source="gateway")
+                            log_message(f"Membaca {len(messages)} event pesan dari gateway...", "INFO", channel_name)
+                        else:
+                            if last_seen_id is None:
+                                log_message("Mencoba membaca pesan terakhir...", "INFO", channel_name)
+                                first_read = True
+                                # Siklus pertama: ambil 1 pesan terakhir saja sebagai titik awal watermark
+                                with cycle_span.child("read_messages", first=True) as read_span:
+                                    messages = await rt.call(get_recent_messages, channel_id, current_token, 1)
+                                    read_span.set(count=len(messages))
+                            else:
+                                log_message("Membaca pesan baru setelah %s...", "INFO", channel_name, last_seen_id)
+                                with cycle_span.child("read_messages", after=last_seen_id) as read_span:
+                                    messages = await rt.call(get_messages_after, channel_id, current_token, last_seen_id, catchup_max_pages)
+                                    read_span.set(count=len(messages))
 
                         if messages:
-                            msg = messages[0]
-                            msg_id = msg.get('id')
-                            author = msg.get('author', {})
-                            author_id = author.get('id')
-                            author_name = author.get('global_name') or author.get('username', 'Unknown User')
-                            content = msg.get('content', '').strip()
-
-                            # Cek apakah pesan sudah diproses sebelumnya
-                            with processed_message_ids_lock:
-                                is_processed = msg_id in processed_message_ids
-
-                            log_message(f"Pesan terakhir dibaca (ID: {msg_id}, Author: {author_name} [{author_id}], Processed: {is_processed}): \"{content[:70]}...\"", "DEBUG", channel_name)
-
-                            # --- Logika Keputusan Memproses Pesan ---
-                            should_process = False
-                            is_from_managed_bot = author_id in bot_ids_in_channel
-
-                            if not is_processed:
-                                if not is_from_managed_bot:
-                                    # Selalu proses pesan dari user atau bot lain (tidak dikelola script ini)
-                                    should_process = True
-                                    log_message(f"Pesan baru dari {author_name} (bukan bot terkelola) terdeteksi.", "INFO", channel_name)
-                                elif bot_reply_probability > 0: # Hanya cek probabilitas jika fitur aktif
-                                    # Pesan dari bot yang dikelola. Terapkan probabilitas.
-                                    if random.random() < bot_reply_probability:
-                                        should_process = True
-                                        log_message(f"Memutuskan untuk membalas pesan dari bot terkelola {author_name} (Probabilitas: {bot_reply_probability*100:.1f}%)", "INFO", channel_name)
-                                    else:
-                                        log_message(f"Memutuskan untuk TIDAK membalas pesan dari bot terkelola {author_name} (Probabilitas: {bot_reply_probability*100:.1f}%)", "INFO", channel_name)
-                                        # Tandai sudah diproses meskipun tidak dibalas, agar tidak dievaluasi ulang
-                                        with processed_message_ids_lock:
-                                            processed_message_ids.add(msg_id)
-                                else:
-                                     # Pesan dari bot terkelola, tapi fitur balas antar bot nonaktif (prob = 0)
-                                     log_message(f"Mengabaikan pesan dari bot terkelola {author_name} karena fitur balas antar bot nonaktif.", "DEBUG", channel_name)
-                                     # Tandai sudah diproses
-                                     with processed_message_ids_lock:
-                                         processed_message_ids.add(msg_id)
-
-                            # --- Proses Pesan Jika Diputuskan (should_process == True) ---
-                            if should_process:
-                                if content: # Hanya proses jika ada teks
-                                    prompt_content = content
-                                    reply_to_id = msg_id
-
-                                    # Tandai sudah diproses SEGERA
-                                    with processed_message_ids_lock:
-                                        processed_message_ids.add(msg_id)
-                                        # Optional: Batasi ukuran set
-                                        if len(processed_message_ids) > 5000:
-                                            oldest_ids = list(processed_message_ids)[:1000]
-                                            for old_id in oldest_ids:
-                                                processed_message_ids.remove(old_id)
-                                            log_message("Membersihkan cache ID pesan.", "DEBUG", channel_name)
-                                else:
-                                    log_message("Pesan baru terdeteksi tapi tidak ada konten teks. Dilewati.", "INFO", channel_name)
-                                    # Tetap tandai sudah diproses
-                                    with processed_message_ids_lock:
-                                        processed_message_ids.add(msg_id)
+                            # Urutkan lama -> baru, majukan watermark ke pesan terbaru yang terlihat
+                            batch = sorted(messages, key=lambda m: int(m.get('id', 0)))
+                            if last_seen_id is None or int(batch[-1].get('id', 0)) > int(last_seen_id):
+                                last_seen_id = batch[-1].get('id')
+                            log_message("%d pesan baru dibaca (watermark: %s).", "DEBUG", channel_name, len(batch), last_seen_id)
+                            if poller is not None and not first_read:
+                                poller.observe(sum(1 for m in batch if m.get('author', {}).get('id') not in bot_ids_in_channel))
+
+                            candidates = [m for m in batch if should_process_message(m, tracker, bot_ids_in_channel, bot_reply_probability, channel_name)]
+                            if candidates and coordinator.name != "local": # Backend lokal selalu mengizinkan, tanpa I/O
+                                candidates = await rt.call(claim_messages, candidates, channel_name)
+                            persist_state("channel", channel_id, functools.partial(channel_state_snapshot, tracker, last_seen_id))
+                            target = pick_reply_target(candidates, settings.get("reply_target", "newest"), bot_ids_in_channel)
+                            if target:
+                                prompt_content = target.get('content', '').strip()
+                                reply_to_id = target.get('id')
+                                reply_priority = PRIORITY_MENTION if mentions_managed_bot(target, bot_ids_in_channel) else PRIORITY_NORMAL
+                                if len(candidates) > 1:
+                                    log_message(f"{len(candidates)} pesan layak dibalas, memilih {reply_to_id} (mode: {settings.get('reply_target', 'newest')}).", "INFO", channel_name)
                             # else: Pesan sudah diproses atau dari bot sendiri dan tidak lolos probabilitas/fitur nonaktif
 
                         else: # Tidak ada pesan di channel
-                            log_message("Tidak ada pesan ditemukan di channel.", "INFO", channel_name)
+                            log_message("Tidak ada pesan baru di channel.", "INFO", channel_name)
+                            if poller is not None:
+                                poller.observe(0)
 
                     except requests.exceptions.HTTPError as http_err:
                         log_message(f"Error HTTP saat baca pesan: {http_err}", "ERROR", channel_name)
                         if http_err.response.status_code == 403:
-                            log_message("Bot kehilangan akses baca ke channel ini. Thread berhenti.", "CRITICAL", channel_name)
-                            break # Hentikan loop thread ini
+                            # Circuit channel sudah dibuka oleh record_request_outcome; akses dicoba lagi setelah cool-off
+                            log_message("Bot kehilangan akses baca ke channel ini. Channel di-cool-off, akses diuji ulang otomatis.", "ERROR", channel_name)
                     except requests.exceptions.RequestException as req_err:
                         log_message(f"Error koneksi saat baca pesan: {req_err}", "ERROR", channel_name)
                     except Exception as e:
                          log_message(f"Error tak terduga saat baca pesan: {e}", "ERROR", channel_name)
                          logging.error(traceback.format_exc())
 
-                    # --- Jika ada prompt baru, hasilkan dan kirim balasan ---
+                    # --- Jika ada prompt baru, jadwalkan generasi balasan di GenerationService ---
                     # Kondisi ini hanya True jika should_process=True dan content ada
                     if prompt_content and reply_to_id:
-                        log_message("Menghasilkan balasan AI...", "INFO", channel_name)
-                        reply_token = random.choice(assigned_tokens) # Pilih bot acak untuk balas
-                        log_message(f"Bot terpilih untuk membalas: ...{reply_token[-6:]}", "DEBUG", channel_name)
-
-                        typing_duration = random.randint(5, 8)
-                        typing_thread = threading.Thread(target=trigger_typing, args=(channel_id, reply_token, typing_duration, channel_name), daemon=True, name=f"Typing-{channel_name[:5]}")
-                        typing_thread.start()
-
-                        response_text = generate_reply(prompt_content, settings.get("prompt_language", "id"), use_google_ai=True, channel_name=channel_name)
-
-                        typing_thread.join(timeout=1.0)
-
-                        if response_text:
-                            if send_message(
-                                channel_id, response_text, reply_token,
-                                reply_to=reply_to_id if settings.get("use_reply", True) else None,
-                                delete_after=settings.get("delete_bot_reply"),
-                                delete_immediately=settings.get("delete_immediately", False),
-                                channel_name=channel_name
-                            ):
-                                action_performed_in_cycle = True # Berhasil kirim balasan
+                        if len(pending_replies) >= generation_max_pending:
+                            log_message(f"Masih ada {len(pending_replies)} balasan AI yang diproses. Pesan {reply_to_id} dilewati.", "WARNING", channel_name)
                         else:
-                            log_message("Gagal menghasilkan balasan AI atau balasan kosong.", "WARNING", channel_name)
+                            log_message("Menjadwalkan generasi balasan AI...", "INFO", channel_name)
+                            # Pilih bot sehat acak untuk balas (bot probe akses dipakai sendiri agar hasilnya tercatat)
+                            reply_token = current_token if access_probe else random.choice(healthy_tokens(assigned_tokens, channel_id) or [current_token])
+                            log_message("Bot terpilih untuk membalas: ...%s", "DEBUG", channel_name, reply_token[-6:])
+
+                            typing_duration = random.randint(5, 8)
+                            trigger_typing(channel_id, reply_token, typing_duration, channel_name) # Tidak blocking, dibatalkan saat send_message selesai
+                            cycle_span.event("typing_start", bot=reply_token[-6:], seconds=typing_duration)
+
+                            future = generation_service.submit(
+                                generate_reply, prompt_content, settings.get("prompt_language", "id"),
+                                use_google_ai=True, channel_name=channel_name, priority=reply_priority, trace=cycle_span
+                            )
+                            pending_replies.append((future, reply_to_id, reply_token))
                     # else: Tidak ada pesan baru yang perlu dibalas
 
+                    # --- Kirim balasan tertua jika sudah jadi (tunggu sebentar, sisanya dicek siklus berikutnya) ---
+                    if pending_replies:
+                        future, pending_reply_to, reply_token = pending_replies[0]
+                        with cycle_span.child("generation_wait", reply_to=pending_reply_to) as wait_span:
+                            generation_done = await rt.wait_future(future, generation_wait)
+                            wait_span.set(done=generation_done)
+                        if generation_done:
+                            pending_replies.popleft()
+                            try:
+                                response_text = future.result()
+                            except Exception as e: # Ditolak/kedaluwarsa di antrean atau error generasi
+                                log_message(f"Generasi balasan untuk {pending_reply_to} gagal: {e}", "WARNING", channel_name)
+                                response_text = None
+
+                            if response_text:
+                                send_future = queue_message(
+                                    channel_id, response_text, reply_token,
+                                    reply_to=pending_reply_to if settings.get("use_reply", True) else None,
+                                    delete_after=settings.get("delete_bot_reply"),
+                                    delete_immediately=settings.get("delete_immediately", False),
+                                    channel_name=channel_name, priority=PRIORITY_REPLY, trace=cycle_span
+                                )
+                                with cycle_span.child("send_wait", reply=True) as send_span:
+                                    sent = await rt.wait_future(send_future, send_wait)
+                                    send_span.set(done=sent)
+                                if not sent:
+                                    log_message("Balasan masih di antrean kirim, lanjut siklus berikutnya.", "DEBUG", channel_name)
+                            else:
+                                typing_service.cancel(channel_id)
+                                log_message("Gagal menghasilkan balasan AI atau balasan kosong.", "WARNING", channel_name)
+                        else:
+                            log_message("Balasan AI untuk %s belum selesai, lanjut siklus berikutnya.", "DEBUG", channel_name, pending_reply_to)
+
                 else: # enable_read_message == False
                     log_message("Pembacaan pesan masuk dinonaktifkan dalam Mode AI.", "INFO", channel_name)
 
             else:
                 # --- Mode File: Kirim Pesan Acak dari File ---
-                log_message("Mode File Aktif. Mengambil pesan acak dari pesan.txt...", "INFO", channel_name)
-                message_text = generate_reply("", "", use_google_ai=False, channel_name=channel_name)
+                message_files_setting = settings.get("message_files") or ["pesan.txt"]
+                log_message(f"Mode File Aktif. Mengambil pesan acak dari {', '.join(message_files_setting)}...", "INFO", channel_name)
+                with cycle_span.child("load_message_file"):
+                    message_text = await rt.call(get_random_message_from_file, channel_name, channel_id, message_files_setting)
 
                 if message_text:
-                    send_token = random.choice(assigned_tokens) # Pilih bot acak untuk kirim
-                    log_message(f"Bot terpilih untuk mengirim pesan file: ...{send_token[-6:]}", "DEBUG", channel_name)
+                    # Pilih bot sehat acak untuk kirim (bot probe akses dipakai sendiri agar hasilnya tercatat)
+                    send_token = current_token if access_probe else random.choice(healthy_tokens(assigned_tokens, channel_id) or [current_token])
+                    log_message("Bot terpilih untuk mengirim pesan file: ...%s", "DEBUG", channel_name, send_token[-6:])
 
                     typing_duration = random.randint(2, 4)
-                    typing_thread = threading.Thread(target=trigger_typing, args=(channel_id, send_token, typing_duration, channel_name), daemon=True, name=f"Typing-{channel_name[:5]}")
-                    typing_thread.start()
-                    time.sleep(random.uniform(0.5, 1.5))
-                    typing_thread.join(timeout=1.0)
+                    trigger_typing(channel_id, send_token, typing_duration, channel_name)
+                    with cycle_span.child("typing_delay", bot=send_token[-6:]):
+                        await rt.sleep(random.uniform(0.5, 1.5))
 
-                    if send_message(
+                    send_future = queue_message(
                         channel_id, message_text, send_token,
                         reply_to=None, # Mode file tidak me-reply
                         delete_after=settings.get("delete_bot_reply"),
                         delete_immediately=settings.get("delete_immediately", False),
-                        channel_name=channel_name
-                    ):
-                        action_performed_in_cycle = True # Berhasil kirim pesan file
+                        channel_name=channel_name, priority=PRIORITY_POST, trace=cycle_span
+                    )
+                    with cycle_span.child("send_wait", reply=False) as send_span:
+                        sent = await rt.wait_future(send_future, send_wait)
+                        send_span.set(done=sent)
+                    if not sent:
+                        log_message("Pesan file masih di antrean kirim, lanjut siklus berikutnya.", "DEBUG", channel_name)
                 else:
-                    log_message("Tidak ada pesan valid ditemukan di pesan.txt atau error. Tidak mengirim.", "WARNING", channel_name)
+                    log_message("Tidak ada pesan valid ditemukan di file pesan atau error. Tidak mengirim.", "WARNING", channel_name)
 
-            # --- Update Waktu Aksi Terakhir (jika ada aksi pengiriman) ---
-            if action_performed_in_cycle:
-                with channel_data_lock:
-                    channel_last_action_times[channel_id] = time.time()
-                log_message("Waktu aksi terakhir di channel ini diperbarui.", "DEBUG", channel_name)
+            # Waktu aksi terakhir dicatat record_channel_action saat pesan benar-benar terkirim
+            metric_cycles.inc(channel=channel_id, outcome="ok")
+            cycle_span.set(outcome="ok")
+            metric_cycle_duration.observe(time.perf_counter() - cycle_start, channel=channel_id)
 
         except Exception as e:
+            metric_cycles.inc(channel=channel_id, outcome="error")
+            cycle_span.set(outcome="error", error=str(e))
             log_message(f"!!! ERROR TIDAK TERDUGA di manager [{channel_name}] !!!: {e}", "CRITICAL")
             logging.error(traceback.format_exc()) # Log traceback lengkap untuk debug
-            log_message("Mencoba melanjutkan siklus setelah 30 detik...", "WAIT", channel_name)
-            time.sleep(30) # Beri jeda sebelum mencoba siklus berikutnya
+            channel_breakers.failure(channel_id, f"error tak terduga: {e}") # Error berulang -> cool-off eksponensial
+        finally:
+            cycle_span.end()
+
+    running_managers.discard(channel_id)
+    typing_service.cancel(channel_id)
+    channel_token_sets.pop(channel_id, None)
+    channel_poll_intervals.pop(channel_id, None) # Gauge interval tidak melaporkan channel yang sudah berhenti
+    if use_gateway:
+        gateway_intake.unregister(channel_id)
+    with control_lock:
+        if channel_controls.get(channel_id) is control:
+            channel_controls.pop(channel_id, None) # Channel boleh ditambahkan lagi lewat API kontrol
+
+async def run_async_engine(channel_configs):
+    """Menjalankan semua manager channel sebagai coroutine di satu event loop."""
+    executor = ThreadPoolExecutor(max_workers=async_io_workers, thread_name_prefix="AsyncIO")
+    rt = AsyncRuntime(executor)
+    async_engine.update(loop=asyncio.get_running_loop(), rt=rt)
+    tasks = []
+    try:
+        for channel_id, config in channel_configs.items():
+            log_message(f"Menyiapkan task untuk channel [{config['name']}] ({channel_id})...", "INFO")
+            register_channel_control(channel_id, config)
+            tasks.append(asyncio.create_task(
+                channel_manager_loop(rt, channel_id, config['name'], config['settings'], config['tokens'], config['bot_ids']),
+                name=f"Manager-{config['name'][:10]}"
+            ))
+        log_message(f"Semua {len(tasks)} task manager channel telah dimulai.", "SUCCESS")
+        await asyncio.gather(*tasks)
+        while control_port: # API kontrol aktif: tetap hidup agar channel bisa ditambahkan lagi
+            await asyncio.sleep(3600)
+    finally:
+        async_engine.clear()
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def run_shard_processes(config_path):
+    """Meluncurkan SHARD_PROCESSES proses bot.py; masing-masing menjalankan channel shard-nya dari config_path."""
+    env = dict(os.environ)
+    env.update({
+        "CONFIG_FILE": os.path.abspath(config_path),
+        "SHARD_PROCESSES": "0",
+        "SHARD_COUNT": str(shard_processes),
+        "COORDINATION_BACKEND": coordination_spec if coordination_spec not in ("", "local")
+            else f"sqlite:{os.path.join(script_dir, 'coordination.db')}",
+    })
+    log_message(f"Meluncurkan {shard_processes} proses shard (backend koordinasi: {env['COORDINATION_BACKEND']})...", "INFO")
+    workers = []
+    for index in range(shard_processes):
+        workers.append(subprocess.Popen([sys.executable, os.path.abspath(__file__)], env={**env, "SHARD_INDEX": str(index)}, stdin=subprocess.DEVNULL))
+    try:
+        for worker in workers:
+            worker.wait()
+    except KeyboardInterrupt: # Ctrl+C juga diterima worker (satu process group); tunggu mereka menutup state
+        log_message("\nCtrl+C terdeteksi. Menunggu semua proses shard berhenti...", "INFO")
+        for worker in workers:
+            try:
+                worker.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                worker.terminate()
+    log_message("Semua proses shard berhenti.", "INFO")
 
 # --- Fungsi Pengaturan Interaktif ---
 def get_channel_settings_interactive(channel_id, channel_name, server_name, available_bots_info):
@@ -746,6 +1989,12 @@ def get_channel_settings_interactive(channel_id, channel_name, server_name, avai
                     if reply_choice in ['y', 'n', '']: settings["use_reply"] = reply_choice != 'n'; break
                     else: print(Fore.RED + "  Input tidak valid (y/n)." + Style.RESET_ALL)
 
+                # Pesan yang dibalas jika ada beberapa pesan baru dalam satu siklus
+                while True:
+                    target_choice = input(Fore.GREEN + "  Pesan yang dibalas (newest/first_human/mention, default newest): " + Style.RESET_ALL).strip().lower()
+                    if target_choice in ['newest', 'first_human', 'mention', '']: settings["reply_target"] = target_choice or 'newest'; break
+                    else: print(Fore.RED + "  Input tidak valid (newest/first_human/mention)." + Style.RESET_ALL)
+
                 # --- BARU: Pengaturan Balas Antar Bot ---
                 while True:
                     try:
@@ -784,7 +2033,9 @@ def get_channel_settings_interactive(channel_id, channel_name, server_name, avai
 
     else: # Mode File
         print(Fore.YELLOW + "\n[Pengaturan Mode Pesan dari File (pesan.txt)]" + Style.RESET_ALL)
-        get_random_message_from_file(channel_name) # Cek/buat file
+        files_input = input(Fore.GREEN + "  File pesan (pisahkan koma, default pesan.txt): " + Style.RESET_ALL).strip()
+        settings["message_files"] = [name.strip() for name in files_input.split(",") if name.strip()] or ["pesan.txt"]
+        get_random_message_from_file(channel_name, files=settings["message_files"]) # Cek/buat file
 
         settings["prompt_language"] = "id"
         settings["enable_read_message"] = False
@@ -845,7 +2096,10 @@ def get_channel_settings_interactive(channel_id, channel_name, server_name, avai
             print(f"  - Bahasa Prompt: {settings['prompt_language'].upper()}")
             print(f"  - Delay Baca: {settings['read_delay']} detik")
             print(f"  - Kirim sbg Reply: {'Ya' if settings['use_reply'] else 'Tidak'}")
+            print(f"  - Pesan yg Dibalas: {settings.get('reply_target', 'newest')}")
             print(f"  - Prob. Balas Bot: {settings['bot_reply_probability']*100:.1f}%")
+    else:
+        print(f"  - File Pesan: {', '.join(settings.get('message_files') or ['pesan.txt'])}")
     print(f"  - Interval Siklus: {settings['delay_interval']} detik")
     print(f"  - Perhitungkan Slow Mode: {'Ya' if settings['use_slow_mode'] else 'Tidak'}")
     if settings['delete_bot_reply'] is not None:
@@ -858,19 +2112,44 @@ def get_channel_settings_interactive(channel_id, channel_name, server_name, avai
 
 # --- Blok Eksekusi Utama ---
 if __name__ == "__main__":
+    # 0. Muat ulang state dari run sebelumnya (opsional). Peluncur shard tidak membuka state sama sekali:
+    #    penghapusan tertunda & watermark hanya dilanjutkan oleh shard pemilik channel-nya.
+    if shard_processes <= 1:
+        init_state_store()
+
+    # 0b. Muat & validasi file konfigurasi channel (jika ada) sebelum menyentuh API
+    file_channels = None # [{"id", "bots", "settings"}] dari CONFIG_FILE; None = pakai wizard
+    if config_file and os.path.exists(config_file):
+        load_start = time.perf_counter()
+        try:
+            file_channels = channel_config.load(config_file, len(discord_tokens_list), adaptive_interval_defaults)
+        except channel_config.ConfigError as e:
+            log_message(f"File konfigurasi {config_file} tidak valid:", "CRITICAL")
+            for error in e.errors:
+                log_message(f"  - {error}", "CRITICAL")
+            exit()
+        except OSError as e:
+            log_message(f"Gagal membaca file konfigurasi {config_file}: {e}", "CRITICAL")
+            exit()
+        log_message(f"Konfigurasi {len(file_channels)} channel dimuat dari {config_file} ({(time.perf_counter() - load_start)*1000:.1f} ms). Wizard dilewati.", "SUCCESS")
+        if shard_processes > 1: # Proses ini hanya peluncur; verifikasi dilakukan tiap shard
+            run_shard_processes(config_file)
+            exit()
+
     # 1. Verifikasi Token & Kumpulkan Info Bot yang Valid
     valid_tokens_info = [] # List of (index_for_user, token, info_dict)
     bot_accounts = {} # {token: info_dict} for quick lookup if needed later
-    log_message("Memulai verifikasi token Discord dari .env...", "INFO")
-    for i, token in enumerate(discord_tokens_list):
-        display_name, bot_id = get_bot_info(token)
-        if bot_id != "Unknown" and display_name != "Invalid Token?":
-            info = {"display_name": display_name, "bot_id": bot_id}
+    log_message(f"Memulai verifikasi {len(discord_tokens_list)} token Discord dari .env (paralel, maks {startup_workers})...", "INFO")
+    verify_start = time.perf_counter()
+    for i, token, info in verify_tokens(discord_tokens_list): # Index mulai 1 untuk tampilan user
+        if info:
             bot_accounts[token] = info
-            valid_tokens_info.append((i + 1, token, info)) # Mulai index dari 1 untuk tampilan user
-            log_message(f"Token #{i+1} VALID: {display_name} (ID: {bot_id})", "SUCCESS")
+            valid_tokens_info.append((i, token, info))
+            guild_count = "?" if info["guild_ids"] is None else len(info["guild_ids"])
+            log_message(f"Token #{i} VALID: {info['display_name']} (ID: {info['bot_id']}, {guild_count} server)", "SUCCESS")
         else:
-            log_message(f"Token #{i+1} (...{token[-6:]}) TIDAK VALID atau Gagal ambil info.", "ERROR")
+            log_message(f"Token #{i} (...{token[-6:]}) TIDAK VALID atau Gagal ambil info.", "ERROR")
+    log_message(f"Verifikasi token selesai dalam {time.perf_counter() - verify_start:.2f} detik.", "INFO")
 
     if not valid_tokens_info:
         log_message("Tidak ada token Discord yang valid ditemukan di .env. Program tidak bisa berjalan.", "CRITICAL")
@@ -879,7 +2158,13 @@ if __name__ == "__main__":
 
 
     # 2. Minta Input ID Channel Target
-    input_channel_ids = []
+    input_channel_ids = [channel["id"] for channel in file_channels] if file_channels else []
+    if input_channel_ids and shard_count > 1:
+        input_channel_ids = [cid for cid in input_channel_ids if coordination.shard_of(cid, shard_count) == shard_index]
+        log_message(f"Shard {shard_index + 1}/{shard_count}: menangani {len(input_channel_ids)} dari {len(file_channels)} channel.", "INFO")
+        if not input_channel_ids:
+            log_message("Tidak ada channel untuk shard ini. Proses berhenti.", "WARNING")
+            exit()
     while not input_channel_ids:
         channel_ids_input = input(Fore.CYAN + "\nMasukkan ID channel target (pisahkan koma jika > 1): " + Style.RESET_ALL).strip()
         potential_ids = [cid.strip() for cid in channel_ids_input.split(',') if cid.strip()]
@@ -897,38 +2182,45 @@ if __name__ == "__main__":
             print(Fore.RED + "Masukkan setidaknya satu ID channel numerik yang valid." + Style.RESET_ALL)
 
 
-    # 3. Konfigurasi Setiap Channel Secara Interaktif
+    # 3. Konfigurasi Setiap Channel (dari file, atau interaktif)
     channel_configs = {} # {channel_id: {"name": ..., "settings": ..., "tokens": [...], "bot_ids": {...}}}
-    threads = [] # List untuk menyimpan thread manager channel
+    file_channels_by_id = {channel["id"]: channel for channel in file_channels or []}
 
-    log_message("Memulai konfigurasi interaktif per channel...", "INFO")
+    log_message(f"Memeriksa akses {len(input_channel_ids)} channel (paralel, maks {startup_workers})...", "WAIT")
+    verify_start = time.perf_counter()
+    access_results = verify_channel_access(input_channel_ids, valid_tokens_info)
+    log_message(f"Pemeriksaan akses selesai dalam {time.perf_counter() - verify_start:.2f} detik.", "INFO")
+    log_access_matrix(access_results, valid_tokens_info)
+
+    if not file_channels:
+        log_message("Memulai konfigurasi interaktif per channel...", "INFO")
 
     for channel_id in input_channel_ids:
-        log_message(f"Memeriksa akses & konfigurasi untuk Channel ID: {channel_id}...", "WAIT")
-        accessible = False
-        s_name, c_name = f"Unknown Server", f"Unknown Channel ({channel_id})"
-        access_token = None # Token pertama yang berhasil akses
-
-        # Coba akses channel menggunakan bot yang tersedia satu per satu
-        for _, token, info in valid_tokens_info:
-            server_name_check, channel_name_check, success = get_channel_info(channel_id, token)
-            if success:
-                s_name, c_name = server_name_check, channel_name_check
-                accessible = True
-                access_token = token # Simpan token yang berhasil
-                log_message(f"Akses ke [{c_name}] di [{s_name}] berhasil diverifikasi (via Bot {info['display_name']}).", "SUCCESS")
-                break # Cukup satu bot berhasil akses
-
-        if not accessible:
+        access_result = access_results[channel_id]
+        s_name, c_name = access_result["server"], access_result["name"]
+        if not access_result["accessible"]:
             log_message(f"Gagal mengakses Channel ID {channel_id} dengan semua bot yang tersedia. Channel ini akan dilewati.", "ERROR")
             continue # Lanjut ke channel ID berikutnya
-
-        # Jika channel bisa diakses, minta pengaturan
-        channel_settings, assigned_tokens_for_channel, assigned_bot_ids_for_channel = get_channel_settings_interactive(
-            channel_id, c_name, s_name, valid_tokens_info # Berikan semua bot valid sebagai pilihan
-        )
+        log_message(f"Akses ke [{c_name}] di [{s_name}] berhasil diverifikasi.", "SUCCESS")
+
+        # Jika channel bisa diakses, ambil pengaturan dari file atau minta lewat wizard
+        if channel_id in file_channels_by_id:
+            file_channel = file_channels_by_id[channel_id]
+            channel_settings = dict(file_channel["settings"])
+            assigned_tokens_for_channel, assigned_bot_ids_for_channel, missing_bots = channel_config.resolve_bots(file_channel["bots"], valid_tokens_info)
+            if missing_bots:
+                log_message(f"Bot {', '.join(map(str, missing_bots))} untuk channel [{c_name}] tidak ada di antara token yang valid, diabaikan.", "WARNING")
+            disable_ai_reading_without_keys(channel_settings, c_name)
+        else:
+            channel_settings, assigned_tokens_for_channel, assigned_bot_ids_for_channel = get_channel_settings_interactive(
+                channel_id, c_name, s_name, valid_tokens_info # Berikan semua bot valid sebagai pilihan
+            )
 
         if channel_settings and assigned_tokens_for_channel:
+            no_access = [f"#{idx}" for idx, token, _ in valid_tokens_info
+                         if token in assigned_tokens_for_channel and access_result["access"][token] in (ACCESS_NONE, ACCESS_DENIED)]
+            if no_access:
+                log_message(f"Bot {', '.join(no_access)} tidak punya akses ke [{c_name}] menurut matriks akses; request dari bot ini akan gagal.", "WARNING")
             channel_configs[channel_id] = {
                 "name": c_name,
                 "settings": channel_settings,
@@ -945,25 +2237,47 @@ if __name__ == "__main__":
         log_message("Tidak ada channel yang berhasil dikonfigurasi. Program berhenti.", "CRITICAL")
         exit()
 
+    # Simpan hasil wizard agar run berikutnya bisa start tanpa interaksi (wajib untuk mode shard)
+    if not file_channels:
+        save_path = config_file or ("channels.shards.json" if shard_processes > 1 else None) or input(Fore.GREEN + "\nSimpan pengaturan ke file konfigurasi? (mis. channels.yaml / channels.json, kosong = tidak): " + Style.RESET_ALL).strip()
+        if save_path:
+            try:
+                channel_config.save(save_path, channel_configs)
+                log_message(f"Pengaturan {len(channel_configs)} channel disimpan ke {save_path}. Jalankan dengan CONFIG_FILE={save_path} untuk melewati wizard.", "SUCCESS")
+            except (channel_config.ConfigError, OSError) as e:
+                log_message(f"Gagal menyimpan file konfigurasi {save_path}: {e}", "ERROR")
+                save_path = None
+        if shard_processes > 1:
+            if save_path:
+                run_shard_processes(save_path)
+            exit()
+
+    start_metrics_server()
+    start_control_api(valid_tokens_info)
     log_message("\n" + "="*30 + " MEMULAI SEMUA MANAGER CHANNEL " + "="*30, "INFO")
+    if engine_mode == 'async':
+        log_message(f"Engine async: {len(channel_configs)} channel di satu event loop (pool HTTP {async_io_workers} worker).", "INFO")
+        log_message("Bot(s) sekarang aktif. Tekan Ctrl+C untuk menghentikan.", "INFO")
+        try:
+            asyncio.run(run_async_engine(channel_configs))
+        except KeyboardInterrupt:
+            log_message("\nCtrl+C terdeteksi. Menghentikan program...", "INFO")
+            log_message(f"Statistik cache channel: {channel_cache.stats()}", "INFO")
+            log_message(f"Statistik antrean kirim: {send_queue.summary()}", "INFO")
+            if response_cache:
+                log_message(f"Statistik cache balasan AI: {response_cache.stats()}", "INFO")
+                response_cache.save()
+            if state_store: state_store.close() # Pastikan state terakhir tertulis
+            log_message("Event loop dihentikan. Selamat tinggal!", "INFO")
+            print(Style.RESET_ALL) # Reset warna terminal
+        exit()
+
     for channel_id, config in channel_configs.items():
         log_message(f"Menyiapkan thread untuk channel [{config['name']}] ({channel_id})...", "INFO")
-        thread = threading.Thread(
-            target=auto_reply_channel_manager,
-            args=(
-                channel_id,
-                config['name'],
-                config['settings'],
-                config['tokens'],
-                config['bot_ids']
-            ),
-            daemon=True # Set daemon=True agar thread otomatis berhenti jika main thread selesai
-        )
-        threads.append(thread)
-        thread.start()
+        launch_channel_manager(channel_id, config) # Thread daemon, otomatis berhenti jika main thread selesai
         time.sleep(0.5) # Beri jeda sedikit antar start thread
 
-    log_message(f"Semua {len(threads)} thread manager channel telah dimulai.", "SUCCESS")
+    log_message(f"Semua {len(channel_configs)} thread manager channel telah dimulai.", "SUCCESS")
     log_message("Bot(s) sekarang aktif. Tekan Ctrl+C untuk menghentikan.", "INFO")
 
     # 5. Jaga Program Tetap Berjalan
@@ -972,6 +2286,12 @@ if __name__ == "__main__":
             time.sleep(60) # Cek setiap menit
     except KeyboardInterrupt:
         log_message("\nCtrl+C terdeteksi. Menghentikan program...", "INFO")
+        log_message(f"Statistik cache channel: {channel_cache.stats()}", "INFO")
+        log_message(f"Statistik antrean kirim: {send_queue.summary()}", "INFO")
+        if response_cache:
+            log_message(f"Statistik cache balasan AI: {response_cache.stats()}", "INFO")
+            response_cache.save()
+        if state_store: state_store.close() # Pastikan state terakhir tertulis
         log_message("Semua thread manager akan berhenti. Selamat tinggal!", "INFO")
         print(Style.RESET_ALL) # Reset warna terminal
         exit()
@@ -0,0 +1,317 @@
+"""File konfigurasi channel (YAML/JSON) agar bot bisa start tanpa wizard interaktif.
+
+Contoh (YAML):
+
+    defaults:            # Opsional, berlaku untuk semua channel
+      delay_interval: 60
+    channels:
+      - id: "123456789012345678"
+        bots: [1, 2]     # Nomor token di DISCORD_TOKENS (mulai 1), bot ID, atau "all"
+        settings:
+          use_google_ai: true
+          prompt_language: en
+
+Token tidak pernah ditulis ke file ini; bot dirujuk lewat nomor urut atau bot ID.
+YAML membutuhkan paket opsional `PyYAML`; file .json selalu bisa dipakai.
+"""
+import functools
+import json
+import os
+
+try:
+    import yaml # Paket PyYAML (opsional)
+except ImportError:
+    yaml = None
+
+LANGUAGES = ("id", "en")
+REPLY_TARGETS = ("newest", "first_human", "mention")
+
+# Urutan key juga dipakai saat menulis file dari wizard
+SETTING_KEYS = (
+    "use_google_ai", "prompt_language", "enable_read_message", "read_delay", "use_reply",
+    "reply_target", "bot_reply_probability", "delay_interval", "message_files",
+    "use_slow_mode", "delete_bot_reply", "delete_immediately",
+    "adaptive_interval", "min_interval", "max_interval",
+)
+
+
+class ConfigError(Exception):
+    """File konfigurasi tidak valid; `errors` berisi semua masalah yang ditemukan."""
+
+    def __init__(self, path, errors):
+        self.path = path
+        self.errors = errors
+        super().__init__(f"{path}: " + "; ".join(errors))
+
+
+def is_yaml_path(path):
+    return path.lower().endswith((".yaml", ".yml"))
+
+
+def read_file(path):
+    """Membaca file YAML/JSON menjadi dict."""
+    with open(path, "r", encoding="utf-8") as f:
+        if is_yaml_path(path):
+            if yaml is None:
+                raise ConfigError(path, ["file YAML butuh paket 'PyYAML' (pip install pyyaml), atau pakai .json"])
+            try:
+                return yaml.safe_load(f) or {}
+            except yaml.YAMLError as e:
+                raise ConfigError(path, [f"YAML tidak valid: {e}"])
+        try:
+            return json.load(f)
+        except ValueError as e:
+            raise ConfigError(path, [f"JSON tidak valid: {e}"])
+
+
+def _check_bool(value):
+    return None if isinstance(value, bool) else "harus true/false"
+
+
+def _check_int(minimum):
+    def check(value):
+        if isinstance(value, bool) or not isinstance(value, int):
+            return "harus bilangan bulat"
+        return None if value >= minimum else f"harus >= {minimum}"
+    return check
+
+
+def _check_choice(choices):
+    def check(value):
+        return None if value in choices else f"harus salah satu dari {', '.join(choices)}"
+    return check
+
+
+def _check_probability(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return "harus angka"
+    return None if 0.0 <= value <= 1.0 else "harus antara 0.0 dan 1.0"
+
+
+def _check_files(value):
+    if not isinstance(value, list) or not value or not all(isinstance(v, str) and v.strip() for v in value):
+        return "harus daftar nama file yang tidak kosong"
+    return None
+
+
+def _check_delete_delay(value):
+    return None if value is None else _check_int(0)(value)
+
+
+_CHECKS = {
+    "use_google_ai": _check_bool,
+    "prompt_language": _check_choice(LANGUAGES),
+    "enable_read_message": _check_bool,
+    "read_delay": _check_int(0),
+    "use_reply": _check_bool,
+    "reply_target": _check_choice(REPLY_TARGETS),
+    "bot_reply_probability": _check_probability,
+    "delay_interval": _check_int(1),
+    "message_files": _check_files,
+    "use_slow_mode": _check_bool,
+    "delete_bot_reply": _check_delete_delay,
+    "delete_immediately": _check_bool,
+    "adaptive_interval": _check_bool, # Tidak diisi = ikut ADAPTIVE_POLLING di .env
+    "min_interval": _check_int(1),
+    "max_interval": _check_int(1),
+}
+
+
+def normalize_settings(raw):
+    """Melengkapi settings dengan default yang sama seperti wizard interaktif."""
+    settings = dict(raw)
+    use_google_ai = settings.setdefault("use_google_ai", True)
+    settings.setdefault("delay_interval", 60 if use_google_ai else 300)
+    settings.setdefault("use_slow_mode", True)
+    settings.setdefault("delete_bot_reply", None)
+    settings.setdefault("delete_immediately", settings["delete_bot_reply"] == 0)
+    if use_google_ai:
+        settings.setdefault("prompt_language", "id")
+        settings.setdefault("enable_read_message", True)
+        if settings["enable_read_message"]:
+            settings.setdefault("read_delay", 5)
+            settings.setdefault("use_reply", True)
+            settings.setdefault("reply_target", "newest")
+            settings.setdefault("bot_reply_probability", 0.0)
+        else:
+            settings.update(read_delay=0, use_reply=False, bot_reply_probability=0.0)
+    else: # Mode file tidak membaca pesan
+        settings.setdefault("message_files", ["pesan.txt"])
+        settings.update(prompt_language="id", enable_read_message=False, read_delay=0, use_reply=False, bot_reply_probability=0.0)
+    return settings
+
+
+# Key yang nilainya diturunkan normalize_settings dari key lain; dihitung ulang saat key induknya berubah
+_DERIVED = {
+    "use_google_ai": ("prompt_language", "enable_read_message", "read_delay", "use_reply", "reply_target",
+                      "bot_reply_probability", "message_files"),
+    "enable_read_message": ("read_delay", "use_reply", "reply_target", "bot_reply_probability"),
+    "delete_bot_reply": ("delete_immediately",),
+}
+
+
+def merge_settings(current, patch):
+    """Menerapkan perubahan sebagian pada settings yang sudah dinormalisasi."""
+    merged = dict(current)
+    for key, value in patch.items():
+        if merged.get(key) != value:
+            for derived in _DERIVED.get(key, ()):
+                merged.pop(derived, None)
+    merged.update(patch)
+    return normalize_settings(merged)
+
+
+def _validate_bots(bots, where, token_count, errors):
+    if bots == "all":
+        return "all"
+    if not isinstance(bots, list) or not bots:
+        errors.append(f"{where}.bots: harus daftar nomor token / bot ID, atau \"all\"")
+        return []
+    refs = []
+    for ref in bots:
+        if isinstance(ref, int) and not isinstance(ref, bool) and 1 <= ref <= token_count:
+            refs.append(ref)
+        elif str(ref).isdigit() and len(str(ref)) >= 15 and not isinstance(ref, bool): # Bot ID (snowflake), YAML bisa membacanya sebagai int
+            refs.append(str(ref))
+        else:
+            errors.append(f"{where}.bots: {ref!r} bukan nomor token 1-{token_count} atau bot ID")
+    return refs
+
+
+def _check_settings(settings, where, errors):
+    for key, value in settings.items():
+        if key not in _CHECKS:
+            errors.append(f"{where}.{key}: key tidak dikenal")
+            continue
+        problem = _CHECKS[key](value)
+        if problem:
+            errors.append(f"{where}.{key}: {problem}")
+
+
+def _check_interval_bounds(settings, where, errors, base=None):
+    """min_interval tidak boleh lebih besar dari max_interval; nilai yang tidak diisi diambil dari `base`."""
+    if "min_interval" not in settings and "max_interval" not in settings:
+        return
+    bounds = {**(base or {}), **settings}
+    minimum, maximum = bounds.get("min_interval"), bounds.get("max_interval")
+    if isinstance(minimum, (int, float)) and isinstance(maximum, (int, float)) and minimum > maximum:
+        errors.append(f"{where}: min_interval ({minimum}) tidak boleh lebih besar dari max_interval ({maximum})")
+
+
+def validate(data, path, token_count, interval_defaults=None):
+    """Memvalidasi isi file. Mengembalikan [{"id", "bots", "settings"}]; ConfigError memuat semua masalah.
+
+    `interval_defaults` = {"min_interval", "max_interval"} bawaan (.env) untuk channel yang hanya mengisi salah satunya."""
+    errors = []
+    if not isinstance(data, dict):
+        raise ConfigError(path, ["isi file harus berupa mapping dengan key 'channels'"])
+    unknown = set(data) - {"defaults", "channels"}
+    if unknown:
+        errors.append(f"key tidak dikenal: {', '.join(sorted(unknown))}")
+    defaults = data.get("defaults") or {}
+    if not isinstance(defaults, dict):
+        errors.append("defaults: harus mapping")
+        defaults = {}
+    channels = data.get("channels")
+    if not isinstance(channels, list) or not channels:
+        errors.append("channels: harus daftar berisi minimal satu channel")
+        channels = []
+
+    check_settings = functools.partial(_check_settings, errors=errors)
+    check_settings(defaults, "defaults")
+    result, seen = [], set()
+    for i, entry in enumerate(channels):
+        where = f"channels[{i}]"
+        if not isinstance(entry, dict):
+            errors.append(f"{where}: harus mapping")
+            continue
+        unknown = set(entry) - {"id", "name", "bots", "settings"}
+        if unknown:
+            errors.append(f"{where}: key tidak dikenal: {', '.join(sorted(unknown))}")
+        channel_id = str(entry.get("id", "")).strip()
+        if not channel_id.isdigit():
+            errors.append(f"{where}.id: harus ID channel numerik")
+        elif channel_id in seen:
+            errors.append(f"{where}.id: channel {channel_id} ditulis lebih dari sekali")
+        seen.add(channel_id)
+        bots = _validate_bots(entry.get("bots", "all"), where, token_count, errors)
+        settings = entry.get("settings") or {}
+        if not isinstance(settings, dict):
+            errors.append(f"{where}.settings: harus mapping")
+            continue
+        check_settings(settings, f"{where}.settings")
+        settings = {**defaults, **settings}
+        _check_interval_bounds(settings, f"{where}.settings", errors, interval_defaults)
+        result.append({"id": channel_id, "bots": bots, "settings": settings})
+
+    if errors:
+        raise ConfigError(path, errors)
+    for channel in result:
+        channel["settings"] = normalize_settings(channel["settings"])
+    return result
+
+
+def validate_update(data, path, token_count, current=None, interval_defaults=None):
+    """Memvalidasi perubahan sebagian {"settings": {...}, "bots": [...]} untuk channel yang berjalan.
+
+    `current` = settings channel saat ini (untuk cek silang min/max_interval).
+    Mengembalikan (bots atau None, settings parsial yang belum dinormalisasi)."""
+    errors = []
+    unknown = set(data) - {"bots", "settings"}
+    if unknown:
+        errors.append(f"key tidak dikenal: {', '.join(sorted(unknown))}")
+    bots = _validate_bots(data["bots"], "update", token_count, errors) if "bots" in data else None
+    settings = data.get("settings") or {}
+    if not isinstance(settings, dict):
+        errors.append("update.settings: harus mapping")
+        settings = {}
+    _check_settings(settings, "update.settings", errors)
+    _check_interval_bounds(settings, "update.settings", errors, {**(interval_defaults or {}), **(current or {})})
+    if errors:
+        raise ConfigError(path, errors)
+    return bots, settings
+
+
+def load(path, token_count, interval_defaults=None):
+    """Membaca dan memvalidasi file konfigurasi."""
+    return validate(read_file(path), path, token_count, interval_defaults)
+
+
+def resolve_bots(refs, valid_tokens_info):
+    """Memetakan rujukan bot ke (tokens, bot_ids, rujukan yang tidak cocok dengan bot valid)."""
+    if refs == "all":
+        chosen = list(valid_tokens_info)
+        missing = []
+    else:
+        by_index = {idx: (idx, token, info) for idx, token, info in valid_tokens_info}
+        by_id = {info["bot_id"]: (idx, token, info) for idx, token, info in valid_tokens_info}
+        chosen, missing = [], []
+        for ref in refs:
+            match = by_index.get(ref) if isinstance(ref, int) else by_id.get(ref)
+            if match is None:
+                missing.append(ref)
+            elif match not in chosen:
+                chosen.append(match)
+    return [token for _, token, _ in chosen], {info["bot_id"] for _, _, info in chosen}, missing
+
+
+def save(path, channel_configs):
+    """Menulis konfigurasi channel (hasil wizard) secara atomik; bot ditulis sebagai bot ID."""
+    channels = []
+    for channel_id, config in channel_configs.items():
+        settings = {key: config["settings"][key] for key in SETTING_KEYS if key in config["settings"]}
+        channels.append({"id": channel_id, "name": config["name"], "bots": sorted(config["bot_ids"]), "settings": settings})
+    data = {"channels": channels}
+    if is_yaml_path(path) and yaml is None: # Dicek sebelum membuat file sementara
+        raise ConfigError(path, ["file YAML butuh paket 'PyYAML' (pip install pyyaml), atau pakai .json"])
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            if is_yaml_path(path):
+                yaml.safe_dump(data, f, allow_unicode=True, sort_keys=False)
+            else:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path): # Gagal di tengah jalan: jangan tinggalkan file .tmp basi
+            os.remove(tmp_path)
@@ -0,0 +1,110 @@
+"""Circuit breaker per kunci (token atau channel) dengan probe half-open dan cool-off eksponensial.
+
+closed    -> request normal; `threshold` kegagalan beruntun (atau satu kegagalan fatal, misal 401/403) membuka circuit
+open      -> request dilewati sampai cool-off habis
+half_open -> satu pemanggil mendapat izin probe; sukses menutup circuit, gagal membukanya lagi
+             dengan cool-off dua kali lipat (maks max_cooloff). Probe yang tidak pernah melapor
+             dianggap hilang setelah satu cool-off dan izin probe diberikan lagi.
+"""
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class _Breaker:
+    __slots__ = ("state", "failures", "cooloff", "until", "reason")
+
+    def __init__(self, cooloff):
+        self.state = CLOSED
+        self.failures = 0
+        self.cooloff = cooloff
+        self.until = 0.0
+        self.reason = None
+
+
+class BreakerRegistry:
+    """Sekumpulan circuit breaker; `on_change(key, state, reason, cooloff)` dipanggil saat state berubah."""
+
+    def __init__(self, threshold=3, cooloff=30.0, max_cooloff=1800.0, on_change=None):
+        self.threshold = max(1, threshold)
+        self.base_cooloff = cooloff
+        self.max_cooloff = max(cooloff, max_cooloff)
+        self.on_change = on_change
+        self.breakers = {} # {key: _Breaker}; hanya kunci yang pernah gagal
+        self.lock = threading.Lock()
+
+    def _notify(self, key, breaker):
+        if self.on_change:
+            self.on_change(key, breaker.state, breaker.reason, breaker.cooloff)
+
+    def state(self, key):
+        """State tanpa efek samping (tidak mengambil izin probe)."""
+        breaker = self.breakers.get(key)
+        return CLOSED if breaker is None else breaker.state
+
+    def allow(self, key):
+        """True jika request untuk kunci ini boleh jalan; di half-open hanya satu probe per cool-off."""
+        with self.lock:
+            breaker = self.breakers.get(key)
+            if breaker is None or breaker.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if now < breaker.until:
+                return False
+            changed = breaker.state != HALF_OPEN
+            breaker.state = HALF_OPEN
+            breaker.until = now + breaker.cooloff # Batas waktu probe ini
+        if changed:
+            self._notify(key, breaker)
+        return True
+
+    def retry_in(self, key):
+        """Detik sampai probe berikutnya diizinkan (0 jika closed)."""
+        breaker = self.breakers.get(key)
+        if breaker is None or breaker.state == CLOSED:
+            return 0.0
+        return max(0.0, breaker.until - time.monotonic())
+
+    def success(self, key):
+        if key not in self.breakers: # Jalur umum: tidak pernah gagal, tanpa lock
+            return
+        with self.lock:
+            breaker = self.breakers.get(key)
+            if breaker is None:
+                return
+            recovered = breaker.state != CLOSED
+            del self.breakers[key]
+            breaker.state, breaker.reason = CLOSED, None
+        if recovered:
+            self._notify(key, breaker)
+
+    def failure(self, key, reason=None, fatal=False):
+        """Mencatat kegagalan; `fatal` membuka circuit tanpa menunggu threshold."""
+        with self.lock:
+            breaker = self.breakers.get(key)
+            if breaker is None:
+                breaker = self.breakers[key] = _Breaker(self.base_cooloff)
+            if breaker.state == OPEN:
+                return # Respons terlambat dari request sebelum circuit terbuka
+            if breaker.state == HALF_OPEN:
+                breaker.cooloff = min(self.max_cooloff, breaker.cooloff * 2) # Probe gagal
+            else:
+                breaker.failures += 1
+                if not fatal and breaker.failures < self.threshold:
+                    return
+            breaker.state = OPEN
+            breaker.reason = reason
+            breaker.until = time.monotonic() + breaker.cooloff
+        self._notify(key, breaker)
+
+    def counts(self):
+        """{state: jumlah kunci} untuk state selain closed."""
+        with self.lock:
+            result = {OPEN: 0, HALF_OPEN: 0}
+            for breaker in self.breakers.values():
+                if breaker.state != CLOSED:
+                    result[breaker.state] += 1
+            return result
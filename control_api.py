@@ -0,0 +1,104 @@
+"""API kontrol lokal (HTTP JSON) untuk menambah, menghapus, menjeda, dan mengubah channel saat runtime.
+
+Endpoint:
+  GET    /channels                 daftar channel & status
+  GET    /channels/{id}
+  POST   /channels                 {"id", "bots", "settings"} -> tambah channel baru
+  PATCH  /channels/{id}            {"settings": {...}, "bots": [...]} -> ubah (berlaku di batas siklus)
+  DELETE /channels/{id}            hentikan manager channel di batas siklus
+  POST   /channels/{id}/pause | /channels/{id}/resume
+
+Server hanya menerjemahkan HTTP; logika ada di objek `controller` milik bot.py.
+Jika `auth_token` diisi, setiap request wajib membawa header "Authorization: Bearer <token>".
+"""
+import hmac
+import json
+import logging
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_CHANNEL_PATH = re.compile(r"^/channels/(\d+)(?:/(pause|resume))?$")
+
+
+class ControlError(Exception):
+    """Permintaan ditolak; `status` dikirim sebagai kode HTTP."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def start_server(controller, host="127.0.0.1", port=8765, auth_token=None):
+    """Menjalankan API kontrol di thread daemon. Mengembalikan server-nya."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body):
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if not length:
+                return {}
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                raise ControlError(400, "Body bukan JSON yang valid")
+            if not isinstance(body, dict):
+                raise ControlError(400, "Body harus objek JSON")
+            return body
+
+        def _handle(self, method):
+            try:
+                if auth_token and not hmac.compare_digest(self.headers.get("Authorization", ""), f"Bearer {auth_token}"):
+                    raise ControlError(401, "Token kontrol salah atau tidak ada")
+                path = self.path.split("?", 1)[0].rstrip("/")
+                if path == "/channels":
+                    if method == "GET":
+                        return self._send(200, controller.list_channels())
+                    if method == "POST":
+                        return self._send(201, controller.add_channel(self._body()))
+                    raise ControlError(405, "Method tidak didukung")
+                match = _CHANNEL_PATH.match(path)
+                if not match:
+                    raise ControlError(404, "Endpoint tidak dikenal")
+                channel_id, action = match.groups()
+                if action and method == "POST":
+                    return self._send(200, controller.set_paused(channel_id, action == "pause"))
+                if not action and method == "GET":
+                    return self._send(200, controller.get_channel(channel_id))
+                if not action and method == "PATCH":
+                    return self._send(200, controller.update_channel(channel_id, self._body()))
+                if not action and method == "DELETE":
+                    return self._send(200, controller.remove_channel(channel_id))
+                raise ControlError(405, "Method tidak didukung")
+            except ControlError as e:
+                self._send(e.status, {"error": str(e)})
+            except Exception as e:
+                logging.error(f"[ControlAPI] Error memproses {method} {self.path}: {e}")
+                self._send(500, {"error": str(e)})
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="ControlAPI").start()
+    return server
@@ -0,0 +1,145 @@
+"""Koordinasi antar proses/host untuk mode shard: ID pesan yang sudah diklaim, blokir rate limit
+per token, dan cooldown Google API key.
+
+Backend dipilih lewat string COORDINATION_BACKEND:
+  ""/"local"          -> LocalBackend, satu proses (perilaku lama, tanpa I/O)
+  "sqlite:/path.db"   -> SqliteBackend, file SQLite (WAL) bersama proses di host/filesystem yang sama
+
+Backend lain (misal Redis) cukup mengimplementasikan method yang sama. Token & key tidak
+pernah disimpan mentah, hanya sidik jarinya.
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS claims (channel_id TEXT NOT NULL, message_id TEXT NOT NULL, claimed_at REAL NOT NULL, PRIMARY KEY (channel_id, message_id))",
+    "CREATE TABLE IF NOT EXISTS blocks (kind TEXT NOT NULL, key TEXT NOT NULL, until REAL NOT NULL, PRIMARY KEY (kind, key))",
+)
+
+
+def fingerprint(secret):
+    return hashlib.sha256(secret.encode("utf-8")).hexdigest()[:16]
+
+
+def shard_of(channel_id, shard_count):
+    """Nomor shard (0..shard_count-1) untuk channel ini; stabil antar proses & host."""
+    return int(hashlib.sha1(str(channel_id).encode("utf-8")).hexdigest(), 16) % shard_count
+
+
+class LocalBackend:
+    """Backend satu proses: semua klaim berhasil, tidak ada state bersama."""
+
+    name = "local"
+
+    def claim_message(self, channel_id, message_id):
+        return True
+
+    def block_token(self, token, bucket, until):
+        pass
+
+    def token_blocked_until(self, token, bucket):
+        return 0.0
+
+    def report_key_cooldown(self, api_key, until):
+        pass
+
+    def key_cooldowns(self):
+        return {}
+
+    def close(self):
+        pass
+
+
+class SqliteBackend:
+    """Backend file SQLite bersama. Blokir & cooldown dibaca dari snapshot yang diperbarui
+    maks sekali per refresh_interval detik, jadi request biasa tidak menyentuh disk."""
+
+    name = "sqlite"
+
+    def __init__(self, path, claim_ttl=86400, refresh_interval=0.5):
+        self.path = path
+        self.claim_ttl = claim_ttl
+        self.refresh_interval = refresh_interval
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            self.conn.execute(statement)
+        self.lock = threading.Lock() # Satu koneksi dipakai bersama thread di proses ini
+        self.blocks = {} # Snapshot {(kind, key): until}
+        self.next_refresh = 0.0
+        self.next_prune = time.time() + 60
+
+    def _refresh(self):
+        now = time.time()
+        if now < self.next_refresh:
+            return
+        self.next_refresh = now + self.refresh_interval
+        try:
+            rows = self.conn.execute("SELECT kind, key, until FROM blocks WHERE until > ?", (now,)).fetchall()
+            self.blocks = {(kind, key): until for kind, key, until in rows}
+            if now >= self.next_prune:
+                self.next_prune = now + 60
+                self.conn.execute("DELETE FROM blocks WHERE until <= ?", (now,))
+                self.conn.execute("DELETE FROM claims WHERE claimed_at < ?", (now - self.claim_ttl,))
+        except sqlite3.Error as e:
+            logging.warning(f"[Coordination] Gagal membaca {self.path}: {e}")
+
+    def claim_message(self, channel_id, message_id):
+        """True jika proses ini yang pertama mengklaim pesan tersebut."""
+        with self.lock:
+            try:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO claims (channel_id, message_id, claimed_at) VALUES (?, ?, ?)",
+                    (str(channel_id), str(message_id), time.time()))
+                return cursor.rowcount == 1
+            except sqlite3.Error as e:
+                logging.warning(f"[Coordination] Gagal klaim pesan {message_id}: {e}")
+                return True # Lebih baik membalas dobel daripada tidak membalas sama sekali
+
+    def _block(self, kind, key, until):
+        with self.lock:
+            try:
+                self.conn.execute(
+                    "INSERT INTO blocks (kind, key, until) VALUES (?, ?, ?) "
+                    "ON CONFLICT (kind, key) DO UPDATE SET until = MAX(until, excluded.until)",
+                    (kind, key, until))
+                self.blocks[(kind, key)] = max(self.blocks.get((kind, key), 0.0), until)
+            except sqlite3.Error as e:
+                logging.warning(f"[Coordination] Gagal menulis blokir {kind}: {e}")
+
+    def block_token(self, token, bucket, until):
+        """Mencatat bahwa bucket token ini kena 429 sampai `until` (epoch)."""
+        self._block("token", f"{fingerprint(token)}:{bucket}", until)
+
+    def token_blocked_until(self, token, bucket):
+        with self.lock:
+            self._refresh()
+            global_until = self.blocks.get(("token", f"{fingerprint(token)}:global"), 0.0)
+            return max(global_until, self.blocks.get(("token", f"{fingerprint(token)}:{bucket}"), 0.0))
+
+    def report_key_cooldown(self, api_key, until):
+        self._block("api_key", fingerprint(api_key), until)
+
+    def key_cooldowns(self):
+        """{sidik jari key: until} untuk key yang sedang cooldown di proses mana pun."""
+        with self.lock:
+            self._refresh()
+            return {key: until for (kind, key), until in self.blocks.items() if kind == "api_key"}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def create_backend(spec):
+    """Membuat backend dari string konfigurasi (lihat docstring modul)."""
+    spec = (spec or "").strip()
+    if not spec or spec == "local":
+        return LocalBackend()
+    if spec.startswith("sqlite:"):
+        return SqliteBackend(spec[len("sqlite:"):])
+    raise ValueError(f"COORDINATION_BACKEND tidak dikenal: {spec!r} (pakai 'local' atau 'sqlite:/path/file.db')")
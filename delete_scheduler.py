@@ -0,0 +1,117 @@
+"""Penjadwal penghapusan pesan tertunda: satu timer heap, bukan satu thread tidur per pesan.
+
+Entri heap hanya tuple kecil, jadi jutaan penghapusan tertunda tetap murah. Saat jatuh tempo,
+penghapusan di channel + token yang sama dikelompokkan agar bisa dikirim lewat endpoint
+bulk-delete dalam satu request.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DISCORD_EPOCH_MS = 1420070400000
+BULK_DELETE_MAX = 100
+BULK_DELETE_MAX_AGE = 14 * 24 * 3600 - 60 # Discord menolak bulk-delete pesan > 14 hari
+
+
+def snowflake_age(message_id, now=None):
+    """Umur pesan (detik) dari snowflake ID-nya."""
+    created = ((int(message_id) >> 22) + DISCORD_EPOCH_MS) / 1000.0
+    return (now or time.time()) - created
+
+
+class DeleteScheduler:
+    """Heap (due_at, seq, channel_id, message_id, token, channel_name) + satu thread penjadwal.
+
+    delete_one(channel_id, message_id, token, channel_name) dan
+    bulk_delete(channel_id, message_ids, token, channel_name) -> bool disediakan pemanggil.
+    on_done(channel_id, message_id) dipanggil setelah tiap penghapusan selesai dicoba.
+    """
+
+    def __init__(self, delete_one, bulk_delete=None, on_done=None, batch_window=1.0, workers=4):
+        self.delete_one = delete_one
+        self.bulk_delete = bulk_delete
+        self.on_done = on_done
+        self.batch_window = batch_window
+        self.workers = workers
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.executor = None
+        self.thread = None
+        self.stats = {"scheduled": 0, "deleted_single": 0, "deleted_bulk": 0, "bulk_requests": 0}
+
+    def _ensure_started(self):
+        if self.thread is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="Delete")
+            self.thread = threading.Thread(target=self._run, daemon=True, name="DeleteScheduler")
+            self.thread.start()
+
+    def schedule(self, channel_id, message_id, token, due_at, channel_name="Unknown"):
+        """Menjadwalkan penghapusan pada waktu epoch due_at."""
+        with self.condition:
+            self._ensure_started()
+            seq = next(self.counter)
+            heapq.heappush(self.heap, (due_at, seq, channel_id, message_id, token, channel_name))
+            self.stats["scheduled"] += 1
+            if self.heap[0][1] == seq: # Entri baru jadi yang paling awal, bangunkan penjadwal
+                self.condition.notify()
+
+    def pending(self):
+        with self.condition:
+            return len(self.heap)
+
+    def _take_due(self):
+        with self.condition:
+            while True:
+                if not self.heap:
+                    self.condition.wait()
+                    continue
+                wait = self.heap[0][0] - time.time()
+                if wait > 0:
+                    self.condition.wait(timeout=wait)
+                    continue
+                # Ambil semua yang jatuh tempo, plus yang akan jatuh tempo dalam batch_window
+                limit = time.time() + self.batch_window
+                due = []
+                while self.heap and self.heap[0][0] <= limit:
+                    due.append(heapq.heappop(self.heap))
+                return due
+
+    def _run(self):
+        while True:
+            due = self._take_due()
+            groups = {}
+            for _, _, channel_id, message_id, token, channel_name in due:
+                groups.setdefault((channel_id, token), (channel_name, []))[1].append(message_id)
+            for (channel_id, token), (channel_name, message_ids) in groups.items():
+                self.executor.submit(self._execute, channel_id, token, channel_name, message_ids)
+
+    def _execute(self, channel_id, token, channel_name, message_ids):
+        try:
+            singles = list(message_ids)
+            if self.bulk_delete and len(message_ids) >= 2:
+                now = time.time()
+                young = [m for m in message_ids if snowflake_age(m, now) < BULK_DELETE_MAX_AGE]
+                singles = [m for m in message_ids if snowflake_age(m, now) >= BULK_DELETE_MAX_AGE]
+                for i in range(0, len(young), BULK_DELETE_MAX):
+                    chunk = young[i:i + BULK_DELETE_MAX]
+                    if len(chunk) >= 2 and self.bulk_delete(channel_id, chunk, token, channel_name):
+                        self.stats["bulk_requests"] += 1
+                        self.stats["deleted_bulk"] += len(chunk)
+                        self._done(channel_id, chunk)
+                    else:
+                        singles.extend(chunk)
+            for message_id in singles:
+                self.delete_one(channel_id, message_id, token, channel_name)
+                self.stats["deleted_single"] += 1
+                self._done(channel_id, [message_id])
+        except Exception as e:
+            logging.error(f"[DeleteScheduler] Error menghapus {len(message_ids)} pesan di {channel_id}: {e}")
+
+    def _done(self, channel_id, message_ids):
+        if self.on_done:
+            for message_id in message_ids:
+                self.on_done(channel_id, message_id)
@@ -0,0 +1,261 @@
+"""Klien gateway Discord minimal untuk menerima event MESSAGE_CREATE secara real-time.
+
+Dipakai bot.py sebagai sumber pesan berbasis event; REST polling tetap menjadi fallback
+selama koneksi gateway belum siap. Membutuhkan paket opsional `websocket-client`.
+URL gateway bisa diarahkan ke server websocket lokal (ws://127.0.0.1:PORT) untuk uji.
+"""
+import collections
+import json
+import logging
+import random
+import threading
+import time
+
+try:
+    import websocket # Paket websocket-client (opsional)
+except ImportError:
+    websocket = None
+
+DEFAULT_GATEWAY_URL = "wss://gateway.discord.gg/?v=10&encoding=json"
+# GUILD_MESSAGES | DIRECT_MESSAGES | MESSAGE_CONTENT
+DEFAULT_INTENTS = (1 << 9) | (1 << 12) | (1 << 15)
+
+OP_DISPATCH = 0
+OP_HEARTBEAT = 1
+OP_IDENTIFY = 2
+OP_RESUME = 6
+OP_RECONNECT = 7
+OP_INVALID_SESSION = 9
+OP_HELLO = 10
+OP_HEARTBEAT_ACK = 11
+
+
+def is_available():
+    """True jika paket websocket-client terpasang."""
+    return websocket is not None
+
+
+class GatewayReconnect(Exception):
+    """Dipakai internal untuk memutus koneksi dan menyambung ulang."""
+
+
+class GatewayClient:
+    """Satu koneksi gateway untuk satu token; memanggil on_message(data) untuk tiap MESSAGE_CREATE."""
+
+    def __init__(self, token, on_message, url=DEFAULT_GATEWAY_URL, intents=DEFAULT_INTENTS, name="Gateway"):
+        self.token = token
+        self.on_message = on_message
+        self.url = url
+        self.intents = intents
+        self.name = name
+        self.ready = threading.Event() # Terpasang selama sesi aktif (setelah READY/RESUMED)
+        self.sessions_started = 0 # Naik setiap READY (sesi baru; event selama terputus tidak diputar ulang)
+        self._stop = threading.Event()
+        self._ws = None
+        self._seq = None
+        self._session_id = None
+        self._resume_url = None
+        self._ack_received = True
+        self._thread = None
+
+    def start(self):
+        if websocket is None:
+            raise RuntimeError("Paket 'websocket-client' belum terpasang (pip install websocket-client).")
+        self._thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.ready.clear()
+        self._close()
+
+    def _close(self):
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def _send(self, op, data):
+        self._ws.send(json.dumps({"op": op, "d": data}))
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            try:
+                self._connect_once()
+                backoff = 1
+            except GatewayReconnect as e:
+                logging.info(f"[{self.name}] Menyambung ulang gateway: {e}")
+                self._stop.wait(1)
+            except Exception as e:
+                logging.warning(f"[{self.name}] Koneksi gateway terputus: {e}. Coba lagi dalam {backoff} detik.")
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                self.ready.clear()
+                self._close()
+
+    def _connect_once(self):
+        url = self._resume_url if self._session_id and self._resume_url else self.url
+        self._ws = websocket.create_connection(url, timeout=30)
+        hello = json.loads(self._ws.recv())
+        if hello.get("op") != OP_HELLO:
+            raise GatewayReconnect(f"Paket pertama bukan HELLO (op {hello.get('op')})")
+        interval = hello["d"]["heartbeat_interval"] / 1000.0
+        self._ws.settimeout(interval * 2) # recv tidak boleh diam lebih lama dari 2x heartbeat
+
+        self._ack_received = True
+        heartbeat_stop = threading.Event()
+        threading.Thread(target=self._heartbeat_loop, args=(interval, heartbeat_stop), daemon=True, name=f"{self.name}-HB").start()
+        try:
+            if self._session_id:
+                self._send(OP_RESUME, {"token": self.token, "session_id": self._session_id, "seq": self._seq})
+            else:
+                self._send(OP_IDENTIFY, {
+                    "token": self.token,
+                    "intents": self.intents,
+                    "properties": {"os": "linux", "browser": "multibot", "device": "multibot"},
+                })
+            while not self._stop.is_set():
+                raw = self._ws.recv()
+                if not raw:
+                    raise GatewayReconnect("Koneksi ditutup oleh server")
+                self._handle(json.loads(raw))
+        finally:
+            heartbeat_stop.set()
+
+    def _heartbeat_loop(self, interval, heartbeat_stop):
+        # Heartbeat pertama diberi jitter sesuai anjuran Discord
+        if heartbeat_stop.wait(interval * random.random()):
+            return
+        while not heartbeat_stop.is_set():
+            if not self._ack_received:
+                logging.warning(f"[{self.name}] Heartbeat tidak di-ACK (koneksi zombie). Menyambung ulang...")
+                self._close()
+                return
+            self._ack_received = False
+            try:
+                self._send(OP_HEARTBEAT, self._seq)
+            except Exception:
+                return
+            heartbeat_stop.wait(interval)
+
+    def _handle(self, packet):
+        op = packet.get("op")
+        if packet.get("s") is not None:
+            self._seq = packet["s"]
+
+        if op == OP_DISPATCH:
+            event = packet.get("t")
+            data = packet.get("d") or {}
+            if event == "READY":
+                self._session_id = data.get("session_id")
+                resume_url = data.get("resume_gateway_url")
+                self._resume_url = f"{resume_url}/?v=10&encoding=json" if resume_url else None
+                self.sessions_started += 1
+                self.ready.set()
+                logging.info(f"[{self.name}] Gateway READY (session {str(self._session_id)[:8]}...).")
+            elif event == "RESUMED":
+                self.ready.set()
+                logging.info(f"[{self.name}] Sesi gateway dilanjutkan (RESUMED).")
+            elif event == "MESSAGE_CREATE":
+                try:
+                    self.on_message(data)
+                except Exception as e:
+                    logging.error(f"[{self.name}] Error memproses MESSAGE_CREATE: {e}")
+        elif op == OP_HEARTBEAT:
+            self._send(OP_HEARTBEAT, self._seq)
+        elif op == OP_HEARTBEAT_ACK:
+            self._ack_received = True
+        elif op == OP_RECONNECT:
+            raise GatewayReconnect("Server meminta reconnect (op 7)")
+        elif op == OP_INVALID_SESSION:
+            if not packet.get("d"): # Sesi tidak bisa dilanjutkan, identify ulang dari awal
+                self._session_id = None
+                self._seq = None
+                self._resume_url = None
+            time.sleep(random.uniform(1, 5))
+            raise GatewayReconnect("Sesi tidak valid (op 9)")
+
+
+class GatewayIntake:
+    """Menampung event MESSAGE_CREATE per channel dari koneksi gateway (satu koneksi per token)."""
+
+    def __init__(self, url=DEFAULT_GATEWAY_URL, buffer_size=100):
+        self.url = url
+        self.buffer_size = buffer_size
+        self.buffers = {}   # {channel_id: deque event terbaru}
+        self.listeners = {} # {channel_id: GatewayClient yang mendengarkan channel ini}
+        self.clients = {}   # {token: GatewayClient}
+        self.lock = threading.Lock()
+
+    def register(self, channel_id, token):
+        """Mendaftarkan channel agar event-nya ditampung; koneksi token dibuat jika belum ada."""
+        with self.lock:
+            client = self.clients.get(token)
+            if client is None:
+                client = GatewayClient(token, self._on_message, url=self.url, name=f"Gateway-{token[-6:]}")
+                self.clients[token] = client
+                client.start()
+            self.buffers.setdefault(channel_id, collections.deque(maxlen=self.buffer_size))
+            previous = self.listeners.get(channel_id)
+            self.listeners[channel_id] = client
+            orphan = self._orphan(previous)
+        if orphan is not None:
+            orphan.stop()
+
+    def unregister(self, channel_id):
+        """Berhenti menampung event channel ini; koneksi token ditutup jika tidak dipakai channel lain."""
+        with self.lock:
+            self.buffers.pop(channel_id, None)
+            orphan = self._orphan(self.listeners.pop(channel_id, None))
+        if orphan is not None:
+            orphan.stop()
+
+    def _orphan(self, client):
+        """Melepas client dari self.clients jika tidak ada channel yang mendengarkan (panggil dengan lock)."""
+        if client is None or client in self.listeners.values():
+            return None
+        self.clients = {token: c for token, c in self.clients.items() if c is not client}
+        return client
+
+    def is_live(self, channel_id):
+        """True jika sesi gateway untuk channel ini sedang aktif."""
+        client = self.listeners.get(channel_id)
+        return client is not None and client.ready.is_set()
+
+    def session(self, channel_id):
+        """Penanda sesi gateway channel ini (berubah setiap READY baru), atau None jika tidak aktif.
+
+        Pemanggil yang melihat penanda baru perlu catch-up lewat REST: pesan sebelum READY tidak ditampung."""
+        client = self.listeners.get(channel_id)
+        if client is None or not client.ready.is_set():
+            return None
+        return id(client), client.sessions_started
+
+    def _on_message(self, data):
+        buffer = self.buffers.get(data.get('channel_id'))
+        if buffer is not None:
+            with self.lock:
+                buffer.append(data)
+
+    def drain(self, channel_id):
+        """Mengambil semua event tertampung (urut terbaru dulu, format sama dengan REST)."""
+        with self.lock:
+            buffer = self.buffers.get(channel_id)
+            if not buffer:
+                return []
+            events = list(buffer)
+            buffer.clear()
+        return sorted(events, key=lambda m: int(m.get('id', 0)), reverse=True)
+
+    def stop(self):
+        """Menutup semua koneksi gateway."""
+        with self.lock:
+            clients = list(self.clients.values())
+            self.clients.clear()
+            self.listeners.clear()
+        for client in clients:
+            client.stop()
@@ -0,0 +1,95 @@
+"""Layanan generasi balasan AI: pool worker terbatas + antrean prioritas berbatas.
+
+Channel tidak lagi memanggil Gemini langsung di loop-nya. Mereka mengirim permintaan ke
+antrean dan menerima Future; mention & reply langsung diproses lebih dulu, dan permintaan
+yang terlalu lama mengantre dibuang karena pesannya sudah basi.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+PRIORITY_MENTION = 0 # Mention / reply langsung ke bot terkelola
+PRIORITY_NORMAL = 1
+
+
+class GenerationRejected(Exception):
+    """Antrean penuh dan permintaan ini kalah prioritas."""
+
+
+class GenerationExpired(Exception):
+    """Permintaan terlalu lama mengantre sebelum sempat diproses."""
+
+
+class GenerationService:
+    """Menjalankan fungsi generasi di `workers` thread dengan antrean prioritas maks `max_queue` item."""
+
+    def __init__(self, workers=4, max_queue=200, max_age=120):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_age = max_age
+        self.heap = [] # (priority, seq, enqueued_at, max_age, future, func, args, kwargs)
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.threads = []
+        self.running = 0
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "expired": 0, "rejected": 0}
+
+    def _ensure_started(self):
+        if not self.threads:
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, daemon=True, name=f"Generation-{i+1}")
+                thread.start()
+                self.threads.append(thread)
+
+    def submit(self, func, *args, priority=PRIORITY_NORMAL, max_age=None, **kwargs):
+        """Menjadwalkan func(*args, **kwargs); mengembalikan concurrent.futures.Future."""
+        future = Future()
+        item = (priority, next(self.counter), time.monotonic(), max_age or self.max_age, future, func, args, kwargs)
+        with self.condition:
+            self._ensure_started()
+            self.stats["submitted"] += 1
+            if len(self.heap) >= self.max_queue:
+                worst = max(self.heap)
+                if worst[:2] <= item[:2]: # Yang baru tidak lebih penting dari isi antrean
+                    self.stats["rejected"] += 1
+                    future.set_exception(GenerationRejected("Antrean generasi penuh"))
+                    return future
+                self.heap.remove(worst)
+                heapq.heapify(self.heap)
+                self.stats["rejected"] += 1
+                worst[4].set_exception(GenerationRejected("Digeser permintaan berprioritas lebih tinggi"))
+            heapq.heappush(self.heap, item)
+            self.condition.notify()
+        return future
+
+    def depth(self):
+        with self.condition:
+            return len(self.heap)
+
+    def _worker(self):
+        while True:
+            with self.condition:
+                while not self.heap:
+                    self.condition.wait()
+                _, _, enqueued_at, max_age, future, func, args, kwargs = heapq.heappop(self.heap)
+                waited = time.monotonic() - enqueued_at
+                if waited > max_age:
+                    self.stats["expired"] += 1
+                    future.set_exception(GenerationExpired(f"Kedaluwarsa setelah {waited:.1f} detik di antrean"))
+                    continue
+                if not future.set_running_or_notify_cancel():
+                    continue # Dibatalkan pemanggil
+                self.running += 1
+            try:
+                future.set_result(func(*args, **kwargs))
+                outcome = "completed"
+            except Exception as e:
+                logging.error(f"[GenerationService] Error generasi: {e}")
+                future.set_exception(e)
+                outcome = "failed"
+            with self.condition:
+                self.running -= 1
+                self.stats[outcome] += 1
@@ -0,0 +1,112 @@
+"""Konfigurasi logging bot: writer latar belakang (QueueListener), output JSON, dan penahan spam.
+
+Mode antrean memindahkan format & tulis ke stderr ke satu thread writer, jadi thread channel
+tidak pernah menunggu I/O log. RepeatFilter menahan baris yang sama berulang-ulang (misal
+"Slow mode aktif" tiap siklus atau 429 beruntun) dan melaporkan jumlah yang ditahan.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import threading
+import time
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - [%(threadName)s] - %(message)s'
+_NUMBERS = re.compile(r"\d+(?:\.\d+)?")
+
+
+class JsonFormatter(logging.Formatter):
+    """Satu objek JSON per baris: waktu, level, thread, channel (jika ada), pesan."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        channel = getattr(record, "channel", None)
+        if channel:
+            entry["channel"] = channel
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RepeatFilter(logging.Filter):
+    """Meloloskan maks `burst` baris serupa per `window` detik; sisanya ditahan dan dihitung.
+
+    Baris dianggap serupa jika level dan template pesannya sama setelah angka dinormalisasi,
+    sehingga "retry setelah 0.42 detik" dan "retry setelah 0.37 detik" satu kelompok.
+    """
+
+    def __init__(self, window=60.0, burst=3, max_keys=10000):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.max_keys = max_keys
+        self.seen = {} # {key: [window_start, passed, suppressed]}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.levelno, _NUMBERS.sub("#", str(record.msg)))
+        now = time.monotonic()
+        with self.lock:
+            entry = self.seen.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                suppressed = entry[2] if entry else 0
+                if len(self.seen) >= self.max_keys:
+                    self._prune(now)
+                self.seen[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} [+{suppressed} baris serupa ditahan]"
+                return True
+            if entry[1] < self.burst:
+                entry[1] += 1
+                return True
+            entry[2] += 1
+            return False
+
+    def _prune(self, now):
+        for key in [k for k, v in self.seen.items() if now - v[0] >= self.window]:
+            del self.seen[key]
+        if len(self.seen) >= self.max_keys:
+            self.seen.clear()
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang tidak memformat pesan di thread pemanggil; format dilakukan writer."""
+
+    def prepare(self, record):
+        return record
+
+
+def stop_listener(listener):
+    """Menghentikan writer setelah antrean kosong; aman dipanggil lebih dari sekali."""
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
+
+def setup_logging(level="INFO", fmt="text", use_queue=False, repeat_window=60.0, repeat_burst=3):
+    """Memasang handler stderr pada root logger. Mengembalikan QueueListener (atau None)."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+    listener = None
+    if use_queue:
+        listener = logging.handlers.QueueListener(queue.SimpleQueue(), handler, respect_handler_level=True)
+        front = DeferredQueueHandler(listener.queue)
+        listener.start()
+        atexit.register(stop_listener, listener) # Tulis sisa antrean sebelum proses keluar
+    else:
+        front = handler
+    if repeat_window > 0:
+        front.addFilter(RepeatFilter(repeat_window, repeat_burst))
+    root.addHandler(front)
+    return listener
@@ -0,0 +1,96 @@
+"""Pool pesan untuk mode file (pesan.txt): diparse sekali, dimuat ulang hanya jika file berubah.
+
+Format file: satu pesan per baris, baris diawali '#' adalah komentar. Bobot opsional
+ditulis di depan baris, misal "[3] Halo semua!" = muncul 3x per putaran (default 1).
+"""
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+_WEIGHT_PREFIX = re.compile(r"^\[(\d+)\]\s*(.+)$")
+
+
+def parse_lines(lines):
+    """Mengubah baris file menjadi daftar (pesan, bobot)."""
+    entries = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        weight = 1
+        match = _WEIGHT_PREFIX.match(line)
+        if match:
+            weight, line = int(match.group(1)), match.group(2).strip()
+        if weight > 0 and line:
+            entries.append((line, weight))
+    return entries
+
+
+class MessageFile:
+    """Isi satu file pesan yang sudah diparse; stat ulang maks sekali per check_interval detik."""
+
+    def __init__(self, path, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self.entries = []
+        self.mtime = None
+        self.version = 0 # Naik setiap kali isi file dimuat ulang
+        self.next_check = 0.0
+        self.lock = threading.Lock()
+
+    def get(self):
+        """(version, entries) terbaru; membaca ulang file hanya jika mtime berubah."""
+        now = time.monotonic()
+        with self.lock:
+            if now >= self.next_check:
+                self.next_check = now + self.check_interval
+                mtime = os.stat(self.path).st_mtime_ns # FileNotFoundError diteruskan ke pemanggil
+                if mtime != self.mtime:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        self.entries = parse_lines(f)
+                    self.mtime = mtime
+                    self.version += 1
+                    logging.debug(f"[MessagePool] {self.path} dimuat ulang: {len(self.entries)} pesan.")
+            return self.version, self.entries
+
+
+class MessageSampler:
+    """Sampling tanpa pengulangan dari satu atau beberapa MessageFile (per channel).
+
+    Setiap putaran berisi tiap pesan sebanyak bobotnya, diacak lalu dikeluarkan satu per satu;
+    putaran baru dimulai setelah semua terpakai atau ketika salah satu file berubah.
+    Thread-safe lewat lock milik sampler sendiri, jadi sampler channel lain tidak ikut tertahan.
+    """
+
+    def __init__(self, files):
+        self.files = files
+        self.versions = None
+        self.bag = []
+        self.last = None
+        self.lock = threading.Lock()
+
+    def _refill(self, entries):
+        self.bag = [text for text, weight in entries for _ in range(weight)]
+        random.shuffle(self.bag)
+        if len(self.bag) > 1 and self.bag[-1] == self.last:
+            swap = next((i for i, text in enumerate(self.bag) if text != self.last), 0)
+            self.bag[swap], self.bag[-1] = self.bag[-1], self.bag[swap] # Jangan ulangi pesan terakhir putaran sebelumnya
+
+    def next(self):
+        """Pesan berikutnya, atau None jika semua file kosong."""
+        snapshots = [f.get() for f in self.files] # MessageFile punya lock sendiri
+        versions = tuple(version for version, _ in snapshots)
+        with self.lock:
+            if versions != self.versions:
+                self.versions = versions
+                self.bag = []
+            if not self.bag:
+                entries = [entry for _, file_entries in snapshots for entry in file_entries]
+                if not entries:
+                    return None
+                self._refill(entries)
+            self.last = self.bag.pop()
+            return self.last
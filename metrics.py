@@ -0,0 +1,169 @@
+"""Metrik internal dalam format teks Prometheus, plus endpoint HTTP lokal opsional.
+
+Tanpa dependensi tambahan: counter & histogram disimpan di memori (thread-safe) dan
+ditulis ulang ke format exposition 0.0.4 setiap kali /metrics diminta. Nilai yang sudah
+dilacak modul lain (kedalaman antrean, jumlah thread) dibaca lewat callback saat scrape.
+"""
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Counter monoton naik dengan label opsional."""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.values = {} # {label_values: float}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            items = list(self.values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Histogram kumulatif (bucket `le`, `_sum`, `_count`) dengan label opsional."""
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {} # {label_values: [count per bucket..., count +Inf, sum]}
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = [(key, list(state)) for key, state in self.values.items()]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge/counter yang nilainya dibaca saat scrape: func() -> angka, atau {label_values: angka}."""
+
+    def __init__(self, name, help_text, func, kind="gauge", labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.func = func
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        try:
+            value = self.func()
+        except Exception as e:
+            logging.debug(f"[Metrics] Gagal membaca {self.name}: {e}")
+            return lines
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for key, item in items:
+            key = key if isinstance(key, tuple) else (key,)
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(item)}")
+        return lines
+
+
+class Registry:
+    """Kumpulan metrik yang dirender bersama."""
+
+    def __init__(self):
+        self.metrics = []
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def callback(self, name, help_text, func, kind="gauge", labelnames=()):
+        return self._register(CallbackMetric(name, help_text, func, kind, labelnames))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+def start_server(registry, host="127.0.0.1", port=9108):
+    """Menjalankan endpoint GET /metrics di thread daemon. Mengembalikan server-nya."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass # Jangan banjiri log bot dengan akses scrape
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="MetricsServer").start()
+    return server
@@ -0,0 +1,119 @@
+"""Pengelola bucket rate limit Discord yang dipakai bersama semua channel & token.
+
+Setiap respons REST dibaca header X-RateLimit-*-nya. Bucket dilacak per token + route,
+sehingga request berikutnya menunggu dulu SEBELUM kena 429 (bukan bereaksi sesudahnya).
+"""
+import re
+import threading
+import time
+from collections import deque
+
+# Parameter mayor Discord: ID setelah segmen ini menentukan bucket sendiri
+MAJOR_PARAMETERS = ("channels", "guilds", "webhooks")
+_ID_SEGMENT = re.compile(r"^\d{5,}$")
+
+
+def route_key(method, path):
+    """Normalisasi method + path menjadi kunci route (ID non-mayor diganti {id})."""
+    parts = path.split("?", 1)[0].strip("/").split("/")
+    normalized = []
+    for i, part in enumerate(parts):
+        if _ID_SEGMENT.match(part) and not (i > 0 and parts[i - 1] in MAJOR_PARAMETERS):
+            normalized.append("{id}")
+        else:
+            normalized.append(part)
+    return f"{method.upper()} /{'/'.join(normalized)}"
+
+
+def _float_header(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Melacak bucket per (token, route) dan limit global per token; thread-safe."""
+
+    def __init__(self, global_per_second=50, shared=None):
+        self.global_per_second = global_per_second
+        self.shared = shared # Backend koordinasi (mode shard): 429 dibagi ke proses lain lewat sini
+        self.lock = threading.Lock()
+        self.route_buckets = {}  # {(token, route): bucket_hash dari header}
+        self.buckets = {}        # {(token, bucket_key): {"remaining": int, "reset_at": float}}
+        self.global_reset = {}   # {token: waktu global limit berakhir}
+        self.global_window = {}  # {token: deque waktu request dalam 1 detik terakhir}
+        self.stats = {"waits": 0, "wait_seconds": 0.0, "limited": 0}
+
+    def _bucket_key(self, token, route):
+        bucket_hash = self.route_buckets.get((token, route))
+        if bucket_hash is None:
+            return (token, route)
+        # Hash bucket + parameter mayor (misal channel ID) = satu bucket nyata
+        major = "/".join(p for p in route.split(" ", 1)[1].split("/") if p.isdigit())
+        return (token, f"{bucket_hash}:{major}")
+
+    def _wait_time(self, token, route, now):
+        wait = max(0.0, self.global_reset.get(token, 0) - now)
+        window = self.global_window.setdefault(token, deque())
+        while window and now - window[0] >= 1.0:
+            window.popleft()
+        if self.global_per_second and len(window) >= self.global_per_second:
+            wait = max(wait, 1.0 - (now - window[0]))
+        bucket = self.buckets.get(self._bucket_key(token, route))
+        if bucket and bucket["remaining"] <= 0 and bucket["reset_at"] > now:
+            wait = max(wait, bucket["reset_at"] - now)
+        return wait
+
+    def acquire(self, token, route):
+        """Menunggu sampai request ke route ini aman dikirim. Mengembalikan total detik menunggu."""
+        waited = 0.0
+        while True:
+            shared_wait = max(0.0, self.shared.token_blocked_until(token, route) - time.time()) if self.shared else 0.0
+            with self.lock:
+                now = time.monotonic()
+                wait = max(shared_wait, self._wait_time(token, route, now))
+                if wait <= 0:
+                    bucket = self.buckets.get(self._bucket_key(token, route))
+                    if bucket and bucket["reset_at"] > now:
+                        bucket["remaining"] -= 1 # Reservasi slot sebelum respons datang
+                    self.global_window[token].append(now)
+                    if waited > 0:
+                        self.stats["waits"] += 1
+                        self.stats["wait_seconds"] += waited
+                    return waited
+            time.sleep(wait)
+            waited += wait
+
+    def update(self, token, route, response):
+        """Memperbarui state bucket dari header respons (termasuk 429)."""
+        headers = response.headers
+        now = time.monotonic()
+        bucket_hash = headers.get("X-RateLimit-Bucket")
+        remaining = _float_header(headers, "X-RateLimit-Remaining")
+        reset_after = _float_header(headers, "X-RateLimit-Reset-After")
+        is_global = str(headers.get("X-RateLimit-Global", "")).lower() == "true"
+
+        with self.lock:
+            if bucket_hash:
+                self.route_buckets[(token, route)] = bucket_hash
+            if remaining is not None and reset_after is not None:
+                self.buckets[self._bucket_key(token, route)] = {"remaining": int(remaining), "reset_at": now + reset_after}
+
+            if response.status_code == 429:
+                self.stats["limited"] += 1
+                retry_after = self.retry_after(response)
+                if is_global:
+                    self.global_reset[token] = now + retry_after
+                else:
+                    self.buckets[self._bucket_key(token, route)] = {"remaining": 0, "reset_at": now + retry_after}
+        if response.status_code == 429 and self.shared:
+            self.shared.block_token(token, "global" if is_global else route, time.time() + retry_after)
+
+    @staticmethod
+    def retry_after(response):
+        """Membaca retry_after (detik) dari body atau header respons 429."""
+        try:
+            return float(response.json().get("retry_after"))
+        except Exception:
+            return _float_header(response.headers, "Retry-After") or 1.0
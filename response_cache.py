@@ -0,0 +1,115 @@
+"""Cache LRU + TTL untuk balasan Gemini, dengan beberapa kandidat balasan per prompt.
+
+Pesan channel yang hampir sama ("gm", "hello", "wen role") menghasilkan prompt yang sama
+setelah dinormalisasi, sehingga balasannya bisa diambil dari cache tanpa request ke Gemini.
+Tiap kunci menyimpan beberapa kandidat agar balasan tidak selalu sama persis.
+"""
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+_NON_WORD = re.compile(r"[^\w\s]+", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+
+def normalize(text):
+    """Huruf kecil, tanpa tanda baca, spasi dirapikan."""
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+
+class ResponseCache:
+    """{(bahasa, prompt ternormalisasi): kandidat balasan}; LRU dengan batas ukuran dan TTL."""
+
+    def __init__(self, max_entries=1000, ttl=3600, candidates_per_key=3, path=None, save_every=50):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.candidates_per_key = candidates_per_key
+        self.path = path
+        self.save_every = save_every
+        self.entries = OrderedDict() # {key: {"expires_at": float, "candidates": [...], "last": int}}
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock() # Satu penulis file pada satu waktu
+        self.hits = 0
+        self.misses = 0
+        self._unsaved = 0
+        if path:
+            self.load()
+
+    @staticmethod
+    def make_key(prompt, language):
+        return f"{language}|{normalize(prompt)}"
+
+    def get(self, key):
+        """Mengambil balasan dari cache, atau None (miss) jika kosong, kedaluwarsa, atau kandidat belum lengkap."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry["expires_at"] <= time.time():
+                del self.entries[key]
+                entry = None
+            if not entry or len(entry["candidates"]) < self.candidates_per_key:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            # Hindari mengulang kandidat yang sama dua kali berturut-turut
+            choices = [i for i in range(len(entry["candidates"])) if i != entry["last"]] or [0]
+            entry["last"] = random.choice(choices)
+            self.hits += 1
+            return entry["candidates"][entry["last"]]
+
+    def put(self, key, text):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {"expires_at": time.time() + self.ttl, "candidates": [], "last": -1}
+            if text not in entry["candidates"]:
+                entry["candidates"].append(text)
+                del entry["candidates"][:-self.candidates_per_key]
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False) # Buang yang paling lama tidak dipakai
+            self._unsaved += 1
+            should_save = self.path and self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0, "size": len(self.entries)}
+
+    def load(self):
+        """Memuat cache dari disk (entri kedaluwarsa dibuang)."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning(f"[ResponseCache] Gagal memuat {self.path}: {e}")
+            return
+        now = time.time()
+        with self.lock:
+            for key, entry in data.items():
+                if entry.get("expires_at", 0) > now and entry.get("candidates"):
+                    self.entries[key] = {"expires_at": entry["expires_at"], "candidates": entry["candidates"][-self.candidates_per_key:], "last": -1}
+
+    def save(self):
+        """Menyimpan cache ke disk secara atomik (tulis file sementara lalu rename)."""
+        if not self.path:
+            return
+        with self.lock:
+            data = {key: {"expires_at": e["expires_at"], "candidates": e["candidates"]} for key, e in self.entries.items()}
+            self._unsaved = 0
+        tmp_path = f"{self.path}.{os.getpid()}.tmp" # Unik per proses
+        with self.save_lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logging.warning(f"[ResponseCache] Gagal menyimpan {self.path}: {e}")
@@ -0,0 +1,166 @@
+"""Antrean kirim pesan per token: satu antrean keluar per token, adil antar channel.
+
+Setiap token punya satu thread pengirim. Di dalam token, balasan (PRIORITY_REPLY) selalu
+didahulukan dari posting mode file (PRIORITY_POST); untuk prioritas yang sama channel dilayani
+bergiliran (round-robin), jadi satu channel ramai tidak menahan channel lain di token yang sama.
+Jika fungsi kirim melempar RetryLater (429), pesan dikembalikan ke depan antrean channel-nya dan
+dicoba lagi setelah retry_after; pesan yang lebih tua dari max_age dibuang karena sudah basi.
+"""
+import collections
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+PRIORITY_REPLY = 0 # Balasan ke pesan user/bot
+PRIORITY_POST = 1  # Posting mode file
+
+
+class RetryLater(Exception):
+    """Dilempar fungsi kirim agar pesan dicoba lagi setelah `retry_after` detik."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Coba lagi dalam {retry_after:.2f} detik")
+        self.retry_after = retry_after
+
+
+class SendExpired(Exception):
+    """Pesan terlalu lama di antrean (termasuk menunggu retry) dan dibuang."""
+
+
+class _Job:
+    __slots__ = ("channel_id", "func", "future", "enqueued_at", "attempts")
+
+    def __init__(self, channel_id, func):
+        self.channel_id = channel_id
+        self.func = func
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class _TokenQueue:
+    """Antrean satu token: {prioritas: OrderedDict channel -> deque job}, urutan dict = giliran."""
+
+    def __init__(self):
+        self.lanes = {PRIORITY_REPLY: collections.OrderedDict(), PRIORITY_POST: collections.OrderedDict()}
+        self.not_before = {} # {channel_id: waktu monotonic} selama channel menunggu retry_after
+        self.size = 0
+
+    def push(self, priority, job, front=False):
+        lane = self.lanes[priority].setdefault(job.channel_id, collections.deque())
+        if front:
+            lane.appendleft(job)
+        else:
+            lane.append(job)
+        self.size += 1
+
+    def pop(self, now):
+        """(prioritas, job) berikutnya yang siap, atau (None, detik sampai ada yang siap / None jika kosong)."""
+        earliest = None
+        for priority in sorted(self.lanes):
+            lane = self.lanes[priority]
+            for channel_id, jobs in lane.items():
+                ready_at = self.not_before.get(channel_id, 0.0)
+                if ready_at > now:
+                    earliest = ready_at if earliest is None else min(earliest, ready_at)
+                    continue
+                job = jobs.popleft()
+                if jobs:
+                    lane.move_to_end(channel_id) # Giliran channel berikutnya
+                else:
+                    del lane[channel_id]
+                self.size -= 1
+                return priority, job
+        return None, None if earliest is None else earliest - now
+
+
+class SendQueue:
+    """Menjalankan fungsi kirim per token secara berurutan; submit() mengembalikan Future.
+
+    Hasil Future = nilai kembalian fungsi kirim (True/False), atau SendExpired jika basi.
+    `on_wait(detik)` dipanggil setiap kali pesan mulai dikirim (untuk metrik waktu tunggu).
+    """
+
+    def __init__(self, max_age=120, on_wait=None):
+        self.max_age = max_age
+        self.on_wait = on_wait
+        self.queues = {}  # {token: _TokenQueue}
+        self.threads = {} # {token: Thread}
+        self.condition = threading.Condition()
+        self.stats = {"submitted": 0, "sent": 0, "failed": 0, "retried": 0, "expired": 0,
+                      "wait_seconds": 0.0, "max_wait_seconds": 0.0}
+
+    def submit(self, token, channel_id, func, priority=PRIORITY_POST):
+        """Menjadwalkan func() di antrean token ini."""
+        job = _Job(channel_id, func)
+        with self.condition:
+            queue = self.queues.get(token)
+            if queue is None:
+                queue = self.queues[token] = _TokenQueue()
+                thread = threading.Thread(target=self._worker, args=(token, queue), daemon=True, name=f"Send-{token[-6:]}")
+                self.threads[token] = thread
+                thread.start()
+            queue.push(priority, job)
+            self.stats["submitted"] += 1
+            self.condition.notify_all()
+        return job.future
+
+    def depth(self):
+        with self.condition:
+            return sum(queue.size for queue in self.queues.values())
+
+    def depth_by_token(self):
+        """{akhiran token: jumlah pesan mengantre} (token tidak pernah ditampilkan utuh)."""
+        with self.condition:
+            return {f"...{token[-6:]}": queue.size for token, queue in self.queues.items()}
+
+    def summary(self):
+        with self.condition:
+            started = self.stats["sent"] + self.stats["failed"]
+            return {
+                **{key: value for key, value in self.stats.items() if key != "wait_seconds"},
+                "depth": sum(queue.size for queue in self.queues.values()),
+                "avg_wait_seconds": round(self.stats["wait_seconds"] / started, 3) if started else 0.0,
+            }
+
+    def _worker(self, token, queue):
+        while True:
+            with self.condition:
+                while True:
+                    now = time.monotonic()
+                    priority, item = queue.pop(now)
+                    if priority is not None:
+                        break
+                    self.condition.wait(item) # item = detik sampai retry terdekat (None = tunggu submit baru)
+                job, waited = item, now - item.enqueued_at
+                if waited > self.max_age:
+                    self.stats["expired"] += 1
+                    job.future.set_exception(SendExpired(f"Dibuang setelah {waited:.1f} detik di antrean kirim"))
+                    logging.warning(f"[SendQueue] Pesan untuk channel {job.channel_id} basi setelah {waited:.1f} detik, dibuang.")
+                    continue
+                if job.attempts == 0 and not job.future.set_running_or_notify_cancel():
+                    continue # Dibatalkan pemanggil
+                job.attempts += 1
+                if job.attempts == 1:
+                    self.stats["wait_seconds"] += waited
+                    self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], round(waited, 3))
+            if job.attempts == 1 and self.on_wait:
+                self.on_wait(waited)
+            try:
+                result = job.func()
+            except RetryLater as e:
+                with self.condition:
+                    self.stats["retried"] += 1
+                    queue.not_before[job.channel_id] = time.monotonic() + e.retry_after
+                    queue.push(priority, job, front=True) # Tetap urutan pertama channel ini
+                continue
+            except Exception as e:
+                logging.error(f"[SendQueue] Error kirim ke channel {job.channel_id}: {e}")
+                job.future.set_exception(e)
+                result = None
+            with self.condition:
+                queue.not_before.pop(job.channel_id, None)
+                self.stats["sent" if result else "failed"] += 1
+            if not job.future.done():
+                job.future.set_result(result)
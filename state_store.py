@@ -0,0 +1,119 @@
+"""Penyimpanan state persisten (SQLite mode WAL) agar restart cepat dan idempoten.
+
+State disimpan sebagai pasangan (kind, key) -> JSON. Penulisan tidak pernah dilakukan
+di thread pemanggil: put/delete hanya masuk antrean, lalu thread writer menggabungkan
+perubahan per kunci dan menulisnya dalam satu transaksi per batch.
+"""
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+)
+"""
+
+_DELETE = object() # Penanda operasi hapus di antrean
+
+
+def connect(path):
+    """Membuka koneksi SQLite dengan WAL dan sinkronisasi ringan."""
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(_SCHEMA)
+    conn.commit()
+    return conn
+
+
+class StateStore:
+    """Store key-value per jenis state dengan writeback asinkron ber-batch."""
+
+    def __init__(self, path, flush_interval=1.0, batch_size=1000):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.pending = queue.SimpleQueue()
+        self.writes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True, name="StateWriter")
+        self._thread.start()
+
+    def load(self, kind):
+        """Membaca semua entri satu jenis state: {key: value}. Dipanggil saat startup."""
+        conn = connect(self.path)
+        try:
+            rows = conn.execute("SELECT key, value FROM state WHERE kind = ?", (kind,)).fetchall()
+        finally:
+            conn.close()
+        return {key: json.loads(value) for key, value in rows}
+
+    def put(self, kind, key, value):
+        """Menjadwalkan penulisan. value boleh callable; dievaluasi saat flush (snapshot terbaru)."""
+        self.pending.put((kind, str(key), value))
+
+    def delete(self, kind, key):
+        self.pending.put((kind, str(key), _DELETE))
+
+    def close(self, timeout=5):
+        """Menghentikan writer setelah semua perubahan tertulis."""
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+
+    def _drain(self, batch):
+        # Gabungkan perubahan per kunci: hanya nilai terakhir yang ditulis
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                kind, key, value = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch[(kind, key)] = value
+
+    def _write(self, conn, batch):
+        now = time.time()
+        upserts, deletes = [], []
+        for (kind, key), value in batch.items():
+            if value is _DELETE:
+                deletes.append((kind, key))
+                continue
+            if callable(value):
+                value = value()
+            upserts.append((kind, key, json.dumps(value), now))
+        with conn:
+            if upserts:
+                conn.executemany(
+                    "INSERT INTO state (kind, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(kind, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    upserts,
+                )
+            if deletes:
+                conn.executemany("DELETE FROM state WHERE kind = ? AND key = ?", deletes)
+        self.writes += len(upserts) + len(deletes)
+
+    def _writer_loop(self):
+        conn = connect(self.path)
+        try:
+            while True:
+                batch = {}
+                self._drain(batch)
+                if batch:
+                    try:
+                        self._write(conn, batch)
+                    except Exception as e:
+                        logging.error(f"[StateStore] Gagal menulis {len(batch)} perubahan state: {e}")
+                elif self._stop.is_set() and self.pending.empty():
+                    break
+        finally:
+            conn.close()
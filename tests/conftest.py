@@ -0,0 +1,53 @@
+"""Setup bersama: root repo & benchmarks di sys.path, env minimal agar bot.py bisa diimport tanpa .env asli."""
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "benchmarks"))
+
+# Nilai dari env menang atas .env (load_dotenv tidak menimpa), jadi token/key asli tidak pernah dipakai
+os.environ.update({
+    "DISCORD_TOKENS": "token-uji-aaaaaa,token-uji-bbbbbb",
+    "GOOGLE_API_KEYS": "key-uji-aaaaaa",
+    "DISCORD_API_BASE": "http://127.0.0.1:9/api/v10", # Port discard: request yang lolos mock langsung gagal
+    "GEMINI_API_BASE": "http://127.0.0.1:9/gemini",
+    "STATE_DB": "",
+    "RESPONSE_CACHE_FILE": "",
+    "TRACE_FILE": "",
+    "METRICS_PORT": "0",
+    "CONTROL_PORT": "0",
+    "SHARD_COUNT": "1",
+    "SHARD_INDEX": "0",
+    "SHARD_PROCESSES": "0",
+    "CONFIG_FILE": "",
+    "USE_GATEWAY": "false",
+})
+
+
+@pytest.fixture(scope="session")
+def bot():
+    """Modul bot.py (diimport sekali untuk semua test)."""
+    import bot as bot_module
+    return bot_module
+
+
+class FakeResponse:
+    """Pengganti requests.Response secukupnya untuk helper Discord/Gemini."""
+
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self.body = {} if body is None else body
+        self.headers = headers or {}
+        self.text = str(self.body)
+        self.content = self.text.encode("utf-8")
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture
+def make_response():
+    return FakeResponse
@@ -0,0 +1,44 @@
+"""Uji interval polling adaptif dan validasi batas min/max_interval."""
+import pytest
+
+import channel_config
+from adaptive_poll import AdaptiveInterval
+
+
+def test_speeds_up_on_activity_and_backs_off_when_idle():
+    poller = AdaptiveInterval(60, 5, 600, backoff=2, speedup=2)
+    assert poller.observe(3) == 30
+    assert poller.observe(1) == 15
+    assert poller.observe(0) == 30
+    for _ in range(10):
+        poller.observe(0)
+    assert poller.current == 600
+    assert poller.next_interval(slow_mode_delay=900) == 900
+
+
+def test_inherit_keeps_current_interval_within_new_bounds():
+    old = AdaptiveInterval(60, 5, 600)
+    old.current = 400
+    assert AdaptiveInterval(60, 5, 120).inherit(old).current == 120
+
+
+def test_inverted_bounds_raise():
+    with pytest.raises(ValueError):
+        AdaptiveInterval(60, 100, 50)
+
+
+def test_config_rejects_min_above_max():
+    defaults = {"min_interval": 5, "max_interval": 600}
+    with pytest.raises(channel_config.ConfigError) as error:
+        channel_config.validate({"channels": [{"id": "1", "settings": {"min_interval": 700}}]}, "uji", 1, defaults)
+    assert "min_interval" in error.value.errors[0]
+    with pytest.raises(channel_config.ConfigError):
+        channel_config.validate_update({"settings": {"max_interval": 10}}, "uji", 1, {"min_interval": 30}, defaults)
+
+
+def test_create_poller_falls_back_to_fixed_interval(bot):
+    settings = {"use_google_ai": True, "enable_read_message": True, "adaptive_interval": True,
+                "delay_interval": 60, "min_interval": 100, "max_interval": 50}
+    assert bot.create_poller(settings, channel_name="uji") is None
+    settings.update(min_interval=5)
+    assert isinstance(bot.create_poller(settings, channel_name="uji"), AdaptiveInterval)
@@ -0,0 +1,42 @@
+"""Uji validasi & penyimpanan file konfigurasi channel."""
+import json
+
+import pytest
+
+import channel_config
+
+CONFIGS = {"123456789012345678": {"name": "umum", "bot_ids": {"400000000000000001"},
+                                  "settings": channel_config.normalize_settings({"use_google_ai": True})}}
+
+
+def test_save_json_round_trips(tmp_path):
+    path = tmp_path / "channels.json"
+    channel_config.save(str(path), CONFIGS)
+    loaded = channel_config.validate(json.loads(path.read_text()), str(path), 1)
+    assert loaded[0]["id"] == "123456789012345678"
+    assert loaded[0]["bots"] == ["400000000000000001"]
+    assert not (tmp_path / "channels.json.tmp").exists()
+
+
+def test_yaml_save_without_pyyaml_leaves_no_temp_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(channel_config, "yaml", None)
+    path = tmp_path / "channels.yaml"
+    with pytest.raises(channel_config.ConfigError):
+        channel_config.save(str(path), CONFIGS)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_failed_write_removes_temp_file(tmp_path, monkeypatch):
+    def broken_dump(*args, **kwargs):
+        raise OSError("disk penuh")
+    monkeypatch.setattr(channel_config.json, "dump", broken_dump)
+    with pytest.raises(OSError):
+        channel_config.save(str(tmp_path / "channels.json"), CONFIGS)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_validate_reports_every_problem():
+    data = {"channels": [{"id": "abc", "bots": [9], "settings": {"read_delay": -1, "typo": 1}}]}
+    with pytest.raises(channel_config.ConfigError) as error:
+        channel_config.validate(data, "uji", 2)
+    assert len(error.value.errors) == 4
@@ -0,0 +1,105 @@
+"""Uji circuit breaker: transisi state, probe half-open, dan pemetaan hasil request Discord di bot.py."""
+import time
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, BreakerRegistry
+
+CHANNEL = "500000000000000001"
+
+
+def test_opens_after_threshold_and_closes_after_successful_probe():
+    changes = []
+    registry = BreakerRegistry(threshold=2, cooloff=0.05, on_change=lambda key, state, reason, cooloff: changes.append(state))
+    registry.failure("k", "5xx")
+    assert registry.state("k") == CLOSED
+    registry.failure("k", "5xx")
+    assert registry.state("k") == OPEN and not registry.allow("k")
+    time.sleep(0.06)
+    assert registry.allow("k") and registry.state("k") == HALF_OPEN
+    assert not registry.allow("k") # Hanya satu probe per cool-off
+    registry.success("k")
+    assert registry.state("k") == CLOSED and registry.allow("k")
+    assert changes == [OPEN, HALF_OPEN, CLOSED]
+
+
+def test_failed_probe_doubles_cooloff_up_to_max():
+    registry = BreakerRegistry(threshold=1, cooloff=0.02, max_cooloff=0.05)
+    registry.failure("k", fatal=True)
+    for expected in (0.04, 0.05):
+        time.sleep(registry.retry_in("k") + 0.005)
+        assert registry.allow("k")
+        registry.failure("k")
+        assert registry.breakers["k"].cooloff == pytest.approx(expected)
+    assert registry.counts() == {OPEN: 1, HALF_OPEN: 0}
+
+
+def test_late_failure_while_open_is_ignored():
+    registry = BreakerRegistry(threshold=1, cooloff=10)
+    registry.failure("k", fatal=True)
+    until = registry.breakers["k"].until
+    registry.failure("k")
+    assert registry.breakers["k"].until == until
+
+
+@pytest.fixture
+def breakers(bot, monkeypatch):
+    """Registry baru per test agar state circuit tidak bocor antar test."""
+    for name in ("token_breakers", "channel_breakers", "access_breakers"):
+        monkeypatch.setattr(bot, name, BreakerRegistry(threshold=2, cooloff=0.05))
+    monkeypatch.setitem(bot.channel_token_sets, CHANNEL, ("token-a", "token-b"))
+    return bot
+
+
+def test_401_removes_token_from_rotation(breakers):
+    breakers.record_request_outcome("token-a", "read", CHANNEL, 401)
+    assert breakers.healthy_tokens(["token-a", "token-b"]) == ["token-b"]
+    assert breakers.channel_breakers.state(CHANNEL) == CLOSED
+
+
+def test_403_only_drops_that_bot_until_every_bot_is_denied(breakers):
+    breakers.record_request_outcome("token-a", "send", CHANNEL, 403)
+    assert breakers.healthy_tokens(["token-a", "token-b"], CHANNEL) == ["token-b"]
+    assert breakers.healthy_tokens(["token-a", "token-b"]) == ["token-a", "token-b"] # Channel lain tidak terpengaruh
+    assert breakers.channel_breakers.state(CHANNEL) == CLOSED
+    breakers.record_request_outcome("token-b", "read", CHANNEL, 403)
+    assert breakers.channel_breakers.state(CHANNEL) == OPEN
+
+
+def test_404_opens_channel_and_success_closes_everything(breakers):
+    breakers.record_request_outcome("token-a", "read", CHANNEL, 404)
+    assert breakers.channel_breakers.state(CHANNEL) == OPEN
+    time.sleep(0.06)
+    assert breakers.channel_breakers.allow(CHANNEL)
+    breakers.record_request_outcome("token-a", "read", CHANNEL, 200)
+    assert breakers.channel_breakers.state(CHANNEL) == CLOSED
+
+
+def test_errors_outside_breaker_endpoints_and_429_are_ignored(breakers):
+    for _ in range(3):
+        breakers.record_request_outcome("token-a", "typing", CHANNEL, 500)
+        breakers.record_request_outcome("token-a", "read", CHANNEL, 429)
+    assert breakers.channel_breakers.counts() == {OPEN: 0, HALF_OPEN: 0}
+
+
+def test_access_probe_bot_is_picked_when_due(breakers):
+    breakers.record_request_outcome("token-a", "read", CHANNEL, 403)
+    assert breakers.pick_cycle_token(["token-a", "token-b"], CHANNEL) == ("token-b", False)
+    time.sleep(0.06)
+    assert breakers.pick_cycle_token(["token-a", "token-b"], CHANNEL) == ("token-a", True)
+
+
+@pytest.mark.parametrize("status, expected_state", [(200, CLOSED), (401, OPEN), (500, OPEN), (429, HALF_OPEN)])
+def test_probe_token_reports_result(breakers, monkeypatch, make_response, status, expected_state):
+    breakers.token_breakers.failure("token-a", "401", fatal=True)
+    time.sleep(0.06)
+    assert breakers.tokens_due_for_probe(["token-a", "token-b"]) == ["token-a"]
+
+    def fake_discord_request(method, path, token, **kwargs):
+        assert (method, path) == ("GET", "/users/@me")
+        response = make_response(status)
+        breakers.record_request_outcome(token, "GET users/@me", "", status) # Seperti discord_request asli
+        return response
+    monkeypatch.setattr(breakers, "discord_request", fake_discord_request)
+    assert breakers.probe_token("token-a") is (status == 200)
+    assert breakers.token_breakers.state("token-a") == expected_state
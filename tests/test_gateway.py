@@ -0,0 +1,92 @@
+"""Uji GatewayIntake terhadap server gateway tiruan lokal (benchmarks/mock_gateway.py)."""
+import time
+
+import pytest
+
+pytest.importorskip("websocket")
+
+import gateway
+import mock_gateway
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture
+def gateway_server():
+    state = mock_gateway.MockGatewayState()
+    server, url = mock_gateway.start(state)
+    yield state, url
+    server.shutdown()
+    server.server_close()
+
+
+def test_register_identifies_and_becomes_live(gateway_server):
+    state, url = gateway_server
+    intake = gateway.GatewayIntake(url)
+    try:
+        intake.register("111", "token-satu")
+        assert wait_until(lambda: intake.is_live("111"))
+        assert state.identified == ["token-satu"]
+        session = intake.session("111")
+        assert session is not None and session[1] == 1 # Satu READY; penanda berubah jika ada READY baru
+        intake.register("222", "token-satu") # Token sama -> koneksi dipakai ulang
+        assert intake.listeners["111"] is intake.listeners["222"]
+        assert state.counts["identify"] == 1
+    finally:
+        intake.stop()
+
+
+def test_drain_returns_buffered_messages_newest_first(gateway_server):
+    state, url = gateway_server
+    intake = gateway.GatewayIntake(url, buffer_size=3)
+    try:
+        intake.register("111", "token-satu")
+        assert wait_until(lambda: intake.is_live("111"))
+        for message_id in ("5", "7", "6"):
+            state.dispatch_message({"id": message_id, "channel_id": "111", "content": f"pesan {message_id}"})
+        state.dispatch_message({"id": "8", "channel_id": "999", "content": "channel lain"})
+        assert wait_until(lambda: len(intake.buffers["111"]) == 3)
+        assert [m["id"] for m in intake.drain("111")] == ["7", "6", "5"]
+        assert intake.drain("111") == []
+        assert "999" not in intake.buffers
+
+        for message_id in ("10", "11", "12", "13"): # Melebihi buffer_size: event tertua dibuang
+            state.dispatch_message({"id": message_id, "channel_id": "111"})
+        assert wait_until(lambda: intake.buffers["111"] and intake.buffers["111"][-1]["id"] == "13")
+        assert [m["id"] for m in intake.drain("111")] == ["13", "12", "11"]
+    finally:
+        intake.stop()
+
+
+def test_unregister_stops_buffering_and_closes_unused_connection(gateway_server):
+    state, url = gateway_server
+    intake = gateway.GatewayIntake(url)
+    try:
+        intake.register("111", "token-satu")
+        intake.register("222", "token-satu")
+        assert wait_until(lambda: intake.is_live("111"))
+        client = intake.listeners["111"]
+
+        intake.unregister("111")
+        assert not intake.is_live("111")
+        assert intake.session("111") is None
+        assert "111" not in intake.buffers
+        assert intake.clients == {"token-satu": client} # Masih dipakai channel 222
+
+        state.dispatch_message({"id": "5", "channel_id": "111"})
+        state.dispatch_message({"id": "6", "channel_id": "222"})
+        assert wait_until(lambda: len(intake.buffers["222"]) == 1)
+        assert intake.drain("111") == []
+
+        intake.unregister("222")
+        assert intake.clients == {}
+        assert wait_until(lambda: not state.sessions) # Koneksi ditutup
+    finally:
+        intake.stop()
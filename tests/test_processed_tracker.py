@@ -0,0 +1,28 @@
+"""Uji pelacak ID pesan per channel: watermark tidak pernah melompati ID yang belum diproses."""
+
+
+def test_out_of_order_ids_do_not_push_floor_past_unseen(bot):
+    tracker = bot.ProcessedTracker(3)
+    for msg_id in (10, 50, 20, 40, 30): # Event gateway bercampur catch-up REST
+        tracker.add(msg_id)
+    assert tracker.snapshot() == (20, [30, 40, 50])
+    assert tracker.contains(20) and tracker.contains(10)
+    assert not tracker.contains(25) and not tracker.contains(45)
+    assert tracker.contains("40") # ID string dari JSON
+
+
+def test_ids_at_or_below_floor_are_not_re_added(bot):
+    tracker = bot.ProcessedTracker(2)
+    for msg_id in (1, 2, 3):
+        tracker.add(msg_id)
+    tracker.add(1)
+    assert tracker.snapshot() == (1, [2, 3])
+
+
+def test_restore_round_trip(bot):
+    tracker = bot.ProcessedTracker(3)
+    for msg_id in (5, 9, 7, 8):
+        tracker.add(msg_id)
+    restored = bot.ProcessedTracker(3)
+    restored.restore(*tracker.snapshot())
+    assert restored.snapshot() == tracker.snapshot() == (5, [7, 8, 9])
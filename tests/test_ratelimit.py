@@ -0,0 +1,59 @@
+"""Uji pengelola bucket rate limit Discord."""
+import time
+
+from ratelimit import RateLimiter, route_key
+
+
+class _Response:
+    def __init__(self, status_code=200, headers=None, body=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.body = body or {}
+
+    def json(self):
+        return self.body
+
+
+def test_route_key_keeps_major_parameters_only():
+    assert route_key("get", "/channels/123456789/messages/987654321?limit=5") == "GET /channels/123456789/messages/{id}"
+    assert route_key("GET", "/users/@me") == "GET /users/@me"
+
+
+def test_waits_for_exhausted_bucket_until_reset():
+    limiter = RateLimiter(global_per_second=0)
+    route = "POST /channels/1/messages"
+    limiter.update("token", route, _Response(headers={"X-RateLimit-Bucket": "abc", "X-RateLimit-Remaining": "1",
+                                                      "X-RateLimit-Reset-After": "0.1"}))
+    assert limiter.acquire("token", route) == 0 # Slot terakhir
+    assert limiter.acquire("token", route) >= 0.09 # Menunggu reset bucket, bukan kena 429
+    assert limiter.acquire("other-token", route) == 0 # Bucket per token
+
+
+def test_shared_bucket_hash_is_split_by_major_parameter():
+    limiter = RateLimiter(global_per_second=0)
+    headers = {"X-RateLimit-Bucket": "shared", "X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "5"}
+    limiter.update("token", "POST /channels/1/messages", _Response(headers=headers))
+    limiter.route_buckets[("token", "POST /channels/2/messages")] = "shared"
+    start = time.monotonic()
+    assert limiter.acquire("token", "POST /channels/2/messages") == 0 # Channel lain = bucket lain
+    assert time.monotonic() - start < 0.05
+
+
+def test_429_blocks_route_and_global_429_blocks_token():
+    limiter = RateLimiter(global_per_second=0)
+    limiter.update("token", "GET /channels/1/messages", _Response(429, body={"retry_after": 0.05}))
+    assert limiter.acquire("token", "GET /channels/1/messages") >= 0.04
+    assert limiter.stats["limited"] == 1
+    limiter.update("token", "GET /channels/1", _Response(429, {"X-RateLimit-Global": "true"}, {"retry_after": 0.05}))
+    assert limiter.acquire("token", "GET /users/@me") >= 0.04
+
+
+def test_global_per_second_limit():
+    limiter = RateLimiter(global_per_second=2)
+    waits = [limiter.acquire("token", f"GET /channels/{i}") for i in range(3)]
+    assert waits[:2] == [0, 0] and waits[2] > 0.5
+
+
+def test_retry_after_falls_back_to_header_then_default():
+    assert RateLimiter.retry_after(_Response(429, {"Retry-After": "2.5"})) == 2.5
+    assert RateLimiter.retry_after(_Response(429)) == 1.0
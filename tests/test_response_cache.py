@@ -0,0 +1,51 @@
+"""Uji cache balasan Gemini: normalisasi kunci, kandidat, LRU, TTL, dan persistensi."""
+import time
+
+from response_cache import ResponseCache
+
+
+def fill(cache, key, count):
+    for i in range(count):
+        cache.put(key, f"balasan {i}")
+
+
+def test_key_ignores_case_punctuation_and_spacing():
+    assert ResponseCache.make_key("GM!!  semua", "en") == ResponseCache.make_key("gm semua", "en")
+    assert ResponseCache.make_key("gm", "en") != ResponseCache.make_key("gm", "id")
+
+
+def test_miss_until_all_candidates_collected_then_no_immediate_repeat():
+    cache = ResponseCache(candidates_per_key=2)
+    cache.put("k", "a")
+    assert cache.get("k") is None
+    cache.put("k", "b")
+    picks = [cache.get("k") for _ in range(6)]
+    assert set(picks) == {"a", "b"}
+    assert all(first != second for first, second in zip(picks, picks[1:]))
+    assert cache.stats()["hits"] == 6 and cache.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_entries=2, candidates_per_key=1)
+    fill(cache, "a", 1)
+    fill(cache, "b", 1)
+    assert cache.get("a") # "a" baru dipakai, jadi "b" yang terlama
+    fill(cache, "c", 1)
+    assert cache.get("b") is None and cache.get("a") and cache.get("c")
+
+
+def test_expired_entry_is_dropped():
+    cache = ResponseCache(ttl=0.05, candidates_per_key=1)
+    fill(cache, "k", 1)
+    assert cache.get("k")
+    time.sleep(0.06)
+    assert cache.get("k") is None and cache.stats()["size"] == 0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(candidates_per_key=1, path=path)
+    fill(cache, "k", 1)
+    cache.save()
+    assert ResponseCache(candidates_per_key=1, path=path).get("k") == "balasan 0"
+    assert [p.name for p in tmp_path.iterdir()] == ["cache.json"] # File sementara tidak tertinggal
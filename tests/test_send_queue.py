@@ -0,0 +1,86 @@
+"""Uji antrean kirim per token: prioritas, round-robin antar channel, dan kirim ulang setelah 429."""
+import threading
+import time
+
+import pytest
+
+from send_queue import PRIORITY_POST, PRIORITY_REPLY, RetryLater, SendExpired, SendQueue
+
+
+def blocked_queue():
+    """SendQueue yang pengirimnya tertahan di pesan pertama, agar urutan pesan berikutnya bisa disusun dulu."""
+    queue = SendQueue()
+    gate, order = threading.Event(), []
+    first = queue.submit("token-a", "0", lambda: gate.wait(5) or True)
+
+    def job(name):
+        return lambda: order.append(name) or True
+    return queue, gate, order, first, job
+
+
+def test_replies_go_before_posts():
+    queue, gate, order, first, job = blocked_queue()
+    posts = [queue.submit("token-a", "1", job(f"post{i}"), PRIORITY_POST) for i in range(2)]
+    reply = queue.submit("token-a", "1", job("reply"), PRIORITY_REPLY)
+    gate.set()
+    for future in [first, reply, *posts]:
+        assert future.result(timeout=5) is True
+    assert order == ["reply", "post0", "post1"]
+
+
+def test_channels_take_turns_on_one_token():
+    queue, gate, order, first, job = blocked_queue()
+    futures = [queue.submit("token-a", "ramai", job(f"ramai{i}")) for i in range(3)]
+    futures.append(queue.submit("token-a", "sepi", job("sepi")))
+    gate.set()
+    for future in futures:
+        future.result(timeout=5)
+    assert order == ["ramai0", "sepi", "ramai1", "ramai2"]
+
+
+def test_retry_later_requeues_once_then_sends():
+    queue = SendQueue()
+    calls = []
+
+    def send():
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise RetryLater(0.05)
+        return True
+    assert queue.submit("token-a", "1", send).result(timeout=5) is True
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.05
+    summary = queue.summary()
+    assert (summary["retried"], summary["sent"], summary["failed"]) == (1, 1, 0)
+
+
+def test_stale_message_expires():
+    queue, gate, order, first, job = blocked_queue()
+    queue.max_age = 0.01
+    late = queue.submit("token-a", "1", job("basi"))
+    time.sleep(0.05)
+    gate.set()
+    with pytest.raises(SendExpired):
+        late.result(timeout=5)
+    assert order == []
+
+
+def test_send_message_429_is_resent_from_queue(bot, monkeypatch, make_response):
+    """send_message harus meneruskan RetryLater (bukan menelannya) agar 429 dikirim ulang tepat sekali."""
+    responses = [
+        make_response(429, {"message": "You are being rate limited.", "retry_after": 0.05}),
+        make_response(200, {"id": "900000000000000001"}),
+    ]
+    requests_made = []
+
+    def fake_discord_request(method, path, token, **kwargs):
+        requests_made.append((method, path))
+        return responses.pop(0)
+    monkeypatch.setattr(bot, "discord_request", fake_discord_request)
+    monkeypatch.setattr(bot, "send_queue", SendQueue())
+
+    future = bot.queue_message("500000000000000001", "halo", "token-uji-aaaaaa", channel_name="uji")
+    assert future.result(timeout=5) is True
+    assert requests_made == [("POST", "/channels/500000000000000001/messages")] * 2
+    summary = bot.send_queue.summary()
+    assert (summary["retried"], summary["sent"]) == (1, 1)
@@ -0,0 +1,242 @@
+"""Tracing span per fase siklus channel & generasi balasan, ditulis ke file lokal yang dirotasi.
+
+Format:
+  chrome -> Chrome trace event format (array JSON event "X"); buka di chrome://tracing atau ui.perfetto.dev
+  otlp   -> satu ExportTraceServiceRequest OTLP/JSON per baris (format file exporter OpenTelemetry)
+
+Sampling diputuskan sekali per trace (satu siklus channel). Trace yang tidak disampel, atau
+tracer yang nonaktif, memakai NOOP_SPAN: semua method-nya kosong sehingga instrumentasi di
+jalur panas hanya berupa satu pemanggilan fungsi. Span ditulis oleh satu thread writer.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+FORMATS = ("chrome", "otlp")
+
+
+class _NoopSpan:
+    """Span kosong untuk tracing nonaktif / trace yang tidak disampel."""
+
+    sampled = False
+
+    def child(self, name, lane=None, **attrs):
+        return self
+
+    def set(self, **attrs):
+        pass
+
+    def event(self, name, **attrs):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Satu fase bertimestamp. Dipakai sebagai context manager atau diakhiri manual lewat end()."""
+
+    sampled = True
+    __slots__ = ("tracer", "name", "trace_id", "span_id", "parent_id", "lane", "thread",
+                 "start_ns", "start_perf", "end_ns", "attrs", "events")
+
+    def __init__(self, tracer, name, trace_id, parent, lane, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.thread = threading.current_thread().name
+        if lane is None and parent is not None:
+            # Span dari thread lain (worker generasi/pengirim) diberi jalur sendiri agar tidak menumpuk
+            lane = parent.lane if parent.thread == self.thread else f"{parent.lane} ({self.thread})"
+        self.lane = lane or self.thread
+        self.attrs = attrs
+        self.events = []
+        self.end_ns = None
+        self.start_ns = time.time_ns()
+        self.start_perf = time.perf_counter_ns()
+
+    def child(self, name, lane=None, **attrs):
+        return Span(self.tracer, name, self.trace_id, self, lane, attrs)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def event(self, name, **attrs):
+        """Kejadian sesaat di dalam span (misal retry atau pergantian API key)."""
+        self.events.append((time.time_ns(), name, attrs))
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = self.start_ns + (time.perf_counter_ns() - self.start_perf)
+            self.tracer._finish(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs["error"] = f"{exc_type.__name__}: {exc}"
+        self.end()
+        return False
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attrs):
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attrs.items() if value is not None]
+
+
+class Tracer:
+    """Membuat trace tersampel dan menulis span selesai ke `path` (dirotasi saat > max_bytes)."""
+
+    def __init__(self, path=None, fmt="chrome", sample_rate=1.0, max_bytes=50 * 1024 * 1024, backups=3,
+                 service_name="push-role-bot", flush_interval=1.0):
+        if fmt not in FORMATS:
+            raise ValueError(f"Format trace tidak dikenal: {fmt!r} (pakai {' / '.join(FORMATS)})")
+        self.path = path
+        self.fmt = fmt
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.service_name = service_name
+        self.flush_interval = flush_interval
+        self.enabled = bool(path) and sample_rate > 0
+        self.pending = queue.SimpleQueue()
+        self.writer = None
+        self.writer_lock = threading.Lock()
+        self.file = None
+        self.lanes = {} # {nama jalur: tid} untuk format chrome (per file)
+        self.stats = {"traces": 0, "spans": 0, "files": 0}
+
+    def start_trace(self, name, lane=None, **attrs):
+        """Span akar trace baru; NOOP_SPAN jika tracing nonaktif atau tidak disampel."""
+        if not self.enabled or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            return NOOP_SPAN
+        self.stats["traces"] += 1
+        return Span(self, name, os.urandom(16).hex(), None, lane, attrs)
+
+    def _finish(self, span):
+        self.pending.put(span)
+        if self.writer is None:
+            with self.writer_lock:
+                if self.writer is None:
+                    self.writer = threading.Thread(target=self._run, daemon=True, name="TraceWriter")
+                    self.writer.start()
+                    atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Menulis semua span yang sudah selesai ke file."""
+        spans = []
+        while True:
+            try:
+                spans.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+        if not spans:
+            return
+        with self.writer_lock:
+            try:
+                self._rotate_if_needed()
+                if self.fmt == "chrome":
+                    self._write_chrome(spans)
+                else:
+                    self._write_otlp(spans)
+                self.file.flush()
+                self.stats["spans"] += len(spans)
+            except OSError as e:
+                logging.warning(f"[Tracing] Gagal menulis {self.path}: {e}")
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.lanes = {}
+        self.stats["files"] += 1
+        if self.fmt == "chrome" and self.file.tell() == 0:
+            self.file.write("[\n") # Penutup "]" boleh tidak ada; viewer Chrome/Perfetto tetap membacanya
+
+    def _rotate_if_needed(self):
+        if self.file is None:
+            self._open()
+        if self.file.tell() < self.max_bytes:
+            return
+        self.file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def _write_chrome(self, spans):
+        pid = os.getpid()
+        lines = []
+        for span in spans:
+            tid = self.lanes.get(span.lane)
+            if tid is None:
+                tid = self.lanes[span.lane] = len(self.lanes) + 1
+                lines.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": span.lane}})
+            args = dict(span.attrs, trace_id=span.trace_id, span_id=span.span_id)
+            if span.parent_id:
+                args["parent_id"] = span.parent_id
+            lines.append({"name": span.name, "cat": "bot", "ph": "X", "pid": pid, "tid": tid,
+                          "ts": span.start_ns / 1000, "dur": (span.end_ns - span.start_ns) / 1000, "args": args})
+            for at_ns, name, attrs in span.events:
+                lines.append({"name": name, "cat": "bot", "ph": "i", "s": "t", "pid": pid, "tid": tid, "ts": at_ns / 1000, "args": attrs})
+        self.file.write("".join(json.dumps(line, ensure_ascii=False, default=str) + ",\n" for line in lines))
+
+    def _write_otlp(self, spans):
+        otlp_spans = []
+        for span in spans:
+            entry = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1, # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": _otlp_attributes(dict(span.attrs, lane=span.lane)),
+            }
+            if span.parent_id:
+                entry["parentSpanId"] = span.parent_id
+            if span.events:
+                entry["events"] = [{"timeUnixNano": str(at_ns), "name": name, "attributes": _otlp_attributes(attrs)}
+                                   for at_ns, name, attrs in span.events]
+            if "error" in span.attrs:
+                entry["status"] = {"code": 2, "message": str(span.attrs["error"])} # STATUS_CODE_ERROR
+            otlp_spans.append(entry)
+        request = {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": self.service_name, "process.pid": os.getpid()})},
+            "scopeSpans": [{"scope": {"name": "bot"}, "spans": otlp_spans}],
+        }]}
+        self.file.write(json.dumps(request, ensure_ascii=False, default=str) + "\n")
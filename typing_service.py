@@ -0,0 +1,74 @@
+"""Layanan typing indicator bersama: satu thread me-refresh typing untuk banyak channel.
+
+Discord menampilkan typing sekitar 10 detik per request, jadi tiap channel aktif
+di-refresh setiap REFRESH_INTERVAL detik sampai durasinya habis atau dibatalkan.
+"""
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REFRESH_INTERVAL = 8.5
+
+
+class TypingService:
+    """Menjadwalkan typing per channel lewat satu heap; send_typing(channel_id, token) disediakan pemanggil."""
+
+    def __init__(self, send_typing, workers=2):
+        self.send_typing = send_typing
+        self.workers = workers
+        self.active = {} # {channel_id: (token, end_time, generation)}
+        self.heap = []   # (next_refresh, generation, channel_id)
+        self.generation = 0
+        self.condition = threading.Condition()
+        self.executor = None
+        self.thread = None
+
+    def _ensure_started(self):
+        if self.thread is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="Typing")
+            self.thread = threading.Thread(target=self._run, daemon=True, name="TypingService")
+            self.thread.start()
+
+    def start(self, channel_id, token, duration):
+        """Mulai (atau perpanjang) typing di channel selama duration detik. Tidak blocking."""
+        with self.condition:
+            self._ensure_started()
+            self.generation += 1
+            self.active[channel_id] = (token, time.monotonic() + duration, self.generation)
+            heapq.heappush(self.heap, (time.monotonic(), self.generation, channel_id))
+            self.condition.notify()
+
+    def cancel(self, channel_id):
+        """Hentikan refresh typing di channel (misal begitu pesan terkirim)."""
+        with self.condition:
+            self.active.pop(channel_id, None)
+
+    def active_count(self):
+        with self.condition:
+            return len(self.active)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.heap or self.heap[0][0] > time.monotonic():
+                    self.condition.wait(timeout=self.heap[0][0] - time.monotonic() if self.heap else None)
+                _, generation, channel_id = heapq.heappop(self.heap)
+                entry = self.active.get(channel_id)
+                if entry is None or entry[2] != generation:
+                    continue # Sudah dibatalkan atau diganti permintaan baru
+                token, end_time, _ = entry
+                now = time.monotonic()
+                if now >= end_time:
+                    self.active.pop(channel_id, None)
+                    continue
+                # Jadwalkan refresh berikutnya, atau entri kedaluwarsa di end_time
+                heapq.heappush(self.heap, (min(now + REFRESH_INTERVAL, end_time), generation, channel_id))
+            self.executor.submit(self._send, channel_id, token)
+
+    def _send(self, channel_id, token):
+        try:
+            self.send_typing(channel_id, token)
+        except Exception as e:
+            logging.debug(f"[TypingService] Gagal kirim typing ke {channel_id}: {e}")